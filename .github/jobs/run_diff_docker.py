@@ -93,7 +93,8 @@ def main():
     print("Comparing output to truth data")
     diff_files = compare_dir(TRUTH_DIR, OUTPUT_DIR,
                              debug=True,
-                             save_diff=True)
+                             save_diff=True,
+                             processes=os.cpu_count() or 1)
 
     # copy difference files into directory
     # so it can be easily downloaded and compared
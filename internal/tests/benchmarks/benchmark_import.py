@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""
+Program Name: benchmark_import.py
+Abstract: Measures the time to start a new Python process that imports
+ METplus and loads the wrappers for a PROCESS_LIST. Wrappers are imported
+ when they are first accessed, so a run only pays for the wrappers it uses.
+History Log:  Initial version
+Usage: benchmark_import.py [--repeat <R>] [--process_list <P1,P2>]
+Condition codes: 0 on success
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+from os.path import dirname, realpath
+
+METPLUS_BASE = dirname(dirname(dirname(dirname(realpath(__file__)))))
+
+ALL_WRAPPERS = 'ALL'
+
+# access the wrapper classes like run_metplus does for each PROCESS_LIST item
+IMPORT_CODE = '''
+import metplus.wrappers
+for process in {process_list!r}:
+    getattr(metplus.wrappers, f'{{process}}Wrapper')
+'''
+
+# import every wrapper module, which is what the package did before
+IMPORT_ALL_CODE = '''
+import metplus.wrappers
+from importlib import import_module
+for module_name in metplus.wrappers.wrapper_modules:
+    import_module(f'metplus.wrappers.{module_name}')
+'''
+
+
+def time_import(process_list, repeat):
+    if process_list == [ALL_WRAPPERS]:
+        code = IMPORT_ALL_CODE
+    else:
+        code = IMPORT_CODE.format(process_list=process_list)
+
+    env = os.environ.copy()
+    python_path = [METPLUS_BASE]
+    if env.get('PYTHONPATH'):
+        python_path.append(env['PYTHONPATH'])
+    env['PYTHONPATH'] = os.pathsep.join(python_path)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='number of processes to start for each case')
+    parser.add_argument('--process_list', action='append',
+                        help='comma-separated list of wrappers to load. '
+                             'Can be set more than once. Default cases '
+                             'are no wrappers, PCPCombine, GridStat, and '
+                             f'{ALL_WRAPPERS} wrappers')
+    args = parser.parse_args()
+
+    cases = args.process_list
+    if not cases:
+        cases = ['', 'PCPCombine', 'GridStat', ALL_WRAPPERS]
+
+    for case in cases:
+        process_list = [item.strip() for item in case.split(',')
+                        if item.strip()]
+        best, mean = time_import(process_list, args.repeat)
+        name = case if case else 'no wrappers'
+        print(f'{name}: best {best * 1e3:.1f} msec, '
+              f'mean {mean * 1e3:.1f} msec per process')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+"""
+Program Name: benchmark_string_sub.py
+Abstract: Measures the time to substitute filename templates with
+ do_string_sub using the cached parsed templates and results, parsing the
+ templates for every call, and substituting new time values every call.
+History Log:  Initial version
+Usage: benchmark_string_sub.py [--number <N>] [--repeat <R>]
+Condition codes: 0 on success
+"""
+
+import sys
+import timeit
+import argparse
+from os.path import dirname, realpath
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, dirname(dirname(dirname(dirname(realpath(__file__))))))
+
+from metplus.util import do_string_sub, ti_calculate
+from metplus.util import string_template_substitution as sts
+
+TEMPLATES = [
+    '{init?fmt=%Y%m%d%H}/gfs.t{init?fmt=%2H}z.pgrb2.0p25.f{lead?fmt=%3H}',
+    '{valid?fmt=%Y%m%d}/prepbufr.gdas.{valid?fmt=%Y%m%d%H}.nr',
+    'grid_stat_{model}_{lead?fmt=%2H}0000L_{valid?fmt=%Y%m%d_%H%M%S}V.stat',
+    'ST4.{valid?fmt=%Y%m%d%H?shift=-6H}.{level?fmt=%2H}h',
+    '{valid?fmt=%Y%m%d%H?truncate=21600}/obs_{custom}.nc',
+]
+
+
+def get_time_info_list(count):
+    start = datetime(2023, 1, 1)
+    return [
+        ti_calculate({'init': start + timedelta(hours=6 * (idx // 8)),
+                      'lead': relativedelta(hours=3 * (idx % 8)),
+                      'model': 'GFS',
+                      'level': 21600,
+                      'custom': 'mem01'})
+        for idx in range(count)
+    ]
+
+
+def clear_caches():
+    sts._get_string_sub_tags.cache_clear()
+    sts._render_cached.cache_clear()
+    sts._get_replace_regex.cache_clear()
+
+
+def substitute_all(time_info_list, clear=False):
+    for time_info in time_info_list:
+        for template in TEMPLATES:
+            if clear:
+                clear_caches()
+            do_string_sub(template, **time_info)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=20,
+                        help='number of loops to time in each repeat')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of times to repeat each timing')
+    parser.add_argument('--times', type=int, default=200,
+                        help='number of run times to substitute')
+    args = parser.parse_args()
+
+    time_info_list = get_time_info_list(args.times)
+    calls = args.times * len(TEMPLATES) * args.number
+
+    cases = (
+        ('repeated times (result cache)',
+         lambda: substitute_all(time_info_list)),
+        ('new times (parsed template cache)',
+         lambda: (sts._render_cached.cache_clear(),
+                  substitute_all(time_info_list))),
+        ('no cache',
+         lambda: substitute_all(time_info_list, clear=True)),
+    )
+    for name, func in cases:
+        clear_caches()
+        best = min(timeit.repeat(func, number=args.number,
+                                 repeat=args.repeat))
+        print(f'{name}: {best / calls * 1e6:.2f} usec per call')
+
+
+if __name__ == "__main__":
+    main()
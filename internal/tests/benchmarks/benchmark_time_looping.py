@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+"""
+Program Name: benchmark_time_looping.py
+Abstract: Measures the time to loop over the run times of a long hourly time
+ range and the forecast leads of each run time the way RuntimeFreqWrapper
+ does when it finds input files for each forecast lead. Compares the run
+ times and leads that are computed once and reused to computing them again
+ for every call.
+History Log:  Initial version
+Usage: benchmark_time_looping.py [--years <Y>] [--leads <L>] [--repeat <R>]
+Condition codes: 0 on success
+"""
+
+import sys
+import timeit
+import argparse
+from os.path import dirname, realpath
+
+sys.path.insert(0, dirname(dirname(dirname(dirname(realpath(__file__))))))
+
+from metplus.util.config_metplus import METplusConfig
+from metplus.util import time_looping
+
+
+def get_config(years, leads):
+    config = METplusConfig()
+    config.set('config', 'CLOCK_TIME', '20240101000000')
+    config.set('config', 'LOOP_BY', 'VALID')
+    config.set('config', 'VALID_TIME_FMT', '%Y%m%d%H')
+    config.set('config', 'VALID_BEG', '2010010100')
+    config.set('config', 'VALID_END', f'{2010 + years - 1}123123')
+    config.set('config', 'VALID_INCREMENT', '1H')
+    config.set('config', 'LEAD_SEQ', f'begin_end_incr(0,{(leads - 1) * 3},3)')
+    return config
+
+
+def loop_over_leads(config, clear):
+    """! Loop over all run times for each forecast lead, then get the
+    forecast leads for each run time."""
+    count = 0
+    if clear:
+        time_looping.clear_time_looping_cache()
+    for _ in time_looping.get_lead_sequence(config):
+        if clear:
+            time_looping.clear_time_looping_cache()
+        for _ in time_looping.time_generator(config):
+            count += 1
+
+    for time_input in time_looping.time_generator(config):
+        if clear:
+            time_looping.clear_time_looping_cache()
+        count += len(time_looping.get_lead_sequence(config, time_input))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=int, default=10,
+                        help='number of years of hourly run times')
+    parser.add_argument('--leads', type=int, default=8,
+                        help='number of forecast leads')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of times to repeat each timing')
+    args = parser.parse_args()
+
+    config = get_config(args.years, args.leads)
+    num_times = len(time_looping.get_run_times(config)[2])
+    print(f'{num_times} run times, {args.leads} forecast leads')
+
+    for name, clear in (('computed once', False), ('computed every call', True)):
+        time_looping.clear_time_looping_cache()
+        best = min(timeit.repeat(lambda: loop_over_leads(config, clear),
+                                 number=1, repeat=args.repeat))
+        print(f'{name}: {best:.2f} sec')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import os
+
+from metplus.wrappers import cyclone_plotter_wrapper
+from metplus.wrappers.cyclone_plotter_wrapper import CyclonePlotterWrapper
+
+pd = pytest.importorskip('pandas')
+
+COLUMNS = ['AMODEL', 'STORM_ID', 'INIT', 'LEAD', 'VALID', 'ALAT', 'ALON']
+
+
+def get_tcst_file(config, filename):
+    return os.path.join(config.getdir('METPLUS_BASE'), 'internal', 'tests',
+                        'data', 'stat_data', filename)
+
+
+@pytest.mark.parametrize(
+    'lons, tracks, expected', [
+        # crosses date line heading east
+        ([170, 179, -179, -170], None, [170, 179, 181, 190]),
+        # crosses date line heading west
+        ([-170, -179, 179, 170], None, [-170, -179, -181, -190]),
+        # each track is unwrapped separately
+        ([179, -179, -179, 179], ['A', 'A', 'B', 'B'], [179, 181, -179, -181]),
+        # points of a track do not need to be next to each other
+        ([179, -179, -178, 175], ['A', 'B', 'A', 'B'], [179, -179, 182, -185]),
+        ([], None, []),
+    ]
+)
+@pytest.mark.plotting
+def test_unwrap_longitudes(lons, tracks, expected):
+    actual = cyclone_plotter_wrapper.unwrap_longitudes(lons, tracks)
+    assert list(actual) == expected
+
+
+@pytest.mark.plotting
+def test_sanitize_lonlist():
+    lons = [175.0, -178.5, -170.0]
+    assert CyclonePlotterWrapper.sanitize_lonlist(lons) == [175.0, 181.5,
+                                                            190.0]
+
+
+@pytest.mark.parametrize(
+    'use_cache', [False, True]
+)
+@pytest.mark.plotting
+def test_read_tcst_file(metplus_config, tmp_path, use_cache):
+    in_file = tmp_path / 'track.tcst'
+    with open(get_tcst_file(metplus_config, 'fake_filter_20141214_00.tcst'),
+              'r') as file_handle:
+        in_file.write_text(file_handle.read())
+
+    cache_dir = str(tmp_path / 'cache') if use_cache else None
+    df = cyclone_plotter_wrapper.read_tcst_file(str(in_file), COLUMNS,
+                                                cache_dir)
+    assert sorted(df.columns) == sorted(COLUMNS)
+    assert not df.empty
+
+    if not use_cache:
+        assert not (tmp_path / 'cache').exists()
+        return
+
+    # cached data is read instead of the file
+    cache_files = os.listdir(cache_dir)
+    assert len(cache_files) == 1
+    cached = pd.read_pickle(os.path.join(cache_dir, cache_files[0]))
+    cached.loc[0, 'AMODEL'] = 'CACHED'
+    cached.to_pickle(os.path.join(cache_dir, cache_files[0]))
+    df = cyclone_plotter_wrapper.read_tcst_file(str(in_file), COLUMNS,
+                                                cache_dir)
+    assert df.loc[0, 'AMODEL'] == 'CACHED'
+
+    # cache is replaced when the file changes
+    with open(in_file, 'a') as file_handle:
+        file_handle.write('\n')
+    df = cyclone_plotter_wrapper.read_tcst_file(str(in_file), COLUMNS,
+                                                cache_dir)
+    assert df.loc[0, 'AMODEL'] != 'CACHED'
+    assert len(os.listdir(cache_dir)) == 1
+
+
+@pytest.mark.plotting
+def test_read_tcst_file_empty(metplus_config):
+    in_file = get_tcst_file(metplus_config, 'empty_filter.tcst')
+    df = cyclone_plotter_wrapper.read_tcst_file(in_file, COLUMNS)
+    assert df.empty
@@ -4,6 +4,7 @@ import pytest
 
 from pathlib import Path
 import os
+import sys
 import shutil
 from subprocess import run
 
@@ -46,6 +47,43 @@ def test_run_metplus_check_return_code(command, expected_return_code):
         shutil.rmtree(NEW_OUTPUT_BASE)
 
 
+@pytest.mark.run_metplus
+def test_wrappers_imported_when_used():
+    """! Check that only the wrappers that are used and the wrappers that
+    they inherit from are imported
+    """
+    code = ('import sys, metplus; '
+            'metplus.wrappers.PCPCombineWrapper; '
+            'print(sorted(name.split(".")[-1] for name in sys.modules '
+            'if name.startswith("metplus.wrappers.")))')
+    process = run([sys.executable, '-c', code], cwd=METPLUS_DIR,
+                  capture_output=True, text=True)
+    assert process.returncode == 0
+    assert process.stdout.split() == ["['command_builder',",
+                                      "'command_runner',",
+                                      "'pcp_combine_wrapper',",
+                                      "'reformat_gridded_wrapper']"]
+
+
+@pytest.mark.run_metplus
+def test_wrappers_all_lists_lazy_wrappers():
+    """! Check that importing metplus does not import any wrappers and that
+    the wrappers are listed in __all__ so they can be imported with *
+    """
+    code = ('import sys, metplus; '
+            'print(any(name.startswith("metplus.wrappers.") '
+            'for name in sys.modules)); '
+            'from metplus.wrappers import *; '
+            'print(GridStatWrapper.__name__, '
+            '"CommandBuilder" in metplus.wrappers.__all__, '
+            '"PCPCombineWrapper" in dir(metplus.wrappers))')
+    process = run([sys.executable, '-c', code], cwd=METPLUS_DIR,
+                  capture_output=True, text=True)
+    assert process.returncode == 0
+    assert process.stdout.split() == ['False', 'GridStatWrapper', 'True',
+                                      'True']
+
+
 @pytest.mark.run_metplus
 def test_output_dir_is_created():
     """! Check that the test output directory was created after running tests
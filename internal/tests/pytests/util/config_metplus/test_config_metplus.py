@@ -933,3 +933,26 @@ def test_parse_var_list_double_digit(metplus_config):
     for n, var_item in enumerate(var_list, start=1):
         assert var_item['fcst_name'] == f'fcst_name{n}'
         assert var_item['obs_name'] == f'obs_name{n}'
+
+
+@pytest.mark.util
+def test_log_queue(metplus_config):
+    config = metplus_config
+    listener = config.log_listener
+    assert listener is not None
+
+    messages = [f'queued message {index}' for index in range(100)]
+    for message in messages:
+        config.logger.info(message)
+
+    config.flush_log()
+    with open(config.getstr('config', 'LOG_METPLUS'), 'r') as file_handle:
+        lines = [line for line in file_handle if 'queued message' in line]
+    assert [line.split(': ', 1)[1].strip() for line in lines] == messages
+
+    # stopping the listener writes messages that are still in the queue
+    config.logger.info('last message')
+    listener.stop()
+    listener.stop()
+    with open(config.getstr('config', 'LOG_METPLUS'), 'r') as file_handle:
+        assert file_handle.read().rstrip().endswith('last message')
@@ -170,3 +170,56 @@ def test_sub_var_list(metplus_config, input_dict, expected_list):
     for actual, expected in zip(actual_list, expected_list):
         for key, value in expected.items():
             assert actual.get(key) == value
+
+
+@pytest.mark.util
+def test_command_journal(metplus_config, tmp_path):
+    from metplus.wrappers.command_builder import CommandBuilder
+    config = metplus_config
+    config.set('user_env_vars', 'USER_VAR', 'user "value"')
+
+    envs = ({'A': '1', 'B': '2'}, {'A': '1', 'B': '3'}, {'C': 'x\ny'},
+            {'D': '4'})
+
+    def run_commands(wrapper):
+        for index, env in enumerate(envs):
+            wrapper.clear()
+            for key, value in env.items():
+                wrapper.add_env_var(key, value)
+            # user env vars that were set for a previous command are only
+            # in the copyable environment of the last command
+            if index < 3:
+                wrapper.set_user_environment({})
+            wrapper.run_command(f'cmd {index}')
+
+    wrapper = CommandBuilder(config)
+    run_commands(wrapper)
+    expected = wrapper.all_commands
+
+    # commands written to the journal are not kept in memory
+    journal = CommandJournal(str(tmp_path / 'journal'))
+    config.command_journal = journal
+    wrapper = CommandBuilder(config)
+    run_commands(wrapper)
+    journal.close()
+    assert not wrapper.all_commands
+    assert journal.count == 4
+
+    # only changed environment variables are written for each command
+    with open(journal.path, 'r') as file_handle:
+        lines = file_handle.read().splitlines()
+    assert '"A"' not in lines[1] and '"B": "3"' in lines[1]
+    assert '"unset": ["A", "B"]' in lines[2]
+
+    assert list(read_command_journal(journal.path)) == expected
+
+    # incomplete last line from a run that stopped early is skipped
+    with open(journal.path, 'a') as file_handle:
+        file_handle.write('{"cmd": "cmd 3", "en')
+    assert list(read_command_journal(journal.path)) == expected
+
+    # all_commands file can be written from the journal
+    assert write_all_commands(read_command_journal(journal.path), config)
+    with open(get_all_commands_path(config), 'r') as file_handle:
+        assert file_handle.read().count('COMMAND:\n') == 4
+    assert not write_all_commands([], config)
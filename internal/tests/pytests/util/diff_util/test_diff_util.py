@@ -3,7 +3,9 @@ import pytest
 from netCDF4 import Dataset
 import os
 import shutil
+from types import SimpleNamespace
 from unittest import mock
+import numpy as np
 from PIL import Image
 
 from metplus.util import diff_util as du
@@ -364,6 +366,151 @@ def test_nc_is_equal(
         _statment_in_capfd(capfd, check_print)
 
 
+@pytest.mark.parametrize(
+    "chunk_size, change_index, expected", [
+        (1, None, True),
+        (1, (2, 1, 1), False),
+        (7, (0, 0, 0), False),
+        (7, (2, 2, 1), False),
+        (du.NC_CHUNK_SIZE, (1, 2, 0), False),
+    ]
+)
+@pytest.mark.util
+def test_nc_is_equal_chunked(capfd, tmp_path_factory, dummy_nc1, chunk_size,
+                             change_index, expected):
+    data = [[list(row) for row in level] for level in DEFAULT_NC[3]]
+    if change_index:
+        x, y, z = change_index
+        data[x][y][z] += 0.5
+    dummy_nc2 = make_nc(tmp_path_factory.mktemp("data2"), DEFAULT_NC[0],
+                        DEFAULT_NC[1], DEFAULT_NC[2], data, DEFAULT_NC[4])
+
+    with mock.patch.object(du, 'NC_CHUNK_SIZE', chunk_size):
+        assert du.nc_is_equal(dummy_nc1, dummy_nc2, debug=True) == expected
+
+    if change_index:
+        # index of the value in the flattened variable is reported
+        x, y, z = change_index
+        _statment_in_capfd(capfd, ["ERROR: Field (Temp) values differ",
+                                   f"{x * 6 + y * 2 + z}: -0.5",
+                                   "Min diff: -0.5, Max diff: -0.5"])
+
+
+@pytest.mark.util
+def test_nc_is_equal_nan(tmp_path_factory):
+    data_a = [[[1, 2], [3, float('nan')], [5, 6]]] * 3
+    data_b = [[[1, 2], [3, float('nan')], [5, 6.0000001]]] * 3
+    nc_a = make_nc(tmp_path_factory.mktemp("data_a"), *DEFAULT_NC[0:3],
+                   data_a, DEFAULT_NC[4])
+    nc_b = make_nc(tmp_path_factory.mktemp("data_b"), *DEFAULT_NC[0:3],
+                   data_b, DEFAULT_NC[4])
+    assert du.nc_is_equal(nc_a, nc_b)
+
+    data_b = [[[1, 2], [3, 4], [5, 6]]] * 3
+    nc_b = make_nc(tmp_path_factory.mktemp("data_b"), *DEFAULT_NC[0:3],
+                   data_b, DEFAULT_NC[4])
+    assert not du.nc_is_equal(nc_a, nc_b)
+
+
+@pytest.mark.parametrize(
+    "value_a, value_b, nan_index, expected", [
+        # values within rounding precision only equal if field has NaN
+        (1.0000001, 1.0000002, (2, 2, 1), True),
+        (1.0000001, 1.0000002, None, False),
+        # values that differ after rounding are not equal
+        (1.000004, 1.000014, (2, 2, 1), False),
+        (1.000004, 1.000014, None, False),
+    ]
+)
+@pytest.mark.util
+def test_nc_is_equal_nan_rounding(tmp_path_factory, value_a, value_b,
+                                  nan_index, expected):
+    data_a = [[[1.5, 2], [3, 4], [5, 6]] for _ in range(3)]
+    data_b = [[[1.5, 2], [3, 4], [5, 6]] for _ in range(3)]
+    data_a[0][0][0] = value_a
+    data_b[0][0][0] = value_b
+    if nan_index:
+        x, y, z = nan_index
+        data_a[x][y][z] = data_b[x][y][z] = float('nan')
+
+    nc_a = make_nc(tmp_path_factory.mktemp("data_a"), *DEFAULT_NC[0:3],
+                   data_a, DEFAULT_NC[4])
+    nc_b = make_nc(tmp_path_factory.mktemp("data_b"), *DEFAULT_NC[0:3],
+                   data_b, DEFAULT_NC[4])
+    with mock.patch.object(du, 'rounding_precision',
+                           du.DEFAULT_ROUNDING_PRECISION):
+        assert du.nc_is_equal(nc_a, nc_b) == expected
+
+
+@pytest.mark.parametrize(
+    "chunk_size", [2, 4, 8]
+)
+@pytest.mark.parametrize(
+    "nan_row, expected", [
+        (0, True),
+        (3, True),
+        (None, False),
+    ]
+)
+@pytest.mark.util
+def test_nc_fields_are_equal_nan_any_slab(chunk_size, nan_row, expected):
+    values_a = np.arange(8, dtype=np.float32).reshape(4, 2)
+    values_b = values_a.copy()
+    values_a[1, 0] = 1.0000001
+    values_b[1, 0] = 1.0000002
+    if nan_row is not None:
+        values_a[nan_row, 1] = values_b[nan_row, 1] = np.nan
+
+    nc_a = SimpleNamespace(variables={'Temp': values_a})
+    nc_b = SimpleNamespace(variables={'Temp': values_b})
+    # result does not depend on which slab contains NaN
+    with mock.patch.object(du, 'NC_CHUNK_SIZE', chunk_size), \
+            mock.patch.object(du, 'rounding_precision',
+                              du.DEFAULT_ROUNDING_PRECISION):
+        assert du._nc_fields_are_equal('Temp', nc_a, nc_b) == expected
+
+
+@pytest.mark.parametrize(
+    "processes", [1, 2]
+)
+@pytest.mark.diff
+def test_compare_dir_processes(capsys, tmp_path_factory, processes):
+    a_files = {
+        'same.txt': ['some', 'text'],
+        'sub/diff.txt': ['some', 'text'],
+        'sub/only_a.txt': ['text'],
+        'file_list.csv': [csv_header, csv_val_1],
+    }
+    b_files = {
+        'same.txt': ['some', 'text'],
+        'sub/diff.txt': ['other', 'text'],
+        'only_b.txt': ['text'],
+        'file_list.csv': [csv_header, csv_val_2],
+    }
+    a_dir, b_dir = create_diff_files(tmp_path_factory, a_files, b_files)
+    diff_files = du.compare_dir(str(a_dir), str(b_dir), processes=processes)
+    output = capsys.readouterr().out
+
+    # same differences are found as a serial run
+    expected = [
+        (str(a_dir / 'file_list.csv'), str(b_dir / 'file_list.csv'),
+         'CSV diff'),
+        (str(a_dir / 'sub/diff.txt'), str(b_dir / 'sub/diff.txt'),
+         'Text diff'),
+        (str(a_dir / 'sub/only_a.txt'), '',
+         'file not found (in truth but missing now)'),
+        ('', str(b_dir / 'only_b.txt'), 'file not found (new output)'),
+    ]
+    assert sorted(item[:3] for item in diff_files) == sorted(expected)
+
+    # output of each comparison is printed in the order files were found
+    serial_order = [line for line in output.splitlines()
+                    if line.startswith('COMPARING')]
+    assert serial_order == [f'COMPARING {os.path.relpath(path, a_dir)}'
+                            for path in du._get_files(str(a_dir))]
+    assert 'Summary:' in output
+
+
 @pytest.mark.parametrize(
     "val,expected",[
     # Add (numpy.float32(44.54), True) if numpy available as this
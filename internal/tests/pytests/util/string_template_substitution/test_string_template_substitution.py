@@ -4,10 +4,14 @@ import pytest
 
 import datetime
 import os
+from unittest import mock
 
 from metplus.util import do_string_sub, parse_template, get_time_from_file
 from metplus.util import get_tags,format_one_time_item, format_hms
 from metplus.util import add_to_dict, populate_match_dict, get_fmt_info
+from metplus.util import get_files_in_time_range, get_file_time_index
+from metplus.util import clear_file_time_index, invalidate_file_cache
+from metplus.util import get_template_matcher, enable_file_cache
 
 
 @pytest.mark.util
@@ -672,3 +676,119 @@ def test_get_time_from_file(filepath, template, expected_result):
         assert expected_result is None
     else:
         assert result['valid'] == expected_result
+
+
+@pytest.mark.util
+def test_get_files_in_time_range(tmp_path):
+    clear_file_time_index()
+    template = '{valid?fmt=%Y%m%d}/file.{valid?fmt=%Y%m%d%H}.nc'
+    data_dir = str(tmp_path)
+    for day, hours in (('20240101', (0, 6, 12)), ('20240102', (0,))):
+        os.makedirs(os.path.join(data_dir, day))
+        for hour in hours:
+            open(os.path.join(data_dir, day, f'file.{day}{hour:02d}.nc'),
+                 'w').close()
+    open(os.path.join(data_dir, '20240101', 'other.txt'), 'w').close()
+
+    index = get_file_time_index(data_dir, template)
+    assert index['times'] == sorted(index['times'])
+    assert len(index['paths']) == 4
+
+    lower = datetime.datetime(2024, 1, 1, 6)
+    upper = datetime.datetime(2024, 1, 2, 0)
+    found = get_files_in_time_range(data_dir, template, lower, upper)
+    assert sorted(os.path.basename(path) for _, path in found) == [
+        'file.2024010106.nc', 'file.2024010112.nc', 'file.2024010200.nc'
+    ]
+
+    # index is reused if directories have not changed
+    invalidate_file_cache()
+    assert get_file_time_index(data_dir, template) is index
+
+    # index is rebuilt if a file is added by a command
+    open(os.path.join(data_dir, '20240101', 'file.2024010118.nc'), 'w').close()
+    invalidate_file_cache()
+    found = get_files_in_time_range(data_dir, template, lower, upper)
+    assert len(found) == 4
+    assert get_file_time_index(data_dir, template) is not index
+    clear_file_time_index()
+
+
+@pytest.mark.parametrize(
+    'file_cache', [False, True]
+)
+@pytest.mark.util
+def test_get_file_time_index_file_cache(tmp_path, file_cache):
+    clear_file_time_index()
+    enable_file_cache(file_cache)
+    template = 'file.{valid?fmt=%Y%m%d%H}.nc'
+    data_dir = str(tmp_path)
+    open(os.path.join(data_dir, 'file.2024010100.nc'), 'w').close()
+    try:
+        index = get_file_time_index(data_dir, template)
+
+        # directories are only skipped if the file cache is enabled
+        with mock.patch('os.stat', side_effect=os.stat) as mock_stat:
+            assert get_file_time_index(data_dir, template) is index
+        assert mock_stat.called != file_cache
+
+        # file written outside of METplus is found if the cache is disabled
+        open(os.path.join(data_dir, 'file.2024010106.nc'), 'w').close()
+        assert len(get_file_time_index(data_dir, template)['paths']) == (
+            1 if file_cache else 2
+        )
+    finally:
+        enable_file_cache(False)
+        clear_file_time_index()
+
+
+@pytest.mark.parametrize(
+    'template, filepaths, expected', [
+        ('file.{valid?fmt=%Y%m%d%H}.nc',
+         ['file.2024010112.nc', 'file.bad.nc', 'other.2024010112.nc'],
+         [datetime.datetime(2024, 1, 1, 12), None, None]),
+        ('{init?fmt=%Y%m%d}/f{lead?fmt=%3H}.grb',
+         ['20240101/f012.grb', '20240101/f1234.grb'],
+         [datetime.datetime(2024, 1, 1, 12),
+          datetime.datetime(2024, 2, 21, 10)]),
+        ('{valid?fmt=%Y%m%d?shift=-1H}_{valid?fmt=%Y}',
+         ['20240101_2024', '20240101_2023'],
+         [datetime.datetime(2024, 1, 1, 1), None]),
+    ]
+)
+@pytest.mark.util
+def test_template_matcher_match_many(template, filepaths, expected):
+    matcher = get_template_matcher(template)
+    # matcher is reused for the same template
+    assert get_template_matcher(template) is matcher
+
+    results = matcher.match_many(filepaths)
+    assert [None if result is None else result['valid']
+            for result in results] == expected
+
+    # results are the same as parse_template
+    for filepath, result in zip(filepaths, results):
+        assert parse_template(template, filepath) == result
+
+
+@pytest.mark.util
+def test_do_string_sub_cached_results():
+    template = 'file.{valid?fmt=%Y%m%d%H}.{lead?fmt=%3H}.{custom}'
+    valid = datetime.datetime(2024, 1, 1, 12)
+    expected = 'file.2024010112.003.mem1'
+    for _ in range(2):
+        assert do_string_sub(template, valid=valid, lead=10800,
+                             custom='mem1') == expected
+
+    # values that are equal but have different types are not mixed up
+    assert do_string_sub('{value}', value=1) == '1S'
+    assert do_string_sub('{value}', value=True) == 'TrueS'
+
+    # unhashable values are substituted without using the cache
+    assert do_string_sub('{value}', value='a', other=['b']) == 'a'
+
+    # missing values still raise an error unless they are skipped
+    with pytest.raises(TypeError):
+        do_string_sub(template, valid=valid, lead=10800)
+    assert (do_string_sub(template, valid=valid, skip_missing_tags=True) ==
+            'file.2024010112.{lead?fmt=%3H}.{custom}')
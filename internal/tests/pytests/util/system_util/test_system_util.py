@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import pytest
+import glob
 
 from metplus.util.system_util import *
 
@@ -70,6 +71,39 @@ def test_get_storms(metplus_config, filename, expected_result):
         assert storm_dict['header'].split()[storm_id_index] == 'STORM_ID'
 
 
+@pytest.mark.util
+def test_get_storms_exact_match(tmp_path):
+    filepath = tmp_path / 'filter.tcst'
+    lines = [
+        'AMODEL BMODEL STORM_ID\n',
+        'AL01 BEST AL0112014\n',
+        'AL01 BEST AL01\n',
+        'AL0112014 BEST AL01\n',
+    ]
+    filepath.write_text(''.join(lines))
+
+    # lines are only assigned to the storm in the STORM_ID column
+    storm_dict = get_storms(str(filepath))
+    assert list(storm_dict.keys()) == ['header', 'AL01', 'AL0112014']
+    assert storm_dict['header'] == lines[0]
+    assert storm_dict['AL01'] == [lines[2], lines[3]]
+    assert storm_dict['AL0112014'] == [lines[1]]
+
+    # changes to the returned lists do not change the cached result
+    storm_dict['AL01'].clear()
+    assert get_storms(str(filepath))['AL01'] == [lines[2], lines[3]]
+
+    # file is read again if it changes
+    filepath.write_text(''.join(lines[:2]))
+    assert get_storms(str(filepath), id_only=True) == ['AL0112014']
+
+    header, groups = group_lines_by_column(str(filepath), 'BMODEL',
+                                           use_cache=False)
+    assert header == lines[0]
+    assert groups == {'BEST': [lines[1]]}
+    assert group_lines_by_column(str(filepath), 'FAKE') == (None, None)
+
+
 @pytest.mark.util
 def test_get_storms_mtd(metplus_config):
     index = 23
@@ -157,3 +191,152 @@ def test_preprocess_file_options(metplus_config,
         expected = filename
     result = preprocess_file(filename, data_type, config, allow_dir)
     assert result == expected
+
+
+@pytest.mark.parametrize(
+    'threads', [1, 3]
+)
+@pytest.mark.util
+def test_preprocess_files_reuse_and_limit(metplus_config, tmp_path, threads):
+    import gzip
+    import time
+    config = metplus_config
+    stage_dir = str(tmp_path / 'stage')
+    config.set('config', 'STAGING_DIR', stage_dir)
+    config.set('config', 'STAGING_DECOMPRESS_THREADS', threads)
+
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    filenames = []
+    for index in range(3):
+        filename = str(data_dir / f'file{index}.txt')
+        with gzip.open(f'{filename}.gz', 'wb') as file_handle:
+            file_handle.write(f'content{index}\n'.encode() * 60000)
+        filenames.append(filename)
+
+    outpaths = preprocess_files(filenames, None, config)
+    assert outpaths == [stage_dir + filename for filename in filenames]
+    for index, outpath in enumerate(outpaths):
+        with open(outpath, 'r') as file_handle:
+            assert file_handle.read() == f'content{index}\n' * 60000
+    assert not [path for path in os.listdir(os.path.dirname(outpaths[0]))
+                if path.endswith('.tmp')]
+
+    # staged file is reused if compressed file is unchanged
+    mtime = os.stat(outpaths[0]).st_mtime_ns
+    with open(outpaths[0], 'a') as file_handle:
+        file_handle.write('reused')
+    os.utime(outpaths[0], ns=(time.time_ns(), mtime))
+    assert preprocess_file(filenames[0], None, config) == outpaths[0]
+    with open(outpaths[0], 'r') as file_handle:
+        assert file_handle.read().endswith('reused')
+
+    # staged file is uncompressed again if compressed file changed
+    os.utime(f'{filenames[0]}.gz', ns=(mtime + 10**9, mtime + 10**9))
+    assert preprocess_file(filenames[0], None, config) == outpaths[0]
+    with open(outpaths[0], 'r') as file_handle:
+        assert not file_handle.read().endswith('reused')
+
+    # least recently used files from other runs are removed to limit size
+    from metplus.util import system_util
+    system_util._STAGED_FILES_IN_USE.clear()
+    system_util._STAGED_FILES_FOR_NEXT_COMMAND.clear()
+    for index, outpath in enumerate(outpaths):
+        os.utime(outpath, ns=(index * 10**9, os.stat(outpath).st_mtime_ns))
+    config.set('config', 'STAGING_DIR_MAX_SIZE_MB', 1)
+    system_util._limit_staging_dir_size(config)
+    assert [os.path.exists(outpath) for outpath in outpaths] == [False, False,
+                                                                 True]
+    config.set('config', 'STAGING_DIR_MAX_SIZE_MB', 0)
+    system_util._STAGED_FILES_IN_USE.clear()
+    system_util._STAGED_FILES_FOR_NEXT_COMMAND.clear()
+
+
+@pytest.mark.util
+def test_limit_staging_dir_size_incremental(metplus_config, tmp_path):
+    import gzip
+    from unittest import mock
+    from metplus.util import system_util
+    config = metplus_config
+    stage_dir = str(tmp_path / 'stage')
+    config.set('config', 'STAGING_DIR', stage_dir)
+    config.set('config', 'STAGING_DIR_MAX_SIZE_MB', 1)
+
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    filenames = []
+    for index in range(4):
+        filename = str(data_dir / f'file{index}.txt')
+        with gzip.open(f'{filename}.gz', 'wb') as file_handle:
+            file_handle.write(f'content{index}\n'.encode() * 60000)
+        filenames.append(filename)
+    outpaths = [stage_dir + filename for filename in filenames]
+
+    try:
+        with mock.patch.object(system_util.os, 'walk',
+                               wraps=os.walk) as mock_walk:
+            # files staged for the next command are not removed
+            for filename in filenames[:3]:
+                preprocess_file(filename, None, config)
+            assert all(os.path.exists(outpath) for outpath in outpaths[:3])
+
+            # files that the command does not read can be removed
+            in_use = use_staged_files(config, outpaths[1:3] + ['/other'])
+            assert sorted(in_use) == outpaths[1:3]
+            preprocess_file(filenames[3], None, config)
+            assert [os.path.exists(outpath) for outpath in outpaths] == [
+                False, True, True, True
+            ]
+
+            # files are removed after the command that read them finishes
+            use_staged_files(config, outpaths[3:])
+            release_staged_files(in_use)
+            preprocess_file(filenames[0], None, config)
+            assert [os.path.exists(outpath) for outpath in outpaths] == [
+                True, False, False, True
+            ]
+
+        # staging directory is only read once
+        assert mock_walk.call_count == 1
+    finally:
+        config.set('config', 'STAGING_DIR_MAX_SIZE_MB', 0)
+        system_util._STAGED_FILES_IN_USE.clear()
+        system_util._STAGED_FILES_FOR_NEXT_COMMAND.clear()
+
+
+@pytest.mark.util
+def test_file_cache(tmp_path):
+    data_dir = tmp_path / 'data'
+    (data_dir / 'sub').mkdir(parents=True)
+    for name in ('a.nc', 'b.nc', '.hidden.nc', 'sub/c.nc'):
+        (data_dir / name).touch()
+
+    patterns = [str(data_dir / '*.nc'), str(data_dir / '*' / '*.nc'),
+                str(data_dir / '.*'), str(data_dir / '*' / ''),
+                str(data_dir / 'a.nc'), str(data_dir / 'missing' / '*')]
+    enable_file_cache()
+    try:
+        for pattern in patterns:
+            assert sorted(glob_paths(pattern)) == sorted(glob.glob(pattern))
+
+        new_file = data_dir / 'new.nc'
+        assert path_isdir(str(data_dir / 'sub'))
+        assert path_isfile(str(data_dir / 'a.nc'))
+        assert not path_exists(str(new_file))
+        hits, misses, _ = get_file_cache_stats()
+        assert hits > 0 and misses > 0
+
+        # file written after directory was read is not found until invalidated
+        new_file.touch()
+        assert not path_exists(str(new_file))
+        invalidate_path(str(new_file))
+        assert path_isfile(str(new_file))
+
+        # mkdir_p invalidates new directory and its parents
+        mkdir_p(str(data_dir / 'sub' / 'new_dir'))
+        assert path_isdir(str(data_dir / 'sub' / 'new_dir'))
+    finally:
+        enable_file_cache(False)
+
+    assert get_file_cache_stats() == (0, 0, 0)
+    assert path_exists(str(new_file))
@@ -1,4 +1,5 @@
 import pytest
+from unittest import mock
 
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
@@ -444,3 +445,74 @@ def test_get_lead_sequence_init_min_10(metplus_config):
     test_seq = get_lead_sequence(conf, input_dict)
     lead_seq = [12, 24]
     assert test_seq == [relativedelta(hours=lead) for lead in lead_seq]
+
+
+@pytest.mark.util
+def test_time_generator_cached(metplus_config):
+    config = metplus_config
+    clear_time_looping_cache()
+    config.set('config', 'LOOP_BY', 'INIT')
+    config.set('config', 'INIT_TIME_FMT', '%Y%m%d%H')
+    config.set('config', 'INIT_BEG', '2021020100')
+    config.set('config', 'INIT_END', '2021020112')
+    config.set('config', 'INIT_INCREMENT', '6H')
+
+    run_times = get_run_times(config)
+    assert run_times[2] == (datetime(2021, 2, 1, 0),
+                            datetime(2021, 2, 1, 6),
+                            datetime(2021, 2, 1, 12))
+    # same times are reused if the config values have not changed
+    assert get_run_times(config) is run_times
+
+    # each run time dictionary can be modified without changing the others
+    first = next(time_generator(config))
+    first['init'] = '*'
+    assert next(time_generator(config))['init'] == datetime(2021, 2, 1, 0)
+
+    # new times are computed if the config values change
+    config.set('config', 'INIT_INCREMENT', '12H')
+    assert [item['init'] for item in time_generator(config)] == [
+        datetime(2021, 2, 1, 0), datetime(2021, 2, 1, 12)
+    ]
+
+
+@pytest.mark.util
+def test_get_lead_sequence_cached(metplus_config):
+    config = metplus_config
+    clear_time_looping_cache()
+    config.set('config', 'LEAD_SEQ', '3, 6')
+
+    lead_seq = get_lead_sequence(config)
+    assert lead_seq == [relativedelta(hours=3), relativedelta(hours=6)]
+
+    # returned list can be modified without changing the cached leads
+    lead_seq.append(relativedelta(hours=9))
+    assert get_lead_sequence(config) == [relativedelta(hours=3),
+                                         relativedelta(hours=6)]
+
+    config.set('config', 'LEAD_SEQ_MAX', '3')
+    assert get_lead_sequence(config) == [relativedelta(hours=3)]
+
+    config.set('config', 'LEAD_SEQ', '')
+    assert get_lead_sequence(config) == [0]
+    assert get_lead_sequence(config, wildcard_if_empty=True) == ['*']
+
+
+@pytest.mark.util
+def test_get_lead_sequence_cached_interpolated(metplus_config):
+    config = metplus_config
+    clear_time_looping_cache()
+    config.set('config', 'MY_LEADS', '3, 6')
+    config.set('config', 'LEAD_SEQ', '{MY_LEADS}')
+
+    with mock.patch.object(config, 'keys', wraps=config.keys) as mock_keys:
+        assert get_lead_sequence(config) == [relativedelta(hours=3),
+                                             relativedelta(hours=6)]
+        # leads are recomputed if a referenced variable changes
+        config.set('config', 'MY_LEADS', '12')
+        assert get_lead_sequence(config) == [relativedelta(hours=12)]
+
+        # config keys are not searched when cached leads are reused
+        mock_keys.reset_mock()
+        assert get_lead_sequence(config) == [relativedelta(hours=12)]
+        assert mock_keys.call_count == 0
@@ -6,6 +6,7 @@ import os
 import datetime
 
 from metplus.wrappers.command_builder import CommandBuilder
+from metplus.wrappers.command_runner import CommandPool
 from metplus.util import ti_calculate, add_field_info_to_time_info
 
 
@@ -912,3 +913,389 @@ def test_find_and_check_output_file_skip(metplus_config, exists, skip, is_dir,
 
     # cast result to bool because None isn't equal to False
     assert bool(result) == run
+
+
+@pytest.mark.parametrize(
+    'max_parallel, allow_concurrent, is_concurrent', [
+        (1, True, False),
+        (4, False, False),
+        (4, True, True),
+    ]
+)
+@pytest.mark.wrapper
+def test_run_command_concurrent(metplus_config, max_parallel,
+                                allow_concurrent, is_concurrent):
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'LOG_MET_OUTPUT_TO_METPLUS', False)
+    config.set('config', 'METPLUS_MAX_PARALLEL_COMMANDS', max_parallel)
+
+    class ConcurrentWrapper(CommandBuilder):
+        ALLOW_CONCURRENT_COMMANDS = allow_concurrent
+
+        def __init__(self, config):
+            self.app_name = 'concurrent'
+            super().__init__(config)
+
+    wrapper = ConcurrentWrapper(config)
+    assert wrapper.cmdrunner.is_concurrent == is_concurrent
+
+    commands = ['sleep 0.2', 'false', 'true', 'echo done']
+    for index, cmd in enumerate(commands):
+        wrapper.add_env_var('INDEX', index)
+        wrapper.run_command(cmd)
+
+    # commands are listed in the order they were submitted
+    assert [cmd for cmd, _ in wrapper.all_commands] == commands
+
+    wrapper.wait_for_commands()
+    assert wrapper.errors == 1
+
+    # output of each command is written to the log file without interleaving
+    log_path = wrapper.cmdrunner.get_log_path('concurrent.log')
+    with open(log_path, 'r') as file_handle:
+        content = file_handle.read()
+    for index, cmd in enumerate(commands):
+        assert f'INDEX="{index}"' in content
+        assert f'COMMAND:\n{cmd}\n\nOUTPUT:\n' in content
+    assert 'OUTPUT:\ndone\n' in content
+    assert not [item for item in os.listdir(os.path.dirname(log_path))
+                if item.endswith('.tmp')]
+
+
+@pytest.mark.parametrize(
+    'upstream_fails', [
+        False,
+        True,
+    ]
+)
+@pytest.mark.wrapper
+def test_run_command_shared_pool(metplus_config, upstream_fails):
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'LOG_MET_OUTPUT_TO_METPLUS', False)
+    config.set('config', 'METPLUS_MAX_PARALLEL_COMMANDS', 2)
+
+    class ConcurrentWrapper(CommandBuilder):
+        ALLOW_CONCURRENT_COMMANDS = True
+
+        def __init__(self, config, app_name):
+            self.app_name = app_name
+            super().__init__(config)
+
+    upstream = ConcurrentWrapper(config, 'upstream')
+    downstream = ConcurrentWrapper(config, 'downstream')
+    pool = CommandPool(2)
+    upstream.cmdrunner.pool = pool
+    downstream.cmdrunner.pool = pool
+
+    out_dir = os.path.join(config.getdir('OUTPUT_BASE'), 'shared_pool')
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, 'upstream.txt')
+    if os.path.exists(out_path):
+        os.remove(out_path)
+
+    upstream.outdir = out_dir
+    upstream.outfile = 'upstream.txt'
+    exit_cmd = 'false' if upstream_fails else 'true'
+    upstream.run_command(f'sleep 0.3; echo written > {out_path}; {exit_cmd}')
+
+    # file that will be written by the upstream command is treated as found
+    assert upstream.cmdrunner.is_pending_output(out_path)
+    found = downstream._check_that_files_exist([(out_path, 'template')],
+                                               '', False, True, True)
+    assert found == [out_path]
+
+    # downstream command waits for the upstream command to finish
+    downstream.run_command(f'cat {out_path}')
+
+    assert upstream.wait_for_commands() != upstream_fails
+    assert downstream.wait_for_commands() != upstream_fails
+    assert downstream.errors == int(upstream_fails)
+
+    if upstream_fails:
+        return
+
+    log_path = downstream.cmdrunner.get_log_path('downstream.log')
+    with open(log_path, 'r') as file_handle:
+        assert 'OUTPUT:\nwritten\n' in file_handle.read()
+    assert not upstream.cmdrunner.is_pending_output(out_path)
+
+
+@pytest.mark.wrapper
+def test_run_command_ledger(metplus_config, tmp_path):
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'LOG_MET_OUTPUT_TO_METPLUS', False)
+    config.set('config', 'METPLUS_RUN_LEDGER', True)
+    config.set('config', 'METPLUS_RUN_LEDGER_FILE',
+               str(tmp_path / 'ledger.db'))
+
+    in_path = tmp_path / 'input.txt'
+    in_path.write_text('input\n')
+    out_path = tmp_path / 'output.txt'
+    count_path = tmp_path / 'count.txt'
+    cmd = f'cat {in_path} > {out_path}; echo run >> {count_path}'
+
+    def run_wrapper():
+        wrapper = CommandBuilder(config)
+        wrapper.outdir = str(tmp_path)
+        wrapper.outfile = 'output.txt'
+        wrapper.add_env_var('LEDGER_VAR', 'value')
+        assert wrapper.run_command(cmd)
+        return len(count_path.read_text().splitlines())
+
+    assert run_wrapper() == 1
+
+    # command is skipped if nothing changed since it completed
+    assert run_wrapper() == 1
+
+    # command runs again if the input changes
+    in_path.write_text('changed input\n')
+    assert run_wrapper() == 2
+    assert run_wrapper() == 2
+
+    # command runs again if the output is removed
+    os.remove(out_path)
+    assert run_wrapper() == 3
+    assert out_path.read_text() == 'changed input\n'
+    assert run_wrapper() == 3
+
+
+@pytest.mark.wrapper
+def test_run_command_ledger_file_list_output_dir(metplus_config, tmp_path):
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'LOG_MET_OUTPUT_TO_METPLUS', False)
+    config.set('config', 'METPLUS_RUN_LEDGER', True)
+    config.set('config', 'METPLUS_RUN_LEDGER_FILE',
+               str(tmp_path / 'ledger.db'))
+
+    in_path = tmp_path / 'input.txt'
+    in_path.write_text('input\n')
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    count_path = tmp_path / 'count.txt'
+
+    def run_wrapper(timestamp):
+        # file list is written to a different path for each run
+        list_path = tmp_path / f'file_list_{timestamp}.txt'
+        list_path.write_text(f'file_list\n{in_path}\n')
+        cmd = (f'cat {list_path} > /dev/null; '
+               f'cp {in_path} {out_dir}/output.txt; '
+               f'echo run >> {count_path}')
+        wrapper = CommandBuilder(config)
+        wrapper.outdir = str(out_dir)
+        assert wrapper.run_command(cmd)
+        return len(count_path.read_text().splitlines())
+
+    assert run_wrapper('run1') == 1
+    assert run_wrapper('run2') == 1
+
+    # other files written to the output directory do not cause a rerun
+    (out_dir / 'other.txt').write_text('other\n')
+    assert run_wrapper('run3') == 1
+
+    # command runs again if a file in the file list changes
+    in_path.write_text('changed input\n')
+    assert run_wrapper('run4') == 2
+
+    # command runs again if a file it wrote is removed
+    os.remove(out_dir / 'output.txt')
+    assert run_wrapper('run5') == 3
+    assert run_wrapper('run6') == 3
+
+
+@pytest.mark.wrapper
+def test_run_command_ledger_referenced_files(metplus_config, tmp_path):
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'LOG_MET_OUTPUT_TO_METPLUS', False)
+    config.set('config', 'METPLUS_RUN_LEDGER', True)
+    config.set('config', 'METPLUS_RUN_LEDGER_FILE',
+               str(tmp_path / 'ledger.db'))
+
+    climo_path = tmp_path / 'climo.nc'
+    climo_path.write_text('climo\n')
+    mask_path = tmp_path / 'mask.nc'
+    mask_path.write_text('mask\n')
+    config_path = tmp_path / 'MetConfig'
+    config_path.write_text(f'mask = {{ poly = ["{mask_path}"]; }}\n'
+                           '${METPLUS_CLIMO_MEAN}\n')
+    out_path = tmp_path / 'output.txt'
+    count_path = tmp_path / 'count.txt'
+    cmd = (f'echo -config {config_path} > {out_path}; '
+           f'echo run >> {count_path}')
+
+    def run_wrapper():
+        wrapper = CommandBuilder(config)
+        wrapper.outdir = str(tmp_path)
+        wrapper.outfile = 'output.txt'
+        wrapper.add_env_var('METPLUS_CLIMO_MEAN',
+                            f'climo_mean = {{file_name = ["{climo_path}"];}}')
+        assert wrapper.run_command(cmd)
+        return len(count_path.read_text().splitlines())
+
+    assert run_wrapper() == 1
+    assert run_wrapper() == 1
+
+    # command runs again if a file set in an environment variable changes
+    climo_path.write_text('changed climo\n')
+    assert run_wrapper() == 2
+    assert run_wrapper() == 2
+
+    # command runs again if a file set in the config file changes
+    mask_path.write_text('changed mask\n')
+    assert run_wrapper() == 3
+    assert run_wrapper() == 3
+
+
+@pytest.mark.wrapper
+def test_run_command_log_order(metplus_config):
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'LOG_MET_OUTPUT_TO_METPLUS', True)
+
+    wrapper = CommandBuilder(config)
+    wrapper.logger.info('before command')
+    assert wrapper.run_command('echo command output')
+    wrapper.logger.info('after command')
+    config.flush_log()
+
+    with open(config.getstr('config', 'LOG_METPLUS'), 'r') as file_handle:
+        lines = file_handle.read().splitlines()
+    keys = ['before command', 'COMMAND: echo', 'OUTPUT:',
+            'Finished running echo', 'after command']
+    indices = [next(index for index, line in enumerate(lines) if key in line)
+               for key in keys]
+    # output of the command is written between the header and final message
+    indices.insert(3, lines.index('command output'))
+    assert indices == sorted(indices)
+
+
+@pytest.mark.wrapper
+def test_set_environment_variables_debug_not_built(metplus_config):
+    config = metplus_config
+    wrapper = CommandBuilder(config)
+    wrapper.logger.setLevel('INFO')
+
+    def fail():
+        raise AssertionError('environment log messages were built')
+
+    wrapper.print_all_envs = fail
+    wrapper.set_environment_variables({})
+
+
+@pytest.mark.wrapper
+def test_run_command_profile(metplus_config):
+    import json
+    from metplus.wrappers.command_runner import RunProfile
+    from metplus.util.run_util import get_run_profile_path
+    from metplus.util.run_util import log_run_profile_summary
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'METPLUS_PROFILE', True)
+    config.run_profile = RunProfile(get_run_profile_path(config))
+
+    wrapper = CommandBuilder(config)
+    for lead in (0, 3):
+        time_info = ti_calculate({'init': datetime.datetime(2024, 1, 1),
+                                  'lead_hours': lead})
+        wrapper.set_environment_variables(time_info)
+        assert wrapper.run_command('echo profile')
+    assert not wrapper.run_command('false')
+    config.run_profile.close()
+
+    with open(config.run_profile.path, 'r') as file_handle:
+        records = [json.loads(line) for line in file_handle]
+    assert [record['exe'] for record in records] == ['echo', 'echo', 'false']
+    assert [record['exit_code'] for record in records] == [0, 0, 1]
+    assert [record['lead'] for record in records] == ['0 hours', '3 hours',
+                                                      '3 hours']
+    assert all(record['wrapper'] == 'CommandBuilder' for record in records)
+    assert all(record['wall'] > 0 for record in records)
+
+    assert log_run_profile_summary(config)
+    config.flush_log()
+    with open(config.getstr('config', 'LOG_METPLUS'), 'r') as file_handle:
+        log_text = file_handle.read()
+    assert 'Executable' in log_text and 'Lead' in log_text
+
+
+@pytest.mark.wrapper
+def test_run_command_profile_shared_pool(metplus_config):
+    import json
+    from metplus.wrappers.command_runner import RunProfile
+    from metplus.util.run_util import get_run_profile_path
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'METPLUS_PROFILE', True)
+    config.set('config', 'METPLUS_MAX_PARALLEL_COMMANDS', 2)
+    config.run_profile = RunProfile(get_run_profile_path(config))
+
+    class ConcurrentWrapper(CommandBuilder):
+        ALLOW_CONCURRENT_COMMANDS = True
+
+    background = ConcurrentWrapper(config)
+    wrapper = CommandBuilder(config)
+    pool = CommandPool(2)
+    background.cmdrunner.pool = pool
+    wrapper.cmdrunner.pool = pool
+
+    # command that is not run in the background overlaps pool commands
+    background.run_command('sleep 0.5')
+    assert wrapper.run_command('echo overlap')
+    assert background.wait_for_commands()
+    assert wrapper.run_command('echo alone')
+    config.run_profile.close()
+
+    with open(config.run_profile.path, 'r') as file_handle:
+        records = {record['cmd']: record['concurrent']
+                   for record in map(json.loads, file_handle)}
+    assert records == {'sleep 0.5': True, 'echo overlap': True,
+                       'echo alone': False}
+
+
+@pytest.mark.parametrize(
+    'concurrent', [False, True]
+)
+@pytest.mark.wrapper
+def test_run_command_staged_files_in_use(metplus_config, tmp_path,
+                                         concurrent):
+    import gzip
+    from metplus.util import system_util, preprocess_file
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'STAGING_DIR', str(tmp_path / 'stage'))
+    config.set('config', 'STAGING_DIR_MAX_SIZE_MB', 1)
+    config.set('config', 'METPLUS_MAX_PARALLEL_COMMANDS',
+               2 if concurrent else 1)
+
+    class ConcurrentWrapper(CommandBuilder):
+        ALLOW_CONCURRENT_COMMANDS = True
+
+    filenames = []
+    for name in ('read', 'probe'):
+        filename = str(tmp_path / f'{name}.txt')
+        with gzip.open(f'{filename}.gz', 'wb') as file_handle:
+            file_handle.write(b'data\n')
+        filenames.append(filename)
+
+    in_use = []
+    try:
+        wrapper = ConcurrentWrapper(config)
+        staged, probed = [preprocess_file(filename, None, config)
+                          for filename in filenames]
+        wrapper.run_command(f'sh -c "sleep 0.2" {staged}')
+        # only the file read by the command is in use, the probed file can
+        # be removed
+        in_use.append(dict(system_util._STAGED_FILES_IN_USE))
+        assert probed not in system_util._STAGED_FILES_FOR_NEXT_COMMAND
+        assert wrapper.wait_for_commands()
+        in_use.append(dict(system_util._STAGED_FILES_IN_USE))
+    finally:
+        config.set('config', 'STAGING_DIR_MAX_SIZE_MB', 0)
+        system_util._STAGED_FILES_IN_USE.clear()
+        system_util._STAGED_FILES_FOR_NEXT_COMMAND.clear()
+
+    assert in_use == [{staged: 1} if concurrent else {}, {}]
@@ -205,3 +205,36 @@ def test_get_grid(metplus_config, lat, lon, expected_result):
     wrapper = extract_tiles_wrapper(metplus_config)
     storm_data = {'ALAT': lat, 'ALON': lon}
     assert(wrapper.get_grid('FCST', storm_data) == expected_result)
+
+
+@pytest.mark.wrapper
+def test_identical_tiles_copied(metplus_config):
+    wrapper = extract_tiles_wrapper(metplus_config)
+    rdp = wrapper.regrid_data_plane
+    out_dir = wrapper.c_dict['OUTPUT_DIR']
+    grid = '"latlon 60 60 1.0 2.0 0.5 0.5"'
+
+    expected_cmds = []
+    for outfile, tile_grid in [('storm1.nc', grid),
+                               ('storm2.nc', grid),
+                               ('storm1.nc', grid),
+                               ('storm3.nc', grid.replace('1.0', '3.0'))]:
+        rdp.outdir = out_dir
+        rdp.outfile = outfile
+        out_path = os.path.join(out_dir, outfile)
+        cmd = f'regrid_data_plane input.grb2 {tile_grid} {out_path} -v 2'
+        assert rdp.run_command(cmd)
+        if outfile == 'storm1.nc' and expected_cmds:
+            continue
+        if outfile == 'storm2.nc':
+            cmd = (f"cp {os.path.join(out_dir, 'storm1.nc')} "
+                   f"{os.path.join(out_dir, 'storm2.nc')}")
+        expected_cmds.append(cmd)
+
+    assert [cmd for cmd, _ in rdp.all_commands] == expected_cmds
+
+    # tiles are only compared to other tiles for the same run time
+    wrapper.create_tiles()
+    assert not rdp.tile_outputs
+    assert not rdp.all_commands
+    assert [cmd for cmd, _ in wrapper.all_commands] == expected_cmds
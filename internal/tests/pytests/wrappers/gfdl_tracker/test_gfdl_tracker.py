@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import os
+
+from metplus.wrappers.gfdl_tracker_wrapper import GFDLTrackerWrapper
+
+INIT_TIMES = ['2016090600', '2016090606']
+LEADS = [0, 6]
+
+
+def write_script(path, content):
+    with open(path, 'w') as file_handle:
+        file_handle.write(f'#!/bin/sh\n{content}\n')
+    os.chmod(path, 0o755)
+
+
+def set_minimum_config(config, tmp_path):
+    exec_dir = tmp_path / 'exec'
+    input_dir = tmp_path / 'input'
+    exec_dir.mkdir()
+    input_dir.mkdir()
+
+    # index app writes a file and logs each file it indexed,
+    # tracker app writes directory it ran in to the track file
+    write_script(exec_dir / 'grbindex.exe',
+                 f'echo index > "$2"; echo "$1" >> {tmp_path}/indexed.txt')
+    write_script(exec_dir / 'gettrk.exe', 'cat > /dev/null; pwd > fort.64')
+
+    for init in INIT_TIMES:
+        for lead in LEADS:
+            (input_dir / f'model.{init}.f{lead * 60:05d}').write_text('grib')
+    (input_dir / 'tcvit.txt').write_text('')
+    nml_file = tmp_path / 'template.nml'
+    nml_file.write_text('atcfymdh=${METPLUS_ATCFINFO_ATCFYMDH}\n')
+
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'LOOP_BY', 'INIT')
+    config.set('config', 'INIT_TIME_FMT', '%Y%m%d%H')
+    config.set('config', 'INIT_BEG', INIT_TIMES[0])
+    config.set('config', 'INIT_END', INIT_TIMES[-1])
+    config.set('config', 'INIT_INCREMENT', '6H')
+    config.set('config', 'LEAD_SEQ', ', '.join(str(lead) for lead in LEADS))
+    config.set('config', 'GFDL_TRACKER_EXEC', str(exec_dir))
+    config.set('config', 'GFDL_TRACKER_GRIB_VERSION', 1)
+    config.set('config', 'GFDL_TRACKER_INPUT_DIR', str(input_dir))
+    config.set('config', 'GFDL_TRACKER_INPUT_TEMPLATE',
+               'model.{init?fmt=%Y%m%d%H}.f{lead?fmt=%5M}')
+    config.set('config', 'GFDL_TRACKER_TC_VITALS_INPUT_DIR', str(input_dir))
+    config.set('config', 'GFDL_TRACKER_TC_VITALS_INPUT_TEMPLATE', 'tcvit.txt')
+    config.set('config', 'GFDL_TRACKER_NML_TEMPLATE_FILE', str(nml_file))
+    config.set('config', 'GFDL_TRACKER_OUTPUT_DIR', str(tmp_path / 'output'))
+    config.set('config', 'GFDL_TRACKER_OUTPUT_TEMPLATE',
+               'track.{init?fmt=%Y%m%d%H}.txt')
+    config.set('config', 'GFDL_TRACKER_TRACKERINFO_TYPE', 'tracker')
+    return input_dir
+
+
+def read_indexed(tmp_path):
+    indexed = tmp_path / 'indexed.txt'
+    if not indexed.exists():
+        return []
+    return indexed.read_text().splitlines()
+
+
+@pytest.mark.parametrize(
+    'scratch_dirs, max_parallel', [
+        (False, 1),
+        (False, 4),
+        (True, 1),
+        (True, 4),
+    ]
+)
+@pytest.mark.wrapper
+def test_gfdl_tracker_run(metplus_config, tmp_path, scratch_dirs,
+                          max_parallel):
+    config = metplus_config
+    set_minimum_config(config, tmp_path)
+    config.set('config', 'GFDL_TRACKER_SCRATCH_DIRS', scratch_dirs)
+    config.set('config', 'METPLUS_MAX_PARALLEL_COMMANDS', max_parallel)
+
+    wrapper = GFDLTrackerWrapper(config)
+    assert wrapper.isOK
+    wrapper.run_all_times()
+    assert wrapper.wait_for_commands()
+    assert wrapper.errors == 0
+
+    output_dir = tmp_path / 'output'
+    for init in INIT_TIMES:
+        track_file = output_dir / f'track.{init}.txt'
+        run_dir = track_file.read_text().strip()
+        if scratch_dirs:
+            assert run_dir == str(output_dir / 'scratch' / f'{init}00')
+        else:
+            assert run_dir == str(output_dir)
+
+    assert len(read_indexed(tmp_path)) == len(INIT_TIMES) * len(LEADS)
+
+    # intermediate files are removed
+    assert not (output_dir / 'scratch').exists() or not any(
+        (output_dir / 'scratch').iterdir()
+    )
+    assert not list(output_dir.glob('fort.*'))
+
+
+@pytest.mark.wrapper
+def test_gfdl_tracker_reuse_index(metplus_config, tmp_path):
+    config = metplus_config
+    input_dir = set_minimum_config(config, tmp_path)
+    config.set('config', 'INIT_END', INIT_TIMES[0])
+    config.set('config', 'GFDL_TRACKER_KEEP_INTERMEDIATE', True)
+
+    # index file next to input file is newer than input file
+    reused = input_dir / f'model.{INIT_TIMES[0]}.f00000.ix'
+    reused.write_text('existing index')
+    # index file that is older than its input file is not used
+    old = input_dir / f'model.{INIT_TIMES[0]}.f00360.ix'
+    old.write_text('old index')
+    os.utime(old, (0, 0))
+
+    wrapper = GFDLTrackerWrapper(config)
+    wrapper.run_all_times()
+    assert wrapper.errors == 0
+
+    indexed = read_indexed(tmp_path)
+    # input files are indexed through the renamed links in the output dir
+    assert len(indexed) == 1 and indexed[0].endswith('.f00360')
+    work_dir = tmp_path / 'output'
+    links = [path for path in work_dir.glob('*.ix') if path.is_symlink()]
+    assert [os.readlink(path) for path in links] == [str(reused)]
+
+    # index files kept from the previous run are reused
+    wrapper = GFDLTrackerWrapper(config)
+    wrapper.run_all_times()
+    assert wrapper.errors == 0
+    assert read_indexed(tmp_path) == indexed
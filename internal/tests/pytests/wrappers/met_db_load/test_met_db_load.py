@@ -2,6 +2,8 @@
 
 import pytest
 
+import os
+
 from metplus.wrappers.met_db_load_wrapper import METDbLoadWrapper
 
 
@@ -42,3 +44,160 @@ def test_is_loadable_file(filename, expected_result):
 @pytest.mark.wrapper
 def test_has_loadable_file(filenames, expected_result):
     assert METDbLoadWrapper._has_loadable_file(filenames) == expected_result
+
+
+def set_minimum_config(config, tmp_path):
+    config.set('config', 'PROCESS_LIST', 'METDbLoad')
+    config.set('config', 'LOOP_BY', 'INIT')
+    config.set('config', 'INIT_TIME_FMT', '%Y%m%d%H')
+    config.set('config', 'INIT_BEG', '2024010100')
+    config.set('config', 'INIT_END', '2024010100')
+    config.set('config', 'INIT_INCREMENT', '1H')
+    config.set('config', 'MET_DB_LOAD_RUNTIME_FREQ', 'RUN_ONCE')
+    config.set('config', 'MET_DATA_DB_DIR', str(tmp_path / 'METdataio'))
+    config.set('config', 'MET_DB_LOAD_XML_FILE',
+               '{PARM_BASE}/use_cases/met_tool_wrapper/METdbLoad/'
+               'METdbLoadConfig.xml')
+    config.set('config', 'MET_DB_LOAD_INPUT_TEMPLATE', str(tmp_path / 'in'))
+    config.set('config', 'MET_DB_LOAD_MANIFEST_FILE',
+               str(tmp_path / 'manifest.json'))
+    for name, input_type in METDbLoadWrapper.CONFIG_NAMES.items():
+        value = 1 if input_type == 'int' else 'false'
+        config.set('config', f'MET_DB_LOAD_MV_{name}', value)
+    config.set('config', 'MET_DB_LOAD_MV_DATABASE', 'mv_test')
+
+
+def write_stat_file(path, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text('VERSION MODEL\n')
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.mark.wrapper
+def test_get_stat_files_incremental(metplus_config, tmp_path):
+    config = metplus_config
+    set_minimum_config(config, tmp_path)
+    config.set('config', 'MET_DB_LOAD_INCREMENTAL', True)
+    wrapper = METDbLoadWrapper(config)
+    assert wrapper.isOK
+    wrapper._manifest_key = 'host/mv_test'
+
+    input_dir = tmp_path / 'in'
+    write_stat_file(input_dir / 'a' / 'one.stat', 100)
+    write_stat_file(input_dir / 'a' / 'two.stat', 200)
+    write_stat_file(input_dir / 'b' / 'mode_obj.txt', 100)
+    write_stat_file(input_dir / 'b' / 'other.txt', 100)
+
+    def get_files():
+        manifest = wrapper.read_manifest().get('host/mv_test', {})
+        stat_files = wrapper.get_stat_files(str(input_dir), manifest)
+        return {os.path.basename(stat_dir): [os.path.basename(path)
+                                             for path in files]
+                for stat_dir, files in stat_files.items()}
+
+    # all files are loaded the first time
+    assert get_files() == {'a': ['one.stat', 'two.stat'],
+                           'b': ['mode_obj.txt']}
+
+    # files are loaded again if the manifest is not updated
+    assert get_files() == {'a': ['one.stat', 'two.stat'],
+                           'b': ['mode_obj.txt']}
+    wrapper.update_manifest()
+    assert get_files() == {}
+
+    # only new and changed files are loaded
+    write_stat_file(input_dir / 'a' / 'one.stat', 300)
+    write_stat_file(input_dir / 'c' / 'new.tcst', 50)
+    assert get_files() == {'a': ['one.stat'], 'c': ['new.tcst']}
+    wrapper.update_manifest()
+    assert get_files() == {}
+
+    # all files are loaded if new files are not newer than loaded files
+    write_stat_file(input_dir / 'a' / 'copied.stat', 10)
+    assert get_files() == {'a': ['copied.stat', 'one.stat', 'two.stat']}
+
+
+@pytest.mark.parametrize(
+    'incremental', [False, True]
+)
+@pytest.mark.wrapper
+def test_met_db_load_incremental_run(metplus_config, tmp_path, incremental):
+    config = metplus_config
+    set_minimum_config(config, tmp_path)
+    config.set('config', 'MET_DB_LOAD_INCREMENTAL', incremental)
+    config.set('config', 'MET_DB_LOAD_REMOVE_TMP_XML', False)
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'TMP_DIR', str(tmp_path))
+    write_stat_file(tmp_path / 'in' / 'grid_stat' / 'out.stat', 100)
+
+    app_dir = tmp_path / 'METdataio' / 'METdbLoad' / 'ush'
+    app_dir.mkdir(parents=True)
+    (app_dir / 'met_db_load.py').write_text('')
+
+    for run in range(2):
+        wrapper = METDbLoadWrapper(config)
+        assert wrapper.isOK
+        wrapper.run_all_times()
+        assert wrapper.errors == 0
+        xml_file = wrapper.c_dict['XML_TMP_FILE']
+        if incremental and run:
+            assert xml_file is None
+            continue
+
+        with open(xml_file, 'r') as file_handle:
+            xml_content = file_handle.read()
+        stat_file = tmp_path / 'in' / 'grid_stat' / 'out.stat'
+        assert f"<file>{stat_file}</file>" in xml_content
+
+    assert (tmp_path / 'manifest.json').exists() == incremental
+
+
+@pytest.mark.wrapper
+def test_met_db_load_batch_size_ignored(metplus_config, tmp_path):
+    config = metplus_config
+    set_minimum_config(config, tmp_path)
+    config.set('config', 'INIT_END', '2024010101')
+    config.set('config', 'MET_DB_LOAD_RUNTIME_FREQ', 'RUN_ONCE_FOR_EACH')
+    config.set('config', 'MET_DB_LOAD_BATCH_SIZE', 2)
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'TMP_DIR', str(tmp_path))
+    write_stat_file(tmp_path / 'in' / 'grid_stat' / 'out.stat', 100)
+
+    # fail if the XML file was removed before the command ran
+    app_dir = tmp_path / 'METdataio' / 'METdbLoad' / 'ush'
+    app_dir.mkdir(parents=True)
+    (app_dir / 'met_db_load.py').write_text(
+        'import os, sys\nsys.exit(0 if os.path.exists(sys.argv[1]) else 1)\n'
+    )
+
+    wrapper = METDbLoadWrapper(config)
+    assert wrapper.isOK
+    assert wrapper.c_dict['BATCH_SIZE'] == 1
+    wrapper.run_all_times()
+    assert wrapper.errors == 0
+    assert len(wrapper.all_commands) == 2
+
+
+@pytest.mark.parametrize(
+    'xml_content, is_ok', [
+        ('<load_val>${METPLUS_INPUT_PATHS}</load_val>', False),
+        ('<load_files>${METPLUS_INPUT_FILES}</load_files>', True),
+    ]
+)
+@pytest.mark.wrapper
+def test_met_db_load_incremental_xml(metplus_config, tmp_path, xml_content,
+                                     is_ok):
+    config = metplus_config
+    set_minimum_config(config, tmp_path)
+    xml_file = tmp_path / 'load.xml'
+    xml_file.write_text(f'<load_spec>\n{xml_content}\n</load_spec>\n')
+    config.set('config', 'MET_DB_LOAD_XML_FILE', str(xml_file))
+    config.set('config', 'MET_DB_LOAD_INCREMENTAL', True)
+
+    wrapper = METDbLoadWrapper(config)
+    assert wrapper.isOK == is_ok
+
+    # directories can be loaded if not loading incrementally
+    config.set('config', 'MET_DB_LOAD_INCREMENTAL', False)
+    wrapper = METDbLoadWrapper(config)
+    assert wrapper.isOK
@@ -84,6 +84,103 @@ def test_get_accumulation_1_to_6(metplus_config):
             input_dir+"/20160904/file.2016090413.01h" in in_files)
 
 
+@pytest.mark.wrapper
+def test_get_accumulation_reuses_searches(metplus_config):
+    data_src = "OBS"
+    pcw = pcp_combine_wrapper(metplus_config, data_src)
+    input_dir = get_test_data_dir(pcw.config, subdir='accum')
+    pcw.c_dict[f'{data_src}_INPUT_DIR'] = input_dir
+    accum = 4 * 3600
+
+    all_files = []
+    for valid in ('2016090417', '2016090418'):
+        time_info = ti_calculate({'valid': datetime.strptime(valid,
+                                                             '%Y%m%d%H')})
+        pcw._build_input_accum_list(data_src, time_info)
+        files_found = pcw.get_accumulation(time_info, accum, data_src)
+        all_files.append([os.path.basename(item[0]) for item in files_found])
+
+    assert all_files == [
+        [f'file.20160904{hour}.01h' for hour in (17, 16, 15, 14)],
+        [f'file.20160904{hour}.01h' for hour in (18, 17, 16, 15)],
+    ]
+    # 3 files and their field info are reused from the first valid time
+    stats = pcw._input_search_stats
+    assert stats['searched'] == 10
+    assert stats['reused'] == 6
+    assert stats['checks_avoided'] == 3
+
+    pcw.clear_input_search_cache()
+    assert not pcw._input_search_cache
+    assert stats['searched'] == stats['reused'] == 0
+
+
+@pytest.mark.wrapper
+def test_get_lowest_forecast_file_reused(metplus_config):
+    data_src = "FCST"
+    pcw = pcp_combine_wrapper(metplus_config, data_src)
+    input_dir = get_test_data_dir(pcw.config, subdir='fcst')
+    valid_time = datetime.strptime("201802012100", '%Y%m%d%H%M')
+    pcw.c_dict[f'{data_src}_INPUT_DIR'] = input_dir
+    pcw._build_input_accum_list(data_src, {'valid': valid_time})
+
+    first = pcw.get_lowest_fcst_file(valid_time, data_src)
+    assert pcw._input_search_stats['checks_avoided'] == 0
+    assert pcw.get_lowest_fcst_file(valid_time, data_src) == first
+    assert pcw._input_search_stats['reused'] == 1
+    # leads 0 through 3 hours were checked to find the first file
+    assert pcw._input_search_stats['checks_avoided'] == 4
+
+
+@pytest.mark.wrapper
+def test_get_lowest_forecast_file_preprocessed_when_reused(metplus_config,
+                                                           monkeypatch):
+    data_src = "FCST"
+    pcw = pcp_combine_wrapper(metplus_config, data_src)
+    input_dir = get_test_data_dir(pcw.config, subdir='fcst')
+    valid_time = datetime.strptime("201802012100", '%Y%m%d%H%M')
+    pcw.c_dict[f'{data_src}_INPUT_DIR'] = input_dir
+    pcw._build_input_accum_list(data_src, {'valid': valid_time})
+
+    found = pcw.get_lowest_fcst_file(valid_time, data_src)[0]
+    preprocessed = []
+
+    def fake_preprocess(path, data_type, config):
+        preprocessed.append(path)
+        return f'/staged{path}'
+
+    monkeypatch.setattr('metplus.wrappers.pcp_combine_wrapper.preprocess_file',
+                        fake_preprocess)
+    # path found before preprocessing is cached and preprocessed again
+    assert pcw.get_lowest_fcst_file(valid_time, data_src)[0] == (
+        f'/staged{found}'
+    )
+    assert preprocessed == [found]
+    assert pcw._input_search_stats['reused'] == 1
+
+
+@pytest.mark.wrapper
+@pytest.mark.parametrize(
+    'pending, expected_searched', [
+        (False, 1),
+        (True, 2),
+    ]
+)
+def test_find_input_file_not_found_pending(metplus_config, pending,
+                                           expected_searched):
+    data_src = "OBS"
+    pcw = pcp_combine_wrapper(metplus_config, data_src)
+    pcw.c_dict[f'{data_src}_INPUT_DIR'] = '/fake/input/dir'
+    pcw.c_dict[f'{data_src}_INPUT_TEMPLATE'] = '{valid?fmt=%Y%m%d%H}.nc'
+    pcw.cmdrunner.has_pending_cmds = lambda: pending
+    valid = datetime(2016, 9, 4, 17)
+
+    for _ in range(2):
+        assert pcw.find_input_file(None, valid, 3600, data_src)[0] is None
+    # missing files may be written by commands running in the background
+    assert pcw._input_search_stats['searched'] == expected_searched
+
+
 @pytest.mark.wrapper
 def test_get_accumulation_6_to_6(metplus_config):
     data_src = "FCST"
@@ -2,10 +2,12 @@
 
 import pytest
 
+import os
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
 from metplus.wrappers.runtime_freq_wrapper import RuntimeFreqWrapper
+from metplus.wrappers.user_script_wrapper import UserScriptWrapper
 
 
 @pytest.mark.parametrize(
@@ -107,3 +109,99 @@ def test_compare_time_info(metplus_config, runtime, filetime, expected_result):
     wrapper = RuntimeFreqWrapper(config)
     actual_result = wrapper.compare_time_info(runtime, filetime)
     assert actual_result == expected_result
+
+
+@pytest.mark.parametrize(
+    'runtime', [
+        {'init': datetime(2019, 1, 5, 0), 'valid': '*', 'lead': '*'},
+        {'init': '*', 'valid': datetime(2019, 1, 5, 6), 'lead': '*'},
+        {'init': '*', 'valid': '*', 'lead': relativedelta(hours=6)},
+        {'init': '*', 'valid': '*', 'lead': 0},
+        {'init': datetime(2019, 1, 5, 6), 'valid': '*',
+         'lead': relativedelta(hours=3)},
+        {'init': '*', 'valid': '*', 'lead': relativedelta(months=1)},
+        {'init': '*', 'valid': datetime(2019, 2, 5, 0),
+         'lead': relativedelta(months=1)},
+        {'init': '*', 'valid': '*', 'lead': '*'},
+        {'init': datetime(2020, 1, 1), 'valid': '*', 'lead': '*'},
+    ]
+)
+@pytest.mark.wrapper
+def test_subset_candidates(metplus_config, runtime):
+    wrapper = RuntimeFreqWrapper(metplus_config)
+    all_files = []
+    for init_hour in (0, 6, 12):
+        init = datetime(2019, 1, 5, init_hour)
+        for lead in (relativedelta(hours=0), relativedelta(hours=3),
+                     relativedelta(hours=6), relativedelta(months=1)):
+            time_info = {'init': init, 'valid': init + lead, 'lead': lead}
+            all_files.append({'time_info': time_info,
+                              'fcst': [f'{init_hour}_{len(all_files)}']})
+    wrapper.c_dict['ALL_FILES'] = all_files
+
+    expected = [index for index, file_dict in enumerate(all_files)
+                if wrapper.compare_time_info(runtime, file_dict['time_info'])]
+    for _ in range(2):
+        actual = sorted(
+            index for index in wrapper._get_subset_candidates(runtime)
+            if wrapper.compare_time_info(runtime,
+                                         all_files[index]['time_info'])
+        )
+        assert actual == expected
+
+    # index is rebuilt when the list of files changes
+    wrapper.c_dict['ALL_FILES'] = all_files[:4]
+    assert all(index < 4
+               for index in wrapper._get_subset_candidates(runtime))
+
+
+@pytest.mark.parametrize(
+    'max_parallel', [
+        1,
+        2,
+    ]
+)
+@pytest.mark.wrapper
+def test_run_once_for_each_batch(metplus_config, max_parallel):
+    config = metplus_config
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    config.set('config', 'LOG_MET_OUTPUT_TO_METPLUS', False)
+    config.set('config', 'METPLUS_MAX_PARALLEL_COMMANDS', max_parallel)
+    config.set('config', 'LOOP_BY', 'INIT')
+    config.set('config', 'INIT_TIME_FMT', '%Y%m%d%H')
+    config.set('config', 'INIT_BEG', '2023010100')
+    config.set('config', 'INIT_END', '2023010112')
+    config.set('config', 'INIT_INCREMENT', '6H')
+    config.set('config', 'LEAD_SEQ', '0')
+    config.set('config', 'USER_SCRIPT_RUNTIME_FREQ', 'RUN_ONCE_FOR_EACH')
+    config.set('config', 'USER_SCRIPT_BATCH_SIZE', 2)
+    # command for 06Z fails
+    config.set('config', 'USER_SCRIPT_COMMAND',
+               'echo "ran {init?fmt=%H}"; test {init?fmt=%H} != 06')
+
+    class ConcurrentUserScriptWrapper(UserScriptWrapper):
+        ALLOW_CONCURRENT_COMMANDS = True
+
+    wrapper = ConcurrentUserScriptWrapper(config)
+    assert wrapper.cmdrunner.is_concurrent == (max_parallel > 1)
+    log_path = wrapper.cmdrunner.get_log_path('user_script.log')
+    if os.path.exists(log_path):
+        os.remove(log_path)
+
+    all_commands = wrapper.run_all_times()
+    wrapper.wait_for_commands()
+    assert len(all_commands) == 3
+    assert wrapper.cmd_batch is None
+    # failure is reported for each failed command or batch of commands
+    assert wrapper.errors == 1
+
+    # output of each command is written to the log
+    with open(log_path, 'r') as file_handle:
+        content = file_handle.read()
+    outputs = [f'OUTPUT:\nran {hour}\n' for hour in ('00', '06', '12')]
+    assert all(output in content for output in outputs)
+
+    # batches run in order if commands are not run concurrently
+    if max_parallel == 1:
+        assert ([content.index(output) for output in outputs] ==
+                sorted(content.index(output) for output in outputs))
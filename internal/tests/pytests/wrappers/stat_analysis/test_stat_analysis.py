@@ -5,6 +5,7 @@ import pytest
 import os
 import datetime
 import pprint
+from unittest import mock
 from dateutil.relativedelta import relativedelta
 
 from metplus.wrappers.stat_analysis_wrapper import StatAnalysisWrapper
@@ -909,3 +910,143 @@ def test_get_config_file(metplus_config):
     config.set('config', 'STAT_ANALYSIS_CONFIG_FILE', fake_config_name)
     wrapper = StatAnalysisWrapper(config)
     assert wrapper.c_dict['CONFIG_FILE'] == fake_config_name
+
+
+@pytest.mark.parametrize(
+    'config_file, jobs, expected_lines', [
+        # 0: filter by MODEL and FCST_VAR from config
+        (True, ['-job filter'],
+         [['MODEL_A TMP'], ['MODEL_B TMP']]),
+        # 1: job args are added to filter
+        (True, ['-job filter -fcst_var HGT'],
+         [['MODEL_A TMP', 'MODEL_A HGT'], ['MODEL_B TMP', 'MODEL_B HGT']]),
+        # 2: without config file, only first job args are used
+        (False, ['-job filter -model MODEL_B', '-job filter -model MODEL_A'],
+         [['MODEL_B TMP', 'MODEL_B HGT'], ['MODEL_B TMP', 'MODEL_B HGT']]),
+    ]
+)
+@pytest.mark.wrapper_d
+def test_subset_lookin(metplus_config, config_file, jobs, expected_lines):
+    config = metplus_config
+    set_minimum_config_settings(config)
+    if not config_file:
+        config.set('config', 'STAT_ANALYSIS_CONFIG_FILE', '')
+    wrapper = StatAnalysisWrapper(config)
+
+    lookin_dir = os.path.join(config.getdir('OUTPUT_BASE'), 'subset_lookin')
+    os.makedirs(lookin_dir, exist_ok=True)
+    with open(os.path.join(lookin_dir, 'input.stat'), 'w') as file_handle:
+        file_handle.write('VERSION MODEL FCST_VAR LINE_TYPE\n')
+        for model in ('MODEL_A', 'MODEL_B', 'MODEL_C'):
+            for var in ('TMP', 'HGT'):
+                file_handle.write(f'V11.1 {model} {var} SL1L2\n')
+
+    settings_list = [
+        {'LOOKIN_DIR': lookin_dir, 'JOBS': jobs, 'MODEL': f'"{model}"',
+         'FCST_VAR': '"TMP"', 'LINE_TYPE': ''}
+        for model in ('MODEL_A', 'MODEL_B')
+    ]
+    wrapper._subset_lookin(settings_list)
+
+    for settings, expected in zip(settings_list, expected_lines):
+        assert settings['LOOKIN_DIR'] != lookin_dir
+        subset_files = os.listdir(settings['LOOKIN_DIR'])
+        assert len(subset_files) == 1 and subset_files[0].endswith('.stat')
+        with open(os.path.join(settings['LOOKIN_DIR'],
+                               subset_files[0])) as file_handle:
+            lines = file_handle.read().splitlines()
+        assert lines[0].startswith('VERSION')
+        assert [' '.join(line.split()[1:3]) for line in lines[1:]] == expected
+
+
+@pytest.mark.parametrize(
+    'settings, jobs, expected_leads', [
+        # 0: filter by FCST_LEAD from config
+        ({'FCST_LEAD': '"060000"'}, ['-job filter'], ['060000']),
+        # 1: filter by FCST_LEAD from job in HHMMSS format
+        ({}, ['-job filter -fcst_lead 120000'], ['120000']),
+        # 2: keep lines valid at or after FCST_VALID_BEG
+        ({'FCST_VALID_BEG': '20240101_120000'}, ['-job filter'],
+         ['120000']),
+        # 3: keep lines valid at or before FCST_VALID_END
+        ({'FCST_VALID_END': '20240101_060000'}, ['-job filter'],
+         ['060000']),
+        # 4: job argument overrides config value
+        ({'FCST_VALID_BEG': '20240101_120000'},
+         ['-job filter -fcst_valid_beg 20240101_060000'], None),
+        # 5: lead that cannot be compared does not filter
+        ({}, ['-job filter -fcst_lead 6'], None),
+        # 6: filters that do not remove any lines use original lookin
+        ({'FCST_LEAD': '"060000", "120000"'}, ['-job filter'], None),
+    ]
+)
+@pytest.mark.wrapper_d
+def test_subset_lookin_lead_and_time(metplus_config, settings, jobs,
+                                     expected_leads):
+    config = metplus_config
+    set_minimum_config_settings(config)
+    wrapper = StatAnalysisWrapper(config)
+
+    lookin_dir = os.path.join(config.getdir('OUTPUT_BASE'), 'subset_times')
+    os.makedirs(lookin_dir, exist_ok=True)
+    with open(os.path.join(lookin_dir, 'input.stat'), 'w') as file_handle:
+        file_handle.write('VERSION MODEL FCST_LEAD FCST_VALID_BEG FCST_VAR '
+                          'LINE_TYPE\n')
+        for lead in ('060000', '120000'):
+            file_handle.write(f'V11.1 MODEL_A {lead} 20240101_{lead} TMP '
+                              'SL1L2\n')
+
+    runtime_settings = {'LOOKIN_DIR': lookin_dir, 'JOBS': jobs,
+                        'MODEL': '"MODEL_A"', 'FCST_VAR': '"TMP"',
+                        'LINE_TYPE': ''}
+    runtime_settings.update(settings)
+    subset_dir = wrapper._subset_lookin([runtime_settings])
+
+    if expected_leads is None:
+        assert subset_dir is None
+        assert runtime_settings['LOOKIN_DIR'] == lookin_dir
+        return
+
+    subset_files = os.listdir(runtime_settings['LOOKIN_DIR'])
+    assert len(subset_files) == 1
+    with open(os.path.join(runtime_settings['LOOKIN_DIR'],
+                           subset_files[0])) as file_handle:
+        lines = file_handle.read().splitlines()
+    assert lines[0].startswith('VERSION')
+    assert [line.split()[2] for line in lines[1:]] == expected_leads
+
+
+@pytest.mark.parametrize(
+    'concurrent, scrub', [
+        (False, True),
+        (True, True),
+        (False, False),
+    ]
+)
+@pytest.mark.wrapper_d
+def test_subset_dir_removed(metplus_config, concurrent, scrub):
+    config = metplus_config
+    set_minimum_config_settings(config)
+    config.set('config', 'STAT_ANALYSIS_SUBSET_LOOKIN', True)
+    config.set('config', 'SCRUB_STAGING_DIR', scrub)
+    config.set('config', 'DO_NOT_RUN_EXE', False)
+    wrapper = StatAnalysisWrapper(config)
+    wrapper.cmdrunner.max_parallel = 2 if concurrent else 1
+
+    subset_dir = os.path.join(config.getdir('OUTPUT_BASE'), 'subset_dir')
+    os.makedirs(subset_dir, exist_ok=True)
+    jobs_saw_dir = []
+    with mock.patch.object(wrapper, '_get_all_runtime_settings',
+                           return_value=[{}, {}]), \
+         mock.patch.object(wrapper, '_subset_lookin',
+                           return_value=subset_dir), \
+         mock.patch.object(wrapper, '_run_stat_analysis_job',
+                           side_effect=lambda _: jobs_saw_dir.append(
+                               os.path.isdir(subset_dir))):
+        assert wrapper._run_stat_analysis({})
+
+    assert jobs_saw_dir == [True, True]
+    # directory is kept until commands running in the background finish
+    assert os.path.isdir(subset_dir) == (concurrent or not scrub)
+    assert wrapper.wait_for_commands()
+    assert os.path.isdir(subset_dir) == (not scrub)
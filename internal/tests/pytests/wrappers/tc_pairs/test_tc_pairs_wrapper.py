@@ -4,6 +4,8 @@ import pytest
 
 import os
 from datetime import datetime
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
 
 from metplus.wrappers.tc_pairs_wrapper import TCPairsWrapper
 
@@ -768,3 +770,110 @@ def test_get_config_file(metplus_config):
     config.set('config', 'TC_PAIRS_CONFIG_FILE', fake_config_name)
     wrapper = TCPairsWrapper(config)
     assert wrapper.c_dict['CONFIG_FILE'] == fake_config_name
+
+
+@pytest.mark.wrapper
+def test_reformat_deck(tmp_path):
+    in_file = tmp_path / 'in.dat'
+    out_file = tmp_path / 'out' / 'out.dat'
+    in_file.write_text(
+        'ML, 0104, 2014123118, 03, GFSO, 000, 2014123118, -99, 120\n'
+        'ML, 0104, 120, 03, GFSO, 006, 120, 341N\n'
+    )
+    TCPairsWrapper.read_modify_write_file(str(in_file), '12', ('-99', '-9999'),
+                                          str(out_file))
+    # only the third column is removed, even if other columns match it
+    assert out_file.read_text() == (
+        'ML, 120104, 03, GFSO, 000, 2014123118, -9999, 120\n'
+        'ML, 120104, 03, GFSO, 006, 120, 341N\n'
+    )
+
+
+@pytest.mark.parametrize(
+    'max_parallel', [1, 2]
+)
+@pytest.mark.wrapper
+def test_reformat_deck_lists(metplus_config, tmp_path, max_parallel):
+    config = metplus_config
+    set_minimum_config_settings(config)
+    deck_dir = tmp_path / 'deck'
+    reformat_dir = tmp_path / 'reformat'
+    deck_dir.mkdir()
+    config.set('config', 'TC_PAIRS_ADECK_INPUT_DIR', str(deck_dir))
+    config.set('config', 'TC_PAIRS_BDECK_INPUT_DIR', str(deck_dir))
+    config.set('config', 'TC_PAIRS_REFORMAT_DECK', True)
+    config.set('config', 'TC_PAIRS_REFORMAT_DIR', str(reformat_dir))
+    config.set('config', 'METPLUS_MAX_PARALLEL_COMMANDS', max_parallel)
+
+    deck_lists = {}
+    for deck_type in ('A', 'B'):
+        deck_file = deck_dir / f'{deck_type.lower()}deck.dat'
+        deck_file.write_text('ML, 0104, 2014123118, 03, GFSO, 000, -99\n')
+        deck_lists[deck_type] = [str(deck_file)]
+
+    def reformat(init):
+        wrapper = TCPairsWrapper(config)
+        assert wrapper.isOK
+        time_info = {'init': datetime.strptime(init, time_fmt)}
+        out_lists = wrapper.reformat_deck_lists(deck_lists, time_info)
+        wrapper._shutdown_reformat_executor()
+        assert wrapper.errors == 0
+        return {os.path.basename(out_list[0]):
+                    os.stat(out_list[0]).st_mtime_ns
+                for out_list in out_lists.values()}
+
+    first = reformat('2014121318')
+    assert (reformat_dir / 'adeck.dat').read_text() == (
+        'ML, 120104, 03, GFSO, 000, -9999\n'
+    )
+    assert (reformat_dir / TCPairsWrapper.REFORMAT_MANIFEST_NAME).exists()
+
+    # unchanged decks are not rewritten
+    assert reformat('2014121400') == first
+
+    # decks are rewritten if the input changes or the storm month differs
+    (deck_dir / 'bdeck.dat').write_text('ML, 0105, 2014123118, 03\n')
+    second = reformat('2014121400')
+    assert second['adeck.dat'] == first['adeck.dat']
+    assert (reformat_dir / 'bdeck.dat').read_text() == 'ML, 120105, 03\n'
+
+    reformat('2015010100')
+    assert (reformat_dir / 'bdeck.dat').read_text() == 'ML, 010105, 03\n'
+
+
+@pytest.mark.parametrize(
+    'max_parallel', [1, 2]
+)
+@pytest.mark.wrapper
+def test_reformat_deck_lists_errors_and_pool(metplus_config, tmp_path,
+                                            max_parallel):
+    config = metplus_config
+    set_minimum_config_settings(config)
+    deck_dir = tmp_path / 'deck'
+    deck_dir.mkdir()
+    config.set('config', 'TC_PAIRS_ADECK_INPUT_DIR', str(deck_dir))
+    config.set('config', 'TC_PAIRS_BDECK_INPUT_DIR', str(deck_dir))
+    config.set('config', 'TC_PAIRS_REFORMAT_DECK', True)
+    config.set('config', 'TC_PAIRS_REFORMAT_DIR', str(tmp_path / 'reformat'))
+    config.set('config', 'METPLUS_MAX_PARALLEL_COMMANDS', max_parallel)
+
+    (deck_dir / 'adeck.dat').write_text('ML, 0104, 2014123118, 03\n')
+    # deck that cannot be decoded is reported in either mode
+    (deck_dir / 'bdeck.dat').write_bytes(b'ML, 0104, \xff\xfe, 03\n')
+    deck_lists = {'A': [str(deck_dir / 'adeck.dat')],
+                  'B': [str(deck_dir / 'bdeck.dat')]}
+
+    wrapper = TCPairsWrapper(config)
+    assert wrapper.isOK
+    with mock.patch('metplus.wrappers.tc_pairs_wrapper.ProcessPoolExecutor',
+                    wraps=ProcessPoolExecutor) as mock_pool:
+        try:
+            for init in ('2014121318', '2015010100'):
+                time_info = {'init': datetime.strptime(init, time_fmt)}
+                wrapper.reformat_deck_lists(deck_lists, time_info)
+        finally:
+            wrapper._shutdown_reformat_executor()
+
+    assert wrapper.errors == 2
+    # pool of processes is reused for each run time
+    assert mock_pool.call_count == (1 if max_parallel > 1 else 0)
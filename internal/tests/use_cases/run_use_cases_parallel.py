@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+
+"""
+Program Name: run_use_cases_parallel.py
+Abstract: Runs METplus use cases from all_use_cases.txt in parallel worker
+ processes. Each use case writes to its own OUTPUT_BASE under the output
+ directory. The time each use case takes to run is saved in a history file
+ that is used to start the longest use cases first and to split the use cases
+ into shards of similar total run time that can be run on separate nodes.
+ If a truth directory is provided, the output of each use case is compared
+ to the truth data as soon as it finishes.
+History Log:  Initial version
+Usage: run_use_cases_parallel.py [--categories <c1,c2>] [--workers <N>]
+ [--num_shards <S> --shard <I>] [--output_base <dir>] [--truth_dir <dir>]
+ [--history_file <file>] [--python_env <name>=<python3>] [--dry_run]
+ [--skip_output_check]
+The environment variables set in metplus_test_env.<host>.sh must be set to run
+ the use cases.
+Condition codes: 0 on success, 1 if any use case failed or differed
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import heapq
+import argparse
+import subprocess
+from statistics import median
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os.path import dirname, realpath
+
+METPLUS_HOME = dirname(dirname(dirname(dirname(realpath(__file__)))))
+
+# add metplus directory to path so the utilities can be found
+sys.path.insert(0, METPLUS_HOME)
+sys.path.insert(0, dirname(realpath(__file__)))
+from metplus_use_case_suite import parse_all_use_cases_file
+
+USE_CASE_DIR = os.path.join(METPLUS_HOME, 'parm', 'use_cases')
+SYSTEM_CONF = os.path.join(dirname(realpath(__file__)), 'system.conf')
+# name of history file written to the output directory by default
+HISTORY_FILENAME = 'use_case_durations.json'
+
+# suffix of requirements in all_use_cases.txt that name the conda environment
+# that a use case must be run in
+ENV_SUFFIX = '_env'
+
+# estimated run time in seconds of a use case that has never been run if no
+# other use cases have been run either
+DEFAULT_DURATION = 300
+
+
+def get_use_cases(categories=None):
+    """!Get the use cases to run from all_use_cases.txt.
+
+    @param categories (optional) list of categories to include. All
+     categories are included if not set
+    @returns list of dictionaries with key (category/name), name, category,
+     config_args, and requirements of each use case
+    """
+    all_cases, _ = parse_all_use_cases_file()
+    if categories:
+        missing = [category for category in categories
+                   if category not in all_cases]
+        if missing:
+            raise KeyError(f"Invalid categories: {', '.join(missing)}")
+    else:
+        categories = list(all_cases)
+
+    use_cases = []
+    for category in categories:
+        for use_case in all_cases[category]:
+            use_cases.append({
+                'key': f"{category}/{use_case['name']}",
+                'name': use_case['name'],
+                'category': category,
+                'config_args': [_get_config_path(config_arg)
+                                for config_arg in use_case['config_args']],
+                'requirements': use_case['requirements'],
+            })
+
+    return use_cases
+
+
+def _get_config_path(config_arg):
+    """!Get full path of a config file that is relative to parm/use_cases.
+
+    @param config_arg config file or config value override
+    @returns full path to config file or config_arg if it is not a relative
+     path to a file in parm/use_cases
+    """
+    if os.path.isabs(config_arg):
+        return config_arg
+
+    config_path = os.path.join(USE_CASE_DIR, config_arg)
+    if os.path.exists(config_path):
+        return config_path
+
+    return config_arg
+
+
+def get_python_envs(env_args):
+    """!Get the python3 executable of each environment that use cases can
+    be run in.
+
+    @param env_args list of strings formatted as <name>=<path to python3>
+    @returns dictionary of environment name and path to python3
+    @throws ValueError if an item is not formatted correctly
+    """
+    python_envs = {}
+    for env_arg in env_args or []:
+        name, sep, python_exe = env_arg.partition('=')
+        if not sep or not name or not python_exe:
+            raise ValueError(f'Invalid --python_env value: {env_arg}')
+        python_envs[name.strip()] = os.path.abspath(python_exe.strip())
+    return python_envs
+
+
+def get_run_settings(requirements, python_envs):
+    """!Get how to run a use case to satisfy its requirements, the same way
+    .github/jobs/get_use_case_commands.py does. A use case that requires an
+    environment (<name>_env) is run with the python3 of that environment and
+    its bin directory is added to PATH. If it also requires py_embed,
+    MET_PYTHON_EXE is set so MET uses the same python3. METplus is added to
+    PYTHONPATH if metplus is required.
+
+    @param requirements list of requirements of the use case
+    @param python_envs dictionary of environment name and path to python3
+    @returns dictionary with the python3 to run run_metplus.py, a list of
+     config overrides, and environment variables to set, or None if the
+     required environment was not provided
+    """
+    settings = {'python': sys.executable, 'config_args': [], 'env': {}}
+    env_names = [item[:-len(ENV_SUFFIX)] for item in requirements
+                 if item.endswith(ENV_SUFFIX)]
+    if env_names:
+        python_exe = python_envs.get(env_names[0])
+        if not python_exe:
+            return None
+
+        settings['python'] = python_exe
+        settings['env']['PATH'] = os.pathsep.join(
+            [dirname(python_exe), os.environ.get('PATH', '')]
+        )
+        if 'py_embed' in requirements:
+            settings['config_args'].append(
+                f'user_env_vars.MET_PYTHON_EXE={python_exe}'
+            )
+
+    if 'metplus' in [item.lower() for item in requirements]:
+        settings['env']['PYTHONPATH'] = os.pathsep.join(
+            filter(None, [METPLUS_HOME, os.environ.get('PYTHONPATH')])
+        )
+
+    return settings
+
+
+def read_history(history_file):
+    """!Read the run time of each use case from previous runs.
+
+    @param history_file path to JSON file
+    @returns dictionary of use case key and dictionary with the duration of
+     the last run, the mean duration, and number of runs, or an empty
+     dictionary if the file is not set or does not exist
+    """
+    if not history_file or not os.path.exists(history_file):
+        return {}
+
+    with open(history_file, 'r') as file_handle:
+        return json.load(file_handle)
+
+
+def write_history(history_file, history):
+    """!Write the run time of each use case to the history file.
+
+    @param history_file path to JSON file
+    @param history dictionary of use case key and run information
+    """
+    tmp_file = f'{history_file}.tmp'
+    with open(tmp_file, 'w') as file_handle:
+        json.dump(history, file_handle, indent=1, sort_keys=True)
+    os.replace(tmp_file, history_file)
+
+
+def add_to_history(history, key, duration):
+    """!Add the run time of a use case to the history.
+
+    @param history dictionary of use case key and run information
+    @param key use case key (category/name)
+    @param duration time in seconds that the use case took to run
+    """
+    info = history.get(key, {'mean': 0.0, 'runs': 0})
+    runs = info['runs'] + 1
+    history[key] = {
+        'last': round(duration, 1),
+        'mean': round(info['mean'] + (duration - info['mean']) / runs, 1),
+        'runs': runs,
+    }
+
+
+def get_durations(use_cases, history):
+    """!Get the estimated run time of each use case. Use cases that are not
+    in the history are estimated to take the median time of the use cases
+    that are.
+
+    @param use_cases list of use case dictionaries
+    @param history dictionary of use case key and run information
+    @returns dictionary of use case key and estimated duration in seconds
+    """
+    known = [info['mean'] for info in history.values()]
+    default = median(known) if known else DEFAULT_DURATION
+    return {use_case['key']: history.get(use_case['key'],
+                                         {}).get('mean', default)
+            for use_case in use_cases}
+
+
+def schedule_shards(use_cases, durations, num_shards):
+    """!Split use cases into shards with similar total run times. Use cases
+    are sorted from longest to shortest and each is added to the shard with
+    the lowest total run time so far. The use cases in each shard are sorted
+    from longest to shortest.
+
+    @param use_cases list of use case dictionaries
+    @param durations dictionary of use case key and duration in seconds
+    @param num_shards number of shards to create
+    @returns list of tuples of total duration and list of use cases
+    """
+    ordered = sort_longest_first(use_cases, durations)
+    shards = [(0.0, index, []) for index in range(num_shards)]
+    heapq.heapify(shards)
+    for use_case in ordered:
+        total, index, shard = heapq.heappop(shards)
+        shard.append(use_case)
+        heapq.heappush(shards,
+                       (total + durations[use_case['key']], index, shard))
+
+    return [(total, shard) for total, _, shard in sorted(shards,
+                                                         key=lambda x: x[1])]
+
+
+def sort_longest_first(use_cases, durations):
+    """!Sort use cases by duration from longest to shortest.
+
+    @param use_cases list of use case dictionaries
+    @param durations dictionary of use case key and duration in seconds
+    @returns sorted list of use cases
+    """
+    return sorted(use_cases,
+                  key=lambda use_case: (-durations[use_case['key']],
+                                        use_case['key']))
+
+
+def run_use_case(use_case, output_base, truth_dir=None):
+    """!Run a use case and compare its output to the truth data. Called in a
+    worker process. The output of run_metplus.py is written to a log file in
+    the logs directory of the use case OUTPUT_BASE.
+
+    @param use_case use case dictionary, including the run_settings from
+     get_run_settings
+    @param output_base directory to write output of all use cases. The use
+     case is run with OUTPUT_BASE set to output_base/category/name
+    @param truth_dir (optional) directory containing the output of all use
+     cases to compare to, in the same layout as output_base
+    @returns dictionary with key, return code, duration in seconds, path to
+     log file, list of differences or None if the output was not compared,
+     and the output of the comparison
+    """
+    case_output = os.path.join(output_base, use_case['key'])
+    log_dir = os.path.join(case_output, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    log_file = os.path.join(log_dir, 'run_use_case.log')
+
+    settings = use_case['run_settings']
+    cmd = [settings['python'],
+           os.path.join(METPLUS_HOME, 'ush', 'run_metplus.py')]
+    for config_arg in (use_case['config_args'] + [SYSTEM_CONF] +
+                       settings['config_args']):
+        cmd.extend(['-c', config_arg])
+    cmd.extend(['-c', f'dir.OUTPUT_BASE={case_output}'])
+
+    env = os.environ.copy()
+    env.update(settings['env'])
+
+    start = time.perf_counter()
+    with open(log_file, 'w') as file_handle:
+        file_handle.write(f"CMD: {' '.join(cmd)}\n")
+        file_handle.flush()
+        returncode = subprocess.call(cmd, stdout=file_handle,
+                                     stderr=subprocess.STDOUT, env=env)
+    duration = time.perf_counter() - start
+
+    result = {
+        'key': use_case['key'],
+        'returncode': returncode,
+        'duration': duration,
+        'log_file': log_file,
+        'diff_files': None,
+        'diff_output': '',
+    }
+    if not truth_dir or returncode:
+        return result
+
+    case_truth = os.path.join(truth_dir, use_case['key'])
+    if not os.path.isdir(case_truth):
+        result['diff_output'] = f'No truth data found: {case_truth}\n'
+        return result
+
+    from metplus.util.diff_util import compare_dir
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        result['diff_files'] = compare_dir(case_truth, case_output)
+    result['diff_output'] = output.getvalue()
+    return result
+
+
+def format_duration(seconds):
+    """!Format a duration for output.
+
+    @param seconds duration in seconds
+    @returns string formatted as H:MM:SS
+    """
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}'
+
+
+def print_plan(shards, durations):
+    """!Print the use cases in each shard and their estimated run times.
+
+    @param shards list of tuples of total duration and list of use cases
+    @param durations dictionary of use case key and duration in seconds
+    """
+    for index, (total, shard) in enumerate(shards):
+        print(f'Shard {index}: {len(shard)} use cases, '
+              f'estimated {format_duration(total)}')
+        for use_case in shard:
+            print(f"  {format_duration(durations[use_case['key']])} "
+                  f"{use_case['key']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--categories',
+                        help='comma-separated list of use case categories '
+                             'from all_use_cases.txt. Default is all')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='number of use cases to run at the same time')
+    parser.add_argument('--num_shards', type=int, default=1,
+                        help='number of shards to split the use cases into')
+    parser.add_argument('--shard', type=int, default=0,
+                        help='index of shard to run, starting at 0')
+    parser.add_argument('--output_base',
+                        default=os.environ.get('METPLUS_TEST_OUTPUT_BASE'),
+                        help='directory to write output. Default is '
+                             '$METPLUS_TEST_OUTPUT_BASE')
+    parser.add_argument('--truth_dir',
+                        help='output from a previous run to compare to')
+    parser.add_argument('--history_file',
+                        help='JSON file to read and write use case run '
+                             f'times. Default is {HISTORY_FILENAME} in '
+                             '--output_base')
+    parser.add_argument('--python_env', action='append',
+                        help='<name>=<path to python3> of a conda '
+                             'environment that use cases requiring '
+                             '<name>_env are run in. Can be passed more than '
+                             'once. Use cases that require an environment '
+                             'that is not set are skipped')
+    parser.add_argument('--dry_run', action='store_true',
+                        help='print the use cases in each shard and exit')
+    parser.add_argument('--skip_output_check', action='store_true',
+                        help='run even if output directory is not empty')
+    args = parser.parse_args()
+
+    if args.num_shards < 1 or not 0 <= args.shard < args.num_shards:
+        print('ERROR: --shard must be between 0 and --num_shards - 1')
+        return 1
+
+    categories = None
+    if args.categories:
+        categories = [item.strip() for item in args.categories.split(',')]
+
+    try:
+        python_envs = get_python_envs(args.python_env)
+    except ValueError as err:
+        print(f'ERROR: {err}')
+        return 1
+
+    use_cases = []
+    for use_case in get_use_cases(categories):
+        use_case['run_settings'] = get_run_settings(use_case['requirements'],
+                                                    python_envs)
+        if use_case['run_settings'] is None:
+            env_name = next(item for item in use_case['requirements']
+                            if item.endswith(ENV_SUFFIX))
+            env_name = env_name[:-len(ENV_SUFFIX)]
+            print(f"SKIPPED: {use_case['key']} requires the {env_name} "
+                  f"environment. Pass --python_env {env_name}=<path to "
+                  "python3> to run it")
+            continue
+        use_cases.append(use_case)
+
+    history_file = args.history_file
+    if not history_file and args.output_base:
+        history_file = os.path.join(args.output_base, HISTORY_FILENAME)
+
+    history = read_history(history_file)
+    durations = get_durations(use_cases, history)
+    shards = schedule_shards(use_cases, durations, args.num_shards)
+
+    if args.dry_run:
+        print_plan(shards, durations)
+        return 0
+
+    if not args.output_base:
+        print('ERROR: Must set --output_base or METPLUS_TEST_OUTPUT_BASE')
+        return 1
+
+    # history file from a previous run in the output directory is allowed
+    if (not args.skip_output_check and os.path.isdir(args.output_base) and
+            set(os.listdir(args.output_base)) - {HISTORY_FILENAME}):
+        print(f'ERROR: Output directory is not empty: {args.output_base}')
+        return 1
+
+    os.makedirs(dirname(realpath(history_file)), exist_ok=True)
+
+    total, shard = shards[args.shard]
+    workers = max(1, min(args.workers, len(shard)))
+    print(f'Running {len(shard)} use cases in shard {args.shard} with '
+          f'{workers} workers, estimated {format_duration(total / workers)}')
+
+    failed = []
+    differed = []
+    start = time.perf_counter()
+    # use cases are submitted longest first so each worker starts the
+    # longest remaining use case when it finishes one
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_use_case, use_case, args.output_base,
+                                   args.truth_dir): use_case
+                   for use_case in shard}
+        for future in as_completed(futures):
+            use_case = futures[future]
+            try:
+                result = future.result()
+            except Exception as err:
+                print(f"ERROR: {use_case['key']}: {err}")
+                failed.append(use_case['key'])
+                continue
+
+            add_to_history(history, result['key'], result['duration'])
+            write_history(history_file, history)
+
+            status = 'OK'
+            if result['returncode']:
+                status = f"FAILED ({result['returncode']})"
+                failed.append(result['key'])
+            elif result['diff_files']:
+                status = f"DIFFERED ({len(result['diff_files'])} files)"
+                differed.append(result['key'])
+                print(result['diff_output'])
+            elif result['diff_output']:
+                print(result['diff_output'], end='')
+
+            print(f"{status}: {result['key']} in "
+                  f"{format_duration(result['duration'])} "
+                  f"log: {result['log_file']}")
+
+    print(f'\nFinished in {format_duration(time.perf_counter() - start)}')
+    for key in failed:
+        print(f'ERROR: Use case failed: {key}')
+    for key in differed:
+        print(f'ERROR: Output differed: {key}')
+
+    return 1 if failed or differed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
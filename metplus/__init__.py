@@ -22,6 +22,12 @@ def get_metplus_info(info_rel_path):
 __version__ = get_metplus_version()
 __release_date__ = get_metplus_release_date()
 
-# import util and wrappers
+# import util and wrappers. Wrapper classes are not imported with * because
+# that would import every wrapper module listed in wrappers.__all__
 from .util import *
-from .wrappers import *
+from . import wrappers
+
+
+def __getattr__(name):
+    # wrapper classes are imported when they are first accessed
+    return getattr(wrappers, name)
@@ -13,6 +13,9 @@ import os
 import re
 import sys
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue
+import atexit
 from datetime import datetime, timezone
 import time
 import shutil
@@ -362,16 +365,30 @@ def get_logger(config):
         formatter = METplusLogFormatter(config)
 
         # set up the file logging
-        file_handler = logging.FileHandler(metpluslog, mode='a')
+        file_handler = METplusLogFileHandler(metpluslog, mode='a')
         file_handler.setFormatter(formatter)
         file_handler.setLevel(log_level_val)
-        logger.addHandler(file_handler)
 
         # set up console logging
         stream_handler = logging.StreamHandler()
         stream_handler.setFormatter(formatter)
         stream_handler.setLevel(log_level_terminal_val)
-        logger.addHandler(stream_handler)
+
+        # send log messages to a queue that is read by a background thread
+        # that writes them, so logging does not wait on the file system
+        if config.getbool('config', 'LOG_QUEUE', True):
+            log_queue = Queue()
+            logger.addHandler(QueueHandler(log_queue))
+            listener = METplusLogListener(log_queue, file_handler,
+                                          stream_handler,
+                                          respect_handler_level=True)
+            listener.start()
+            config.log_listener = listener
+            # write remaining messages before the program exits
+            atexit.register(listener.stop)
+        else:
+            logger.addHandler(file_handler)
+            logger.addHandler(stream_handler)
 
     # set add the logger to the config
     config.logger = logger
@@ -406,6 +423,8 @@ def replace_config_from_section(config, section, required=True):
         return config
 
     new_config = METplusConfig()
+    new_config.command_journal = config.command_journal
+    new_config.run_profile = config.run_profile
 
     # copy over all key/values from sections
     for section_to_copy in ['config', 'user_env_vars']:
@@ -455,6 +474,15 @@ class METplusConfig(ProdConfig):
         # config.logger is called in wrappers, so set this name
         # so the code doesn't break
         self.logger = self._logger
+        # set by get_logger if log messages are written by a background thread
+        self.log_listener = None
+        # set by run_metplus to write commands to a file as they are run
+        self.command_journal = None
+        # set by run_metplus to record the resources used by each command
+        self.run_profile = None
+        # incremented when a new variable is set so values that were computed
+        # from the names of the variables can be recomputed
+        self.keys_added = 0
 
         # get the OS environment and store it
         self.env = os.environ.copy()
@@ -464,11 +492,40 @@ class METplusConfig(ProdConfig):
 
     def __del__(self):
         """!When object is deleted, close and remove all log handlers"""
+        listener = getattr(self, 'log_listener', None)
+        if listener is not None:
+            listener.stop()
+            atexit.unregister(listener.stop)
+            for handler in listener.handlers:
+                handler.close()
+            self.log_listener = None
+
         handlers = self.logger.handlers[:]
         for handler in handlers:
             self.logger.removeHandler(handler)
             handler.close()
 
+    def set(self, section, key, value):
+        """! Overrides method in ProdConfig to count the variables that are
+        added after the config was read.
+
+        @param section config section to set
+        @param key name of variable to set
+        @param value value to set
+        """
+        if not self._conf.has_option(str(section), str(key)):
+            self.keys_added += 1
+        super().set(section, key, value)
+
+    def flush_log(self):
+        """!Wait until all log messages that were sent to the queue have
+        been written. Called before other output is appended directly to the
+        METplus log file so messages stay in order. Does nothing if log
+        messages are not written by a background thread.
+        """
+        if self.log_listener is not None:
+            self.log_listener.flush()
+
     def log(self, sublog=None):
         """! Overrides method in ProdConfig
         If the sublog argument is
@@ -905,6 +962,70 @@ class METplusLogFormatter(logging.Formatter):
         return output
 
 
+class METplusLogFileHandler(logging.FileHandler):
+    """!File handler that can write log messages without flushing the file
+    after each message. METplusLogListener turns this on while it is running
+    and flushes the file when no more messages are waiting in the queue, so
+    messages logged in quick succession are written together.
+    """
+    def __init__(self, filename, mode='a'):
+        super().__init__(filename, mode=mode)
+        self.batch_writes = False
+
+    def emit(self, record):
+        if not self.batch_writes:
+            super().emit(record)
+            return
+
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class METplusLogListener(QueueListener):
+    """!Reads log messages from a queue in a background thread and sends
+    them to the file and terminal handlers. Handlers are flushed when the
+    queue is empty instead of after every message.
+    """
+    def start(self):
+        for handler in self.handlers:
+            if isinstance(handler, METplusLogFileHandler):
+                handler.batch_writes = True
+        super().start()
+
+    def stop(self):
+        """!Write all remaining messages and stop the thread. Safe to call
+        more than once.
+        """
+        if self._thread is None:
+            return
+        super().stop()
+        for handler in self.handlers:
+            if isinstance(handler, METplusLogFileHandler):
+                handler.batch_writes = False
+            # stream may already be closed if called when the program exits
+            try:
+                handler.flush()
+            except (OSError, ValueError):
+                pass
+
+    def flush(self):
+        """!Wait until all messages in the queue have been written."""
+        if self._thread is not None:
+            self.queue.join()
+
+    def handle(self, record):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
 def parse_var_list(config, time_info=None, data_type=None, met_tool=None,
                    levels_as_list=False):
     """ read conf items and populate list of dictionaries containing
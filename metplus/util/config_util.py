@@ -1,5 +1,8 @@
 import os
 import re
+import json
+import threading
+from itertools import chain
 
 from .string_manip import getlist, get_wrapper_name
 from .string_template_substitution import do_string_sub
@@ -151,28 +154,41 @@ def write_final_conf(config):
         config.write(conf_file)
 
 
+def get_all_commands_path(config):
+    """! Get path to file in the log directory that lists all commands that
+     were run and the environment variables that were set for each.
+
+    @param config METplusConfig object to read log directory and timestamp
+    @returns path to all_commands file
+    """
+    log_timestamp = config.getstr('config', 'LOG_TIMESTAMP')
+    return os.path.join(config.getdir('LOG_DIR'),
+                        f'.all_commands.{log_timestamp}')
+
+
 def write_all_commands(all_commands, config):
     """! Write all commands that were run to a file in the log
      directory. This includes the environment variables that
      were set before each command.
 
-    @param all_commands list of tuples with command run and
-     list of environment variables that were set
+    @param all_commands list or iterator of tuples with command run and
+     list of environment variables that were set, e.g. the output of
+     read_command_journal
     @param config METplusConfig object used to write log output
      and get the log timestamp to name the output file
     @returns False if no commands were provided, True otherwise
     """
-    if not all_commands:
+    all_commands = iter(all_commands)
+    first_command = next(all_commands, None)
+    if first_command is None:
         config.logger.info("No commands were run. "
                            "Skip writing all_commands file")
         return False
 
-    log_timestamp = config.getstr('config', 'LOG_TIMESTAMP')
-    filename = os.path.join(config.getdir('LOG_DIR'),
-                            f'.all_commands.{log_timestamp}')
+    filename = get_all_commands_path(config)
     config.logger.debug(f"Writing all commands and environment to {filename}")
     with open(filename, 'w') as file_handle:
-        for command, envs in all_commands:
+        for command, envs in chain([first_command], all_commands):
             for env in envs:
                 file_handle.write(f"{env}\n")
 
@@ -182,6 +198,142 @@ def write_all_commands(all_commands, config):
     return True
 
 
+def format_copyable_env(env, var_list, shell=''):
+    """! Format environment variables as shell commands that can be copied
+     into a terminal to recreate the environment.
+
+    @param env dictionary of environment variables
+    @param var_list names of the variables from env to include
+    @param shell user shell. csh uses setenv, all others use export
+    @returns string of shell commands separated by semi-colons
+    """
+    out = ""
+    for var in sorted(var_list):
+        if shell.lower() == 'csh':
+            # NOTE: Complex environment variables that have special characters
+            # like { or } will not be copyable in csh until modifications are
+            # made to the formatting of the setenv calls
+            clean_env = env[var].replace('"', '"\\""')
+            line = 'setenv ' + var + ' "' + clean_env + '"'
+        else:
+            # insert escape characters to allow export command to be copyable
+            clean_env = env[var].replace('"', r'\"').replace(r'\\"', r'\\\"')
+            line = 'export ' + var + '="' + clean_env + '"'
+        line = line.replace('\n', '')
+        out += line + '; '
+
+    return out
+
+
+def get_env_log_lines(env, shell='', env_list=None):
+    """! Get the lines that list environment variables that were set for a
+     command, in the same format as CommandBuilder.print_all_envs
+
+    @param env dictionary of environment variables that were set
+    @param shell user shell used to format the copyable environment
+    @param env_list (optional) names of the variables in env that were set
+     by the wrapper, which are listed one per line. All variables in env are
+     listed if not set. All variables in env are always included in the
+     copyable environment
+    @returns list of strings
+    """
+    if env_list is None:
+        env_list = env
+    lines = ["ENVIRONMENT FOR NEXT COMMAND: "]
+    lines.extend(f"{key}={env[key]}" for key in sorted(env_list))
+    lines.append("COPYABLE ENVIRONMENT FOR NEXT COMMAND: ")
+    lines.append(format_copyable_env(env, env, shell))
+    return lines
+
+
+class CommandJournal:
+    """! Append-only file that records each command when it is run. Each line
+     is a JSON object with the command and only the environment variables
+     that changed since the previous command, so the environment of each
+     command is not kept in memory and is not lost if the run stops early.
+     Use read_command_journal to read the commands back.
+    """
+    def __init__(self, path):
+        """! @param path file to write. It is created when the first command
+         is added
+        """
+        self.path = path
+        self.count = 0
+        self._env = {}
+        self._env_list = None
+        self._shell = ''
+        self._file = None
+        self._lock = threading.Lock()
+
+    def add(self, cmd, env, shell='', env_list=None):
+        """! Write a command to the journal
+
+        @param cmd command that was run
+        @param env dictionary of environment variables set for the command
+        @param shell user shell used to format the copyable environment
+        @param env_list (optional) names of the variables in env that were
+         set by the wrapper. See get_env_log_lines
+        """
+        if env_list is not None:
+            env_list = sorted(env_list)
+        with self._lock:
+            record = {'cmd': cmd}
+            changed = {key: value for key, value in sorted(env.items())
+                       if self._env.get(key) != value}
+            if changed:
+                record['env'] = changed
+            unset = sorted(key for key in self._env if key not in env)
+            if unset:
+                record['unset'] = unset
+            if shell != self._shell:
+                record['shell'] = shell
+            if env_list != self._env_list:
+                record['env_list'] = env_list
+
+            if self._file is None:
+                mkdir_p(os.path.dirname(self.path))
+                self._file = open(self.path, 'w')
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+
+            self._env = dict(env)
+            self._env_list = env_list
+            self._shell = shell
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_command_journal(path):
+    """! Read commands from a file written by CommandJournal. A line that
+     was only partially written because the run stopped is skipped.
+
+    @param path journal file to read
+    @returns generator of tuples with the command and the list of
+     environment variable lines that CommandBuilder.print_all_envs creates
+    """
+    env = {}
+    env_list = None
+    shell = ''
+    with open(path, 'r') as file_handle:
+        for line in file_handle:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            for key in record.get('unset', []):
+                env.pop(key, None)
+            env.update(record.get('env', {}))
+            shell = record.get('shell', shell)
+            env_list = record.get('env_list', env_list)
+            yield record['cmd'], get_env_log_lines(env, shell, env_list)
+
+
 def sub_var_list(var_list, time_info):
     """! Perform string substitution on var list values with time info
 
@@ -5,11 +5,14 @@ import os
 import netCDF4
 import filecmp
 import csv
+import io
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
 from numbers import Number
+import numpy as np
 from PIL import Image, ImageChops
 from pandas import isnull
 from numpy.ma import is_masked
-from numpy.core._exceptions import UFuncTypeError
 
 IMAGE_EXTENSIONS = [
     '.jpg',
@@ -67,6 +70,10 @@ ROUNDING_OVERRIDES = {
     'UserScript_fcstS2S_obsERAI_CrossSpectra': 4,
 }
 
+# maximum number of values to read from each NetCDF variable at a time
+# when comparing NetCDF files
+NC_CHUNK_SIZE = 4 * 1024 * 1024
+
 # number of decision places to accept float differences
 # Note: Completing METplus issue #1873 could allow this to be set to 6
 rounding_precision = DEFAULT_ROUNDING_PRECISION
@@ -105,13 +112,28 @@ def get_file_type(filepath):
     return 'unknown'
 
 
-def dirs_are_equal(dir_a, dir_b, debug=False, save_diff=False):
-    if compare_dir(dir_a, dir_b, debug=debug, save_diff=save_diff):
+def dirs_are_equal(dir_a, dir_b, debug=False, save_diff=False,
+                   processes=1):
+    if compare_dir(dir_a, dir_b, debug=debug, save_diff=save_diff,
+                   processes=processes):
         return False
     return True
 
 
-def compare_dir(dir_a, dir_b, debug=False, save_diff=False):
+def compare_dir(dir_a, dir_b, debug=False, save_diff=False, processes=1):
+    """!Compare all files in 2 directories and print a summary of the files
+    that differ.
+
+    @param dir_a directory (or file) containing truth data
+    @param dir_b directory (or file) containing output to compare
+    @param debug (optional) boolean to output more information about diffs
+    @param save_diff (optional) boolean to save difference images
+    @param processes (optional) number of processes to use to compare files
+     in parallel. The output of each comparison is printed in the same order
+     as it would be if files were compared one at a time. Default is 1
+    @returns list of tuples for each file that differs containing path A,
+     path B, reason, and path of difference file
+    """
     print('::group::Full diff results:')
     # if input are files and not directories, compare them 
     if os.path.isfile(dir_a):
@@ -122,28 +144,23 @@ def compare_dir(dir_a, dir_b, debug=False, save_diff=False):
         return [result]
 
     diff_files = []
-    for filepath_a in _get_files(dir_a):
-        filepath_b = filepath_a.replace(dir_a, dir_b)
-        print("\n# # # # # # # # # # # # # # # # # # # # # # # # # # "
-              "# # # #\n")
-        rel_path = filepath_a.replace(f'{dir_a}/', '')
-        print(f"COMPARING {rel_path}")
-        try:
-            result = compare_files(filepath_a,
-                                   filepath_b,
-                                   debug=debug,
-                                   dir_a=dir_a,
-                                   dir_b=dir_b,
-                                   save_diff=save_diff)
-        except Exception as err:
-            print(f"ERROR: Exception occurred in diff logic: {err}")
-            result = filepath_a, filepath_b, 'Exception in diff logic', ''
-
-        # no differences of skipped
-        if result is None or result is True:
-            continue
+    args = [(filepath_a, dir_a, dir_b, debug, save_diff)
+            for filepath_a in _get_files(dir_a)]
+    if processes > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = executor.map(_compare_files_captured, args)
+            for result, output in results:
+                print(output, end='')
+                if result is not None and result is not True:
+                    diff_files.append(result)
+    else:
+        for arg in args:
+            result = _compare_dir_file(*arg)
+            # no differences of skipped
+            if result is None or result is True:
+                continue
 
-        diff_files.append(result)
+            diff_files.append(result)
 
     # loop through dir_b and report if any files are not found in dir_a
     for filepath_b in _get_files(dir_b):
@@ -163,6 +180,47 @@ def compare_dir(dir_a, dir_b, debug=False, save_diff=False):
     return diff_files
 
 
+def _compare_dir_file(filepath_a, dir_a, dir_b, debug, save_diff):
+    """!Compare a file found in dir_a to the file in the same relative
+    location in dir_b.
+
+    @param filepath_a path of file in dir_a
+    @param dir_a directory containing truth data
+    @param dir_b directory containing output to compare
+    @param debug boolean to output more information about diffs
+    @param save_diff boolean to save difference images
+    @returns result from compare_files
+    """
+    filepath_b = filepath_a.replace(dir_a, dir_b)
+    print("\n# # # # # # # # # # # # # # # # # # # # # # # # # # "
+          "# # # #\n")
+    rel_path = filepath_a.replace(f'{dir_a}/', '')
+    print(f"COMPARING {rel_path}")
+    try:
+        return compare_files(filepath_a,
+                             filepath_b,
+                             debug=debug,
+                             dir_a=dir_a,
+                             dir_b=dir_b,
+                             save_diff=save_diff)
+    except Exception as err:
+        print(f"ERROR: Exception occurred in diff logic: {err}")
+        return filepath_a, filepath_b, 'Exception in diff logic', ''
+
+
+def _compare_files_captured(args):
+    """!Compare files in a worker process, capturing the output so it can be
+    printed in order by the main process.
+
+    @param args tuple of arguments to pass to _compare_dir_file
+    @returns tuple of result from compare_files and output that was printed
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        result = _compare_dir_file(*args)
+    return result, output.getvalue()
+
+
 def _get_files(search_dir):
     """!Generator to get all files in a directory.
     Skips directories that end with 'logs' and files named metplus_final.conf
@@ -643,9 +701,19 @@ def nc_is_equal(file_a, file_b, fields=None, debug=False):
     @param debug (optional) boolean to output more information about diff
     @returns True if all values in fields are equivalent, False if not
     """
-    nc_a = netCDF4.Dataset(file_a)
-    nc_b = netCDF4.Dataset(file_b)
+    with netCDF4.Dataset(file_a) as nc_a, netCDF4.Dataset(file_b) as nc_b:
+        return _nc_datasets_are_equal(nc_a, nc_b, fields=fields, debug=debug)
+
+
+def _nc_datasets_are_equal(nc_a, nc_b, fields=None, debug=False):
+    """! Check if two NetCDF datasets have the same data
 
+    @param nc_a first netCDF4.Dataset
+    @param nc_b second netCDF4.Dataset
+    @param fields (Optional) list of fields to compare. If unset, compare all
+    @param debug (optional) boolean to output more information about diff
+    @returns True if all values in fields are equivalent, False if not
+    """
     # keep track of any differences that are found
     is_equal = True
 
@@ -673,7 +741,12 @@ def nc_is_equal(file_a, file_b, fields=None, debug=False):
 
 
 def _nc_fields_are_equal(field, nc_a, nc_b, debug=False):
-    """!Compare same field from 2 NetCDF files.
+    """!Compare same field from 2 NetCDF files. Numeric fields are read and
+    compared in slabs of at most NC_CHUNK_SIZE values along the first
+    dimension, stopping at the first slab that differs. Values must match
+    exactly unless the field contains NaN, in which case values that are
+    equal after truncating or rounding to rounding_precision decimal places
+    are also equal.
 
     @param field name of field to compare
     @param nc_a first netCDF4.Dataset
@@ -692,14 +765,14 @@ def _nc_fields_are_equal(field, nc_a, nc_b, debug=False):
     if debug:
         print(f"Field: {field}")
         print(f"Var_A:{var_a}\nVar_B:{var_b}")
-        print(f"Instance type: {type(var_a[0])}")
 
-    values_a = var_a[:]
-    values_b = var_b[:]
-    try:
-        values_diff = values_a - values_b
-    except (UFuncTypeError, TypeError):
-        # handle non-numeric fields
+    if var_a.shape != var_b.shape:
+        print(f"ERROR: Field ({field}) shapes differ\n"
+              f" File_A: {var_a.shape}\n File_B: {var_b.shape}")
+        return False
+
+    # handle non-numeric fields
+    if not _is_numeric_var(var_a) or not _is_numeric_var(var_b):
         if not _all_values_are_equal(var_a, var_b):
             print(f"ERROR: Field ({field}) values (non-numeric) "
                   "differ\n"
@@ -708,43 +781,150 @@ def _nc_fields_are_equal(field, nc_a, nc_b, debug=False):
 
         return True
 
-    # if any NaN values in either data set, min and max of diff will be NaN
-    # compare each value
-    if isnull(values_diff.min()) and isnull(values_diff.max()):
-        print(f"Variable {field} contains NaN. Comparing each value...")
-        if not _all_values_are_equal(var_a, var_b):
-            print(f'ERROR: Some values differ in {field}')
+    # if any values are NaN, values are compared to rounding_precision
+    # decimal places, so a slab that only differs before rounding is not
+    # reported until all slabs have been checked for NaN
+    has_nan = False
+    first_diff = None
+    for start, values_a, values_b in _get_nc_slabs(var_a, var_b):
+        data_a, data_b, differs, differs_rounded, slab_has_nan = (
+            _compare_nc_slab(values_a, values_b)
+        )
+        if slab_has_nan and not has_nan:
+            print(f"Variable {field} contains NaN. Comparing each value...")
+            has_nan = True
+
+        if differs_rounded.any():
+            _print_nc_field_diff(field, data_a, data_b, differs_rounded,
+                                 start, debug=debug)
             return False
-        return True
 
-    # consider all values equal is min and max diff are 0
-    if not values_diff.min() and not values_diff.max():
-        return True
+        if first_diff is None and differs.any():
+            first_diff = (data_a, data_b, differs, start)
+
+    if first_diff is not None and not has_nan:
+        _print_nc_field_diff(field, *first_diff, debug=debug)
+        return False
+
+    return True
+
+
+def _is_numeric_var(var):
+    """!Check if NetCDF variable contains numeric values
+
+    @param var netCDF4.Variable
+    @returns True if values are numbers, False otherwise
+    """
+    try:
+        return np.dtype(var.dtype).kind in 'biuf'
+    except TypeError:
+        return False
 
+
+def _get_nc_slabs(var_a, var_b):
+    """!Generator to read the same slabs of 2 NetCDF variables that have the
+    same shape. Each slab contains one or more indices of the first dimension
+    and no more than NC_CHUNK_SIZE values unless a single index is larger.
+
+    @param var_a first netCDF4.Variable
+    @param var_b second netCDF4.Variable
+    @returns generator of tuples containing index of the first value in the
+     slab, values from var_a, and values from var_b
+    """
+    if not var_a.shape or not var_a.shape[0]:
+        yield 0, var_a[...], var_b[...]
+        return
+
+    num_rows = var_a.shape[0]
+    row_size = int(np.prod(var_a.shape[1:], dtype=np.int64))
+    rows_per_slab = max(1, NC_CHUNK_SIZE // max(1, row_size))
+    for row in range(0, num_rows, rows_per_slab):
+        end = min(row + rows_per_slab, num_rows)
+        yield row * row_size, var_a[row:end], var_b[row:end]
+
+
+def _compare_nc_slab(values_a, values_b):
+    """!Compare slab of values read from 2 NetCDF variables. Values that are
+    masked in either slab are not compared. Values that are NaN in both
+    slabs are equal.
+
+    @param values_a numpy array (possibly masked) of values from first file
+    @param values_b numpy array (possibly masked) of values from second file
+    @returns tuple of the data from each slab, boolean array that is True
+     where values are not exactly equal, boolean array that is True where
+     values are not equal after truncating or rounding to rounding_precision
+     decimal places (see _is_equal_rounded), and True if any value that is
+     compared is NaN
+    """
+    mask = np.ma.getmaskarray(values_a) | np.ma.getmaskarray(values_b)
+    data_a = np.ma.getdata(values_a)
+    data_b = np.ma.getdata(values_b)
+
+    differs = ~((data_a == data_b) | mask)
+    has_nan = False
+    if np.issubdtype(data_a.dtype, np.inexact):
+        nan_a = np.isnan(data_a)
+        nan_b = np.isnan(data_b)
+        has_nan = bool(((nan_a | nan_b) & ~mask).any())
+        differs &= ~(nan_a & nan_b)
+
+    if not differs.any():
+        return data_a, data_b, differs, differs, has_nan
+
+    # compare values that differ after truncating and rounding
+    float_a = data_a[differs].astype(np.float64)
+    float_b = data_b[differs].astype(np.float64)
+    factor = 1 / (10 ** rounding_precision)
+    with np.errstate(invalid='ignore', over='ignore'):
+        is_equal = (
+            (np.floor_divide(float_a, factor) * factor ==
+             np.floor_divide(float_b, factor) * factor) |
+            (np.round(float_a, rounding_precision) ==
+             np.round(float_b, rounding_precision))
+        )
+    differs_rounded = differs.copy()
+    differs_rounded[differs] = ~is_equal
+    return data_a, data_b, differs, differs_rounded, has_nan
+
+
+def _print_nc_field_diff(field, data_a, data_b, differs, start, debug=False):
+    """!Print error with the range of differences of values in a slab.
+
+    @param field name of field
+    @param data_a numpy array of values from first file
+    @param data_b numpy array of values from second file
+    @param differs numpy boolean array that is True where values differ
+    @param start index of first value of slab in the flattened variable
+    @param debug (optional) boolean to output more information about diff
+    """
+    with np.errstate(invalid='ignore', over='ignore'):
+        values_diff = (data_a.astype(np.float64) -
+                       data_b.astype(np.float64))[differs]
     print(f"ERROR: Field ({field}) values differ\n"
           f"Min diff: {values_diff.min()}, "
           f"Max diff: {values_diff.max()}")
     if debug:
         # print indices that are not zero and count of diffs
-        _print_nc_field_diff_summary(values_diff)
-
-    return False
+        _print_nc_field_diff_summary(data_a, data_b, differs, start)
 
 
-def _print_nc_field_diff_summary(values_diff):
+def _print_nc_field_diff_summary(data_a, data_b, differs, start=0):
     """!Print summary of NetCDF fields that differ. Prints the index of each
     point that differs with the numeric difference between the points.
-    Also print number of points that differ and the total number of points.
+    Also print number of points that differ and the total number of points
+    in the slab that was compared.
 
-    @param values_diff numpy array (possibly 2D) of differences
+    @param data_a numpy array of values from first file
+    @param data_b numpy array of values from second file
+    @param differs numpy boolean array that is True where values differ
+    @param start index of first value in the flattened variable
     """
-    count = 0
-    values_list = [j for sub in values_diff.tolist() for j in sub]
-    for idx, val in enumerate(values_list):
-        if val != 0.0:
-            print(f"{idx}: {val}")
-            count += 1
-    print(f"{count} / {idx + 1} points differ")
+    flat_a = data_a.ravel()
+    flat_b = data_b.ravel()
+    indices = np.flatnonzero(differs)
+    for idx in indices:
+        print(f"{start + idx}: {flat_a[idx] - flat_b[idx]}")
+    print(f"{indices.size} / {differs.size} points differ")
 
 
 def _all_values_are_equal(var_a, var_b):
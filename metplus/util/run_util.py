@@ -1,20 +1,33 @@
 import sys
 import os
+import json
 import shutil
 import logging
+import resource
+from contextlib import nullcontext
 from datetime import datetime
 from importlib import import_module
 
 from .constants import NO_COMMAND_WRAPPERS
 from .string_manip import get_logfile_info, log_terminal_includes_info
 from .system_util import get_user_info, write_list_to_file
+from .system_util import enable_file_cache, get_file_cache_stats
+from .system_util import invalidate_file_cache
 from .config_util import get_process_list, handle_env_var_config
 from .config_util import handle_tmp_dir, write_final_conf, write_all_commands
+from .config_util import CommandJournal, read_command_journal
+from .config_util import get_all_commands_path
 from .config_validate import validate_config_variables
 from .. import get_metplus_version
 from .config_metplus import setup
 from . import camel_to_underscore
 
+# values that are summed for each row of the run profile summary tables
+PROFILE_TOTAL = {
+    'count': 0, 'wall': 0.0, 'user_cpu': 0.0, 'sys_cpu': 0.0,
+    'max_rss_kb': 0, 'bytes_read': 0, 'bytes_written': 0,
+}
+
 
 def pre_run_setup(config_inputs):
 
@@ -102,6 +115,23 @@ def run_metplus(config):
     # Use config object to get the list of processes to call
     process_list = get_process_list(config)
 
+    # cache results of checking if input files exist
+    use_file_cache = config.getbool('config', 'METPLUS_FILE_CACHE', False)
+    enable_file_cache(use_file_cache)
+
+    # write each command to a journal file as it is run instead of keeping
+    # all commands and their environment in memory until the end of the run
+    journal = CommandJournal(f'{get_all_commands_path(config)}.journal')
+    config.command_journal = journal
+
+    # record the time and resources used by each command and wrapper
+    profile = None
+    if config.getbool('config', 'METPLUS_PROFILE', False):
+        # import here to avoid circular import
+        from ..wrappers.command_runner import RunProfile
+        profile = RunProfile(get_run_profile_path(config))
+        config.run_profile = profile
+
     try:
         # if Usage is in process list, run it and exit
         if 'Usage' in process_list:
@@ -119,14 +149,39 @@ def run_metplus(config):
         if init_errors:
             return init_errors
 
-        all_commands = []
+        stream = _share_command_pool(processes, config)
+        for index, process in enumerate(processes):
+            # wait for commands of previous processes to finish before
+            # running a process that cannot run its commands in the
+            # background because it may use their output
+            if stream and not process.cmdrunner.is_concurrent:
+                for previous in processes[:index]:
+                    previous.wait_for_commands()
+
+            # discard cached directory contents because files may have been
+            # written by the previous process without running a command
+            invalidate_file_cache()
+
+            with _profile_wrapper(profile, process):
+                process.run_all_times()
+
+            # wait for commands running in the background to finish
+            # because the next process may use their output
+            if not stream:
+                process.wait_for_commands()
+
+        # wait for any commands that are still running
         for process in processes:
-            new_commands = process.run_all_times()
-            if new_commands:
-                all_commands.extend(new_commands)
+            process.wait_for_commands()
 
         # write out all commands and environment variables to file
-        write_all_commands(all_commands, config)
+        # and remove the journal once they have been written
+        journal.close()
+        all_commands = []
+        if journal.count:
+            all_commands = read_command_journal(journal.path)
+        if write_all_commands(all_commands, config):
+            os.remove(journal.path)
 
         # compute total number of errors that occurred and output results
         return _check_wrapper_run_errors(processes, config.logger)
@@ -135,6 +190,187 @@ def run_metplus(config):
         config.logger.info("Check the log file for more information: "
                            f"{get_logfile_info(config)}")
         return 1
+    finally:
+        journal.close()
+        config.command_journal = None
+        if profile is not None:
+            profile.close()
+            config.run_profile = None
+        if use_file_cache:
+            hits, misses, num_dirs = get_file_cache_stats()
+            config.logger.info(f"Filesystem cache: {hits} hits, "
+                               f"{misses} misses, {num_dirs} directories "
+                               "cached")
+        enable_file_cache(False)
+
+
+def get_run_profile_path(config):
+    """!Get path to the file in the log directory that records the time and
+    resources used by each command and wrapper when METPLUS_PROFILE is True
+
+    @param config METplusConfig object to read log directory and timestamp
+    @returns path to run profile file
+    """
+    filename = 'metplus_profile'
+    log_timestamp = config.getstr('config', 'LOG_TIMESTAMP', '')
+    if log_timestamp:
+        filename += f'.{log_timestamp}'
+    return os.path.join(config.getdir('LOG_DIR'), f'{filename}.jsonl')
+
+
+def _profile_wrapper(profile, process):
+    """!Get a context manager that records the time spent running a wrapper
+    and the CPU time used by the Python process, which does not include the
+    commands that the wrapper runs. Does nothing if profile is None.
+
+    @param profile RunProfile object or None
+    @param process wrapper instance
+    @returns context manager
+    """
+    if profile is None:
+        return nullcontext()
+
+    record = {
+        'type': 'wrapper',
+        'wrapper': process.__class__.__name__.replace('Wrapper', ''),
+        'instance': process.instance,
+    }
+    return profile.measure(record, who=resource.RUSAGE_SELF)
+
+
+def log_run_profile_summary(config):
+    """!Read the run profile file and log tables that sum the time and
+    resources used by commands for each wrapper, executable, and lead time.
+    The wrapper table also includes the CPU time used by the Python wrapper
+    logic, which is measured separately from the commands.
+
+    @param config METplusConfig object to read settings and log output
+    @returns True if tables were logged, False if there is no profile
+    """
+    if not config.getbool('config', 'METPLUS_PROFILE', False):
+        return False
+
+    profile_path = get_run_profile_path(config)
+    if not os.path.exists(profile_path):
+        return False
+
+    commands = []
+    wrappers = {}
+    with open(profile_path, 'r') as file_handle:
+        for line in file_handle:
+            record = json.loads(line)
+            if record.get('type') == 'wrapper':
+                name = _get_profile_wrapper_name(record)
+                wrappers[name] = (wrappers.get(name, 0) +
+                                  record['user_cpu'] + record['sys_cpu'])
+            else:
+                commands.append(record)
+
+    logger = config.logger
+    logger.info(f"Run profile written to {profile_path}")
+    for title, get_key in (('Wrapper', _get_profile_wrapper_name),
+                           ('Executable', lambda item: item.get('exe')),
+                           ('Lead', lambda item: item.get('lead') or 'N/A')):
+        totals = {}
+        # include wrappers that did not run any commands
+        if title == 'Wrapper':
+            totals = {name: dict(PROFILE_TOTAL) for name in wrappers}
+
+        for record in commands:
+            total = totals.setdefault(get_key(record), dict(PROFILE_TOTAL))
+            total['count'] += record.get('batch_size', 1)
+            for key in ('wall', 'user_cpu', 'sys_cpu', 'bytes_read',
+                        'bytes_written'):
+                total[key] += record[key]
+            total['max_rss_kb'] = max(total['max_rss_kb'],
+                                      record['max_rss_kb'])
+
+        for line in _format_profile_table(title, totals, wrappers):
+            logger.info(line)
+
+    return True
+
+
+def _get_profile_wrapper_name(record):
+    name = record.get('wrapper') or 'N/A'
+    if record.get('instance'):
+        name = f"{name}({record['instance']})"
+    return name
+
+
+def _format_profile_table(title, totals, wrappers):
+    """!Format run profile totals as lines of a table sorted by wall time
+
+    @param title name of the first column
+    @param totals dictionary of totals keyed by the first column value
+    @param wrappers dictionary of Python CPU seconds keyed by wrapper name,
+     only used if title is Wrapper
+    @returns list of strings
+    """
+    header = ['Count', 'Wall(s)', 'User(s)', 'Sys(s)', 'MaxRSS(MB)',
+              'Read(MB)', 'Write(MB)']
+    if title == 'Wrapper':
+        header.append('Python(s)')
+
+    rows = []
+    for name, total in sorted(totals.items(),
+                              key=lambda item: -item[1]['wall']):
+        row = [str(name),
+               str(total['count']),
+               f"{total['wall']:.2f}",
+               f"{total['user_cpu']:.2f}",
+               f"{total['sys_cpu']:.2f}",
+               f"{total['max_rss_kb'] / 1024:.1f}",
+               f"{total['bytes_read'] / 1024 ** 2:.1f}",
+               f"{total['bytes_written'] / 1024 ** 2:.1f}"]
+        if title == 'Wrapper':
+            row.append(f"{wrappers.get(name, 0):.2f}")
+        rows.append(row)
+
+    header.insert(0, title)
+    widths = [max(len(row[index]) for row in rows + [header])
+              for index in range(len(header))]
+    lines = []
+    for row in [header] + rows:
+        lines.append('  '.join([row[0].ljust(widths[0])] +
+                               [value.rjust(width) for value, width
+                                in zip(row[1:], widths[1:])]))
+    return lines
+
+
+def _share_command_pool(processes, config):
+    """!If METPLUS_STREAM_PROCESS_LIST is True, set all wrappers that can run
+    commands in the background to use the same pool of workers so commands
+    of a process can start before the commands of the previous processes
+    have finished. Commands that read files written by another command wait
+    for that command to finish.
+
+    @param processes list of wrapper instances
+    @param config METplusConfig object to read settings
+    @returns True if the pool is shared, False otherwise
+    """
+    if not config.getbool('config', 'METPLUS_STREAM_PROCESS_LIST', False):
+        return False
+
+    runners = [process.cmdrunner for process in processes
+               if process.cmdrunner.is_concurrent]
+    if not runners:
+        config.logger.warning('Ignoring METPLUS_STREAM_PROCESS_LIST because '
+                              'METPLUS_MAX_PARALLEL_COMMANDS is not greater '
+                              'than 1')
+        return False
+
+    # import here to avoid circular import
+    from ..wrappers.command_runner import CommandPool
+
+    max_workers = max(runner.max_parallel for runner in runners)
+    pool = CommandPool(max_workers, logger=config.logger)
+    # runners that cannot submit commands also use the pool so the commands
+    # they run can be recorded as running while other commands are running
+    for process in processes:
+        process.cmdrunner.pool = pool
+
+    return True
 
 
 def _get_wrapper_instance(config, process, instance=None):
@@ -254,6 +490,9 @@ def post_run_cleanup(config, app_name, total_errors):
     # rewrite final conf so it contains all of the default values used
     write_final_conf(config)
 
+    # log time and resources used by commands if run profile is enabled
+    log_run_profile_summary(config)
+
     # compute time it took to run
     end_clock_time = datetime.now()
     total_run_time = end_clock_time - start_clock_time
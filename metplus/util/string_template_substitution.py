@@ -14,11 +14,15 @@ Condition codes: Varies
 
 import os
 import re
+import bisect
 import datetime
+import functools
 from dateutil.relativedelta import relativedelta
 
 from . import time_util
 from .constants import COMPRESSION_EXTENSIONS
+from .system_util import path_isdir, get_file_cache_generation
+from .system_util import is_file_cache_enabled
 
 TEMPLATE_IDENTIFIER_BEGIN = "{"
 TEMPLATE_IDENTIFIER_END = "}"
@@ -49,16 +53,27 @@ LENGTH_DICT = {'Y': 4,
 
 MAX_ATTEMPTS = 5
 
+# maximum number of parsed templates to keep
+TEMPLATE_CACHE_SIZE = 256
+
+# maximum number of results to keep for do_string_sub
+STRING_SUB_CACHE_SIZE = 4096
+
 def multiple_replace(replace_dict, text):
     """Helper function for do_string_sub. Replace in 'text' all occurrences of any key in the
     given dictionary by its corresponding value.  Returns the new string. """
 
     # Create a regular expression  from the dictionary keys
-    regex = re.compile("(%s)" % "|".join(map(re.escape, replace_dict.keys())))
+    regex = _get_replace_regex(tuple(replace_dict.keys()))
 
     # For each match, look-up corresponding value in dictionary
     return regex.sub(lambda mo: replace_dict[mo.string[mo.start():mo.end()]], text)
 
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _get_replace_regex(keys):
+    """!Get compiled regular expression that matches any of the keys"""
+    return re.compile("(%s)" % "|".join(map(re.escape, keys)))
+
 def get_tags(template):
     """!Parse template and pull out all wildcard characters (* or ?) and all
         tags, i.e. {init?fmt=%H}. Used to pull out information from a template that
@@ -345,28 +360,89 @@ def do_string_sub(tmpl,
         # if recursion is off, only attempt once
         attempt_local = 0
 
-    # find inner most tags between nested curly braces
-    # match_list is a list with the contents being the data between the
-    # curly braces
-    match_list = re.findall(r'\{([^}{]*)}', tmpl)
-
-    if len(match_list) == 0:
+    # get tags from template, which is only parsed the first time it is used
+    tags, names = _get_string_sub_tags(tmpl)
+    if not tags:
         return tmpl
 
-    match_result = find_and_replace_tags_in_template(match_list,
-                                                     tmpl,
-                                                     kwargs,
-                                                     skip_missing_tags)
-
     # if no more recursive attempts should be made, return the result
     if attempt_local <= 0:
-        return match_result
+        return _render_tags(tmpl, tags, names, kwargs, skip_missing_tags)
 
+    match_result = _replace_tags(tags, tmpl, kwargs, skip_missing_tags)
     return do_string_sub(match_result,
                          skip_missing_tags=skip_missing_tags,
                          attempt=attempt_local-1,
                          **kwargs)
 
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _get_string_sub_tags(tmpl):
+    """!Parse template for do_string_sub. Results are cached so each template
+        is only parsed once.
+        @param tmpl template to parse
+        @returns tuple of a tuple of tag information (see _get_tag_info) and
+         a tuple of the names of the arguments that are used to substitute
+         the tags
+    """
+    # find inner most tags between nested curly braces
+    # match_list is a list with the contents being the data between the
+    # curly braces
+    match_list = re.findall(r'\{([^}{]*)}', tmpl)
+    tags = tuple(_get_tag_info(match) for match in match_list)
+    names = tuple(dict.fromkeys(tag[1][0] for tag in tags))
+    return tags, names
+
+def _get_tag_info(match):
+    """!Split tag contents into items and find shift, truncate, and
+        format items.
+        @param match contents of a tag, i.e. valid?fmt=%Y%m%d
+        @returns tuple of the string to replace, list of items in the tag,
+         True if the tag has a shift item, True if the tag has a truncate item,
+         and a tuple of the indices of any format items
+    """
+    string_to_replace = TEMPLATE_IDENTIFIER_BEGIN + match + \
+                        TEMPLATE_IDENTIFIER_END
+    split_string = match.split(FORMATTING_DELIMITER)
+    has_shift = any(item.startswith(SHIFT_STRING) for item in split_string)
+    has_truncate = any(item.startswith(TRUNCATE_STRING)
+                       for item in split_string)
+    format_indices = tuple(idx for idx, item in enumerate(split_string)
+                           if item.startswith(FORMAT_STRING))
+    return (string_to_replace, split_string, has_shift, has_truncate,
+            format_indices)
+
+def _render_tags(tmpl, tags, names, kwargs, skip_missing_tags):
+    """!Substitute tags in template using cached results if the same values
+        were used to substitute the template recently. Values that cannot be
+        hashed or a missing value that will raise an exception skip the cache.
+        @returns template with tags substituted with values
+    """
+    key = []
+    # valid and now may be used to compute shift values
+    for name in names + ('valid', 'now'):
+        if name not in kwargs:
+            # the exception raised for a missing key contains all kwargs
+            if not skip_missing_tags and name in names:
+                return _replace_tags(tags, tmpl, kwargs, skip_missing_tags)
+            continue
+
+        value = kwargs[name]
+        # include type and timezone to distinguish values that are equal
+        item = (name, type(value), getattr(value, 'tzinfo', None), value)
+        try:
+            hash(item)
+        except TypeError:
+            return _replace_tags(tags, tmpl, kwargs, skip_missing_tags)
+        key.append(item)
+
+    return _render_cached(tmpl, skip_missing_tags, tuple(key))
+
+@functools.lru_cache(maxsize=STRING_SUB_CACHE_SIZE)
+def _render_cached(tmpl, skip_missing_tags, key):
+    tags, _ = _get_string_sub_tags(tmpl)
+    kwargs = {name: value for name, _, _, value in key}
+    return _replace_tags(tags, tmpl, kwargs, skip_missing_tags)
+
 def find_and_replace_tags_in_template(match_list, tmpl, kwargs, skip_missing_tags=False):
     """! Loop through tags from template and replace them with the correct time values
          @param match_list list of tags to process
@@ -374,19 +450,22 @@ def find_and_replace_tags_in_template(match_list, tmpl, kwargs, skip_missing_tag
          @param kwargs all
 
     """
+    tags = tuple(_get_tag_info(match) for match in match_list)
+    return _replace_tags(tags, tmpl, kwargs, skip_missing_tags)
+
+def _replace_tags(tags, tmpl, kwargs, skip_missing_tags=False):
+    """! Replace tags from template with the correct time values
+         @param tags list of tag information from _get_tag_info
+         @param tmpl filename template to substitute values into
+         @param kwargs values to substitute
+         @param skip_missing_tags if True, leave tags with no value in kwargs
+         @returns template with tags substituted with values
+    """
     # A dictionary that will contain the string to replace (key)
     # and the string to replace it with (value)
     replacement_dict = {}
-    # Search for the FORMATTING_DELIMITER within the first string
-    for match in match_list:
-
-        string_to_replace = TEMPLATE_IDENTIFIER_BEGIN + match + \
-                            TEMPLATE_IDENTIFIER_END
-        split_string = match.split(FORMATTING_DELIMITER)
-
-        # valid, init, lead, etc.
-        # print split_string[0]
-        # value e.g. 2016012606, 3
+    for (string_to_replace, split_string, has_shift, has_truncate,
+         format_indices) in tags:
 
         # split_string[0] holds the key (e.g. "init", "valid", etc)
         if split_string[0] not in kwargs.keys():
@@ -400,25 +479,29 @@ def find_and_replace_tags_in_template(match_list, tmpl, kwargs, skip_missing_tag
                             " for template: " + tmpl + ": " + str(kwargs))
 
         # if shift is set, get that value before handling formatting
-        shift_seconds = get_seconds_from_template(split_string, SHIFT_STRING, kwargs)
+        shift_seconds = 0
+        if has_shift:
+            shift_seconds = get_seconds_from_template(split_string,
+                                                      SHIFT_STRING, kwargs)
 
         # if truncate is set, get that value before handling formatting
-        truncate_seconds = get_seconds_from_template(split_string, TRUNCATE_STRING, kwargs)
+        truncate_seconds = 0
+        if has_truncate:
+            truncate_seconds = get_seconds_from_template(split_string,
+                                                         TRUNCATE_STRING,
+                                                         kwargs)
 
         # format times appropriately and add to replacement_dict
-        formatted = False
-        for idx, split_item in enumerate(split_string):
-            if split_item.startswith(FORMAT_STRING):
-                replacement_dict[string_to_replace] = \
-                    handle_format_delimiter(split_string,
-                                            idx,
-                                            shift_seconds,
-                                            truncate_seconds,
-                                            kwargs)
-                formatted = True
+        for idx in format_indices:
+            replacement_dict[string_to_replace] = \
+                handle_format_delimiter(split_string,
+                                        idx,
+                                        shift_seconds,
+                                        truncate_seconds,
+                                        kwargs)
 
         # No formatting or length is requested
-        if not formatted:
+        if not format_indices:
             # Add back the template identifiers to the matched
             # string to replace and add the key, value pair to the
             # dictionary
@@ -439,107 +522,314 @@ def parse_template(template, filepath, logger=None):
              @param template filename template to use to extract time information
              @param filepath path to examine
              @returns time_info dictionary with time information if successful, None if not"""
+    return get_template_matcher(template).match(filepath, logger)
 
-    match_dict, valid_shift = populate_match_dict(template, filepath, logger)
-    if match_dict is None:
-        return None
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def get_template_matcher(template):
+    """!Get TemplateMatcher object for a filename template. The template is
+        only processed the first time it is requested. The most recently used
+        matchers are kept in a cache.
+         Args:
+             @param template filename template to use to extract time information
+             @returns TemplateMatcher object"""
+    return TemplateMatcher(template)
+
+class TemplateMatcher:
+    """!Filename template that has been split into the steps needed to extract
+        time information from a file path so the template does not need to be
+        processed again for each file path. Obtain an instance with
+        get_template_matcher to reuse matchers for the same template.
+    """
+    def __init__(self, template):
+        self.template = template
+        self.pre_text = None
+        self.post_text = None
+        self.tags = None
+
+        # get the text before any tags, between tags, and after any tags
+        match = re.match(r'([^{]*)({.*})([^}]*)', template)
+        if not match:
+            return
+
+        self.pre_text = match.group(1)
+        self.post_text = match.group(3)
+        self.tags = [self._compile_tag(tag_content, extra_text)
+                     for tag_content, extra_text
+                     in re.findall(r'{(.*?)}([^{]*)', match.group(2))]
+
+    @staticmethod
+    def _compile_tag(tag_content, extra_text):
+        """!Split tag into identifier and list of sections. Each fmt section
+            is converted into a list of format items or None if the format
+            cannot be parsed. Other sections are stored as they are and
+            handled when a file path is processed so errors are only raised
+            if a file path is checked against the template."""
+        identifier, *sections = tag_content.split('?')
+        if identifier == 'storm_id':
+            return identifier, [], extra_text
+
+        compiled_sections = []
+        for section in sections:
+            items = section.split('=')
+            if len(items) == 2 and items[0] == FORMAT_STRING:
+                compiled_sections.append(
+                    (FORMAT_STRING,
+                     TemplateMatcher._compile_fmt(items[1], identifier))
+                )
+                continue
+            compiled_sections.append((None, section))
 
-    # combine common items and get datetime
-    output_dict = populate_output_dict(match_dict, valid_shift)
+        return identifier, compiled_sections, extra_text
 
-    if not output_dict:
-        if logger:
-            logger.debug(f"Could not extract enough time information from {filepath}")
-        else:
-            print(f"DEBUG: Could not extract enough time information from {filepath}")
+    @staticmethod
+    def _compile_fmt(fmt, identifier):
+        """!Get length information for each item of a format string.
+            @param fmt formatting values from template tag, i.e. %Y%m%d
+            @param identifier tag name, i.e. 'init' or 'lead'
+            @returns list of tuples of time letter, length, length of extra
+             characters, and True if the length is determined by the number of
+             digits in the file path. Returns None if format is invalid"""
+        fmt_items = []
+        # find all items that start with %, i.e. %Y or %3H, %10S, or %.2d
+        # group 1 is optional number, i.e. 3 in %3H or 2 in %.2d
+        # group 2 is letters with extra characters at the end,
+        #  i.e. HH in %HH or S: in %10S:
+        for match in re.findall(r'%\.?(\d*)([^%]+)', fmt):
+            # letter identifier for time - may be duplicate letters
+            # i.e. H in %3H or HHH in %HHH or H: in %H: (can have trailing
+            # characters)
+            time_letter = match[1][0]
+
+            # optional number for specifying zero padding, i.e. 3 in %3H
+            time_number = match[0]
+
+            # if first letter is not found in time identifier length dict
+            if time_letter not in LENGTH_DICT.keys():
+                return None
 
-        return None
+            # get length of time type
+            new_len = LENGTH_DICT.get(time_letter)
+
+            # find how many times the first letter is found in the time
+            # letters i.e. HHH: should be 3
+            match_len = re.match(r'([' + time_letter + ']+)(.*)', match[1])
+            if not match_len:
+                return None
+
+            # if there are multiple letters, update length if it is more than
+            # the standard length for that time type
+            time_letter_count = len(match_len.group(1))
+            extra_len = len(match_len.group(2))
+            if time_letter_count > 1:
+                # if multiple letters and a number is specifed, i.e. 3HH, fail
+                if time_number:
+                    return None
+                new_len = time_letter_count
+
+            # if number was provided and it is different than the
+            # standard length use that number instead
+            elif time_number and int(time_number) != new_len:
+                new_len = int(time_number)
+
+            # lead or level hours use all digits that are found
+            read_digits = (match[1] == 'H' and
+                           identifier in ('lead', 'level'))
+            fmt_items.append((time_letter, new_len, extra_len, read_digits))
+
+        return fmt_items
+
+    def match(self, filepath, logger=None):
+        """!Extract time information from path using the template
+             @param filepath path to examine
+             @param logger optional logger to output debug information
+             @returns time_info dictionary with time information if successful,
+              None if not"""
+        match_dict, valid_shift = self.get_match_dict(filepath, logger)
+        if match_dict is None:
+            return None
+
+        # combine common items and get datetime
+        output_dict = populate_output_dict(match_dict, valid_shift)
+
+        if not output_dict:
+            if logger:
+                logger.debug(f"Could not extract enough time information from {filepath}")
+            else:
+                print(f"DEBUG: Could not extract enough time information from {filepath}")
+
+            return None
+
+        # fill in the rest of the time info dictionary items with ti_calculate
+        return time_util.ti_calculate(output_dict)
+
+    def match_many(self, filepaths, logger=None):
+        """!Extract time information from many paths using the template
+             @param filepaths list of paths to examine
+             @param logger optional logger to output debug information
+             @returns list of time_info dictionaries or None for each path
+              that could not be parsed, in the same order as filepaths"""
+        return [self.match(filepath, logger) for filepath in filepaths]
+
+    def get_match_dict(self, filepath, logger=None):
+        """!Extract values for each time tag from path. Populates a dictionary
+             with keys that contain tag name + time type, i.e. init+Y,
+             valid+M, or lead+S, with string values containing the number
+             extracted from the filepath. Also determines the shift amount for
+             valid time if it was found, i.e. {valid?fmt=%Y%m%d?shift=-30}.
+             Valid shift will be 0 if no shift.
+             Note: valid time values will not have the shift applied.
+             @param filepath path to examine
+             @param logger optional logger to output debug information
+             @returns tuple of match dictionary and valid shift value if
+              success or (None, None) if time info could not be extracted"""
+        if self.tags is None:
+            # if there were no tags, we can't extract time info
+            if logger:
+                logger.debug("No tags found (1)")
+            return None, None
+
+        # check if text before and after tags matches template and strip off
+        filepath = _check_pre_text(filepath, self.pre_text)
+        filepath = _check_post_text(filepath, self.post_text)
+        if filepath is None:
+            return None, None
+
+        if not self.tags:
+            if logger:
+                logger.debug("No tags found (2)")
+            return None, None
+
+        match_dict = {}
+        valid_shift = 0
+        for identifier, sections, extra_text in self.tags:
+            fmt_len, valid_shift = self._process_tag(identifier, sections,
+                                                     extra_text, filepath,
+                                                     match_dict, valid_shift)
+
+            # if length of formatted text couldn't be determined
+            if fmt_len is None:
+                if logger:
+                    logger.debug("Could not determine length of formatted text")
+                return None, None
+
+            # if length of formatted text is longer than remaining text
+            if fmt_len > len(filepath):
+                if logger:
+                    logger.debug("Length of formatted text is longer than remaining text in file path")
+                return None, None
+
+            # strip off length of formatted text from filepath
+            filepath = filepath[fmt_len:]
+
+            # check that any extra text matches the filepath
+            filepath = _check_pre_text(filepath, extra_text)
+            if filepath is None:
+                return None, None
+
+        return match_dict, valid_shift
+
+    @staticmethod
+    def _process_tag(identifier, sections, extra_text, filepath, match_dict,
+                     valid_shift):
+        """!Extract format and shift information from a compiled tag. Raises
+            TypeError if shift keyword is applied to a tag other than valid or
+            if 2 different shift values are found
+            @param identifier time type, i.e. valid, init, lead, etc.
+            @param sections list of compiled tag sections
+            @param extra_text text after the tag before the next tag
+            @param filepath rest of filepath to process, i.e. 20190201.ext
+            @param match_dict dictionary to add time info
+            @param valid_shift current numbers of seconds to shift valid time
+            @returns tuple of the length of the formatted time info (i.e. 8
+             for %Y%m%d) and valid shift value"""
+        if identifier == 'storm_id':
+            fmt_len = filepath.find(extra_text)
+            if fmt_len < 0:
+                fmt_len = 0
+            return fmt_len, 0
+
+        fmt_len = 0
+        for section_type, section in sections:
+            if section_type == FORMAT_STRING:
+                fmt_len = TemplateMatcher._read_fmt(section, filepath,
+                                                    match_dict, identifier)
+                if fmt_len is None:
+                    return None, None
+                continue
+
+            element_name, element_value = section.split('=')
+            if element_name != SHIFT_STRING:
+                continue
 
-    # fill in the rest of the time info dictionary items with ti_calculate
-    time_info = time_util.ti_calculate(output_dict)
+            # don't allow shift on any identifier except valid
+            if identifier != VALID_STRING:
+                msg = 'Cannot apply a shift to template ' + \
+                      'item {} when processing inexact '.format(identifier) + \
+                      'times. Only {} is accepted'.format(VALID_STRING)
+                raise TypeError(msg)
 
-    return time_info
+            # convert time string (i.e. 3600S, 60M, 1H, etc.) to seconds
+            shift = int(time_util.get_seconds_from_string(element_value, default_unit='S'))
+
+            # if shift has been set before (other than 0) and
+            # this shift differs, raise exception
+            if valid_shift not in (0, shift):
+                raise TypeError('Found multiple shifts for valid time' +
+                                '{} differs from {}'
+                                .format(shift, valid_shift))
+
+            # save valid shift to apply to valid time later
+            valid_shift = shift
+
+        return fmt_len, valid_shift
+
+    @staticmethod
+    def _read_fmt(fmt_items, filepath, match_dict, identifier):
+        """!Read values for compiled format items from the file path and add
+            them to the match dictionary.
+            @param fmt_items list of format items from _compile_fmt or None
+            @param filepath rest of text from filename that can be parsed
+            @param match_dict dictionary of extracted information
+            @param identifier tag name, i.e. 'init' or 'lead'
+            @returns Number of characters processed from the filename if
+             success, None if failed to parse all format items"""
+        if fmt_items is None:
+            return None
+
+        length = 0
+        for time_letter, new_len, extra_len, read_digits in fmt_items:
+            if read_digits:
+                # look forward until non-digit is found
+                new_len = 0
+                while new_len < len(filepath) and filepath[new_len].isdigit():
+                    new_len += 1
+
+            # add the length specified plus any additional characters
+            length += new_len + extra_len
+
+            if not add_to_dict(identifier + '+' + time_letter,
+                               match_dict,
+                               filepath,
+                               new_len):
+                return None
+
+            filepath = filepath[new_len+extra_len:]
+
+        return length
 
 def populate_match_dict(template, filepath, logger=None):
     """! Use template to extract time information from filepath, add each value to a dictionary.
-         Populates a dictionary with keys that contain tag name + time type, i.e. init+Y,
-         valid+M, or lead+S, with string values containing the number extracted from the filepath.
-         Also determines the shift amount  for valid time if it was found, i.e.
-         {valid?fmt=%Y%m%d?shift=-30}. Valid shift will be 0 if no shift.
-         Note: valid time values will not have the shift applied.
+         See TemplateMatcher.get_match_dict for details.
          Args:
              @param template filename template to use to find time information, i.e.
                  file.{valid?fmt=%Y%m%d}.ext
              @param filepath path to examine, i.e. file.20190201.ext
+             @param logger optional logger to output debug information
              @returns tuple of match dictionary and valid shift value if success, i.e.
                  ({'init+Y': '2019'}, -30)
               Returns (None, None) if could not extract time info
     """
-    # get the text before any tags, between tags, and after any tags
-    match = re.match(r'([^{]*)({.*})([^}]*)', template)
-    if not match:
-        # if there were no tags, we can't extract time info, so return None, None
-        if logger:
-            logger.debug("No tags found (1)")
-        return None, None
-
-    all_tags = match.group(2)
-
-    # check if text before and after tags matches template and strip off from file path
-    filepath = _check_pre_text(filepath, match.group(1))
-    filepath = _check_post_text(filepath, match.group(3))
-    if filepath is None:
-        return None, None
-
-    return process_match_tags(all_tags, filepath, logger)
-
-def process_match_tags(all_tags, filepath, logger):
-    """! Loop through tags and process each.
-         @param all_tags string containing all tags with non-tag text removed from
-         beginning and end.
-         @param filepath path to process
-         @param logger optional logger to output error information
-         @returns tuple containing dictionary with match information and valid shift
-             value if applicable, or (None, None) could not parse information
-    """
-    match_dict = {}
-    valid_shift = 0
-
-    match_tags = re.findall(r'{(.*?)}([^{]*)', all_tags)
-    if not match_tags:
-        if logger:
-            logger.debug("No tags found (2)")
-        return None, None
-
-    for match_tag in match_tags:
-        tag_content, extra_text = match_tag
-        fmt_len, valid_shift = get_format_and_shift(tag_content,
-                                                    filepath,
-                                                    match_dict,
-                                                    valid_shift,
-                                                    extra_text)
-
-        # if length of formatted text couldn't be determined
-        if fmt_len is None:
-            if logger:
-                logger.debug("Could not determine length of formatted text")
-            return None, None
-
-        # if length of formatted text is longer than remaining text in file path
-        if fmt_len > len(filepath):
-            if logger:
-                logger.debug("Length of formatted text is longer than remaining text in file path")
-            return None, None
-
-        # strip off length of formatted text from filepath
-        filepath = filepath[fmt_len:]
-
-        # check that any extra text matches the filepath
-        filepath = _check_pre_text(filepath, extra_text)
-        if filepath is None:
-            return None, None
-
-    return match_dict, valid_shift
+    return get_template_matcher(template).get_match_dict(filepath, logger)
 
 def _check_pre_text(filepath, pre_text):
     """! Check if there is an text before all tags and if they match the template.
@@ -593,61 +883,6 @@ def _check_post_text(filepath, post_text):
 
     return filepath
 
-def get_format_and_shift(tag_content, filepath, match_dict, valid_shift, extra_text):
-    """! Extract format and shift information from tag. Raises TypeError if shift keyword
-         is applied to a tag other than valid or if 2 different shift values are found
-         Args:
-             @param tag_content text inside a tag, i.e. valid?fmt=%Y%m%d?shift=30
-             @param filepath rest of filepath to process, i.e. 20190201.ext
-             @param match_dict dictionary to add time info
-             @param valid_shift current numbers of seconds to shift valid time
-             @returns tuple of the length of the formatted time info (i.e. 8 for %Y%m%d) and
-                 valid shift value
-    """
-    fmt_len = 0
-
-    # identifier is time type, i.e. valid, init, lead, etc.
-    # sections is a list of key=values, i.e. fmt=%Y or shift=30
-    identifier, *sections = tag_content.split('?')
-
-    if identifier == 'storm_id':
-        fmt_len = filepath.find(extra_text)
-        if fmt_len < 0:
-            fmt_len = 0
-        return fmt_len, 0
-
-
-    for section in sections:
-        element_name, element_value = section.split('=')
-        if element_name == FORMAT_STRING:
-            fmt_len = get_fmt_info(element_value, filepath,
-                                   match_dict, identifier)
-            if fmt_len is None:
-                return None, None
-            # extract string that corresponds to format
-        elif element_name == SHIFT_STRING:
-            # don't allow shift on any identifier except valid
-            if identifier != VALID_STRING:
-                msg = 'Cannot apply a shift to template ' + \
-                      'item {} when processing inexact '.format(identifier) + \
-                      'times. Only {} is accepted'.format(VALID_STRING)
-                raise TypeError(msg)
-
-            # convert time string (i.e. 3600S, 60M, 1H, etc.) to seconds
-            shift = int(time_util.get_seconds_from_string(element_value, default_unit='S'))
-
-            # if shift has been set before (other than 0) and
-            # this shift differs, raise exception
-            if valid_shift not in (0, shift):
-                raise TypeError('Found multiple shifts for valid time' +
-                                '{} differs from {}'
-                                .format(shift, valid_shift))
-
-            # save valid shift to apply to valid time later
-            valid_shift = shift
-
-    return fmt_len, valid_shift
-
 def get_fmt_info(fmt, filepath, match_dict, identifier):
     """!Helper function for parse_template. Reads format information from tag and
         populates dictionary with extracted values.
@@ -659,70 +894,11 @@ def get_fmt_info(fmt, filepath, match_dict, identifier):
                    Value is the extracted information, i.e. 19870201
             @param identifier tag name, i.e. 'init' or 'lead'
             @returns Number of characters processed from the filename if success,
-                 -1 if failed to parse all format items in template tag"""
-    length = 0
-    # find all items that start with %, i.e. %Y or %3H, %10S, or %.2d
-    # group 1 is optional number, i.e. 3 in %3H or 2 in %.2d
-    # group 2 is letters with extra characters at the end,
-    #  i.e. HH in %HH or S: in %10S:
-    match_list = re.findall(r'%\.?(\d*)([^%]+)', fmt)
-    for match in match_list:
-        # letter identifier for time - may be duplicate letters
-        # i.e. H in %3H or HHH in %HHH or H: in %H: (can have trailing characters)
-        time_letter = match[1][0]
-
-        # optional number for specifying zero padding, i.e. 3 in %3H
-        time_number = match[0]
-
-        # if first letter is not found in time identifier length dictionary
-        if time_letter not in LENGTH_DICT.keys():
-            return None
-
-        # get length of time type
-        new_len = LENGTH_DICT.get(time_letter)
-
-        # find how many times the first letter is found in the time letters
-        # i.e. HHH: should be 3
-        match_len = re.match(r'([' + time_letter + ']+)(.*)', match[1])
-        if not match_len:
-            return None
-
-        # if there are multiple letters, update length if it is more than
-        # the standard length for that time type
-        time_letter_count = len(match_len.group(1))
-        extra_len = len(match_len.group(2))
-        if time_letter_count > 1:
-            # if multiple letters and a number is specifed, i.e. 3HH, then fail
-            if time_number:
-                return None
-
-            new_len = time_letter_count
-
-        # if number was provided and it is different than the
-        # standard length use that number instead
-        elif time_number and int(time_number) != new_len:
-            new_len = int(time_number)
-
-        # if lead or level hours are found
-        if (match[1] == 'H' and
-                (identifier in ('lead', 'level'))):
-            # look forward until non-digit is found
-            new_len = 0
-            while new_len < len(filepath) and filepath[new_len].isdigit():
-                new_len += 1
-
-        # add the length specified plus any additional characters
-        length += new_len + extra_len
-
-        if not add_to_dict(identifier + '+' + time_letter,
-                           match_dict,
-                           filepath,
-                           new_len):
-            return None
-
-        filepath = filepath[new_len+extra_len:]
-
-    return length
+                 None if failed to parse all format items in template tag"""
+    return TemplateMatcher._read_fmt(
+        TemplateMatcher._compile_fmt(fmt, identifier),
+        filepath, match_dict, identifier
+    )
 
 def populate_output_dict(match_dict, valid_shift):
     """! Get all time values in match dictionary to add to the output dictionary
@@ -835,7 +1011,7 @@ def get_time_from_file(filepath, template, logger=None):
      @param logger optional logging object
      @returns dictionary with time information if successful, None if not
     """
-    if os.path.isdir(filepath):
+    if path_isdir(filepath):
         return None
 
     out = parse_template(template, filepath, logger)
@@ -850,3 +1026,113 @@ def get_time_from_file(filepath, template, logger=None):
                 return out
 
     return None
+
+
+# indices of files under a directory sorted by the valid time extracted using
+# a template, keyed by directory and template, so time window searches
+# do not need to walk the directory for each run time
+_FILE_TIME_INDEX = {}
+
+
+def clear_file_time_index():
+    """! Remove all file time indices that have been built"""
+    _FILE_TIME_INDEX.clear()
+
+
+def get_file_time_index(data_dir, template, logger=None):
+    """! Get index of files under a directory that match a template. The index
+     is built the first time it is requested for a directory and template and
+     reused afterwards. The index is rebuilt if the modification time of any
+     of the directories under data_dir have changed, i.e. files or
+     directories have been added or removed since the index was built. If
+     the filesystem cache is enabled (METPLUS_FILE_CACHE), the directories
+     are only checked after the cache has been invalidated, i.e. a command
+     was run or METplus wrote a file.
+
+     @param data_dir directory to search
+     @param template filename template relative to data_dir
+     @param logger optional logging object
+     @returns dictionary containing 'times', a sorted list of valid times,
+      'paths', the corresponding file paths, and 'order', the position of each
+      file when walking the directory
+    """
+    key = (data_dir, template)
+    generation = get_file_cache_generation()
+    index = _FILE_TIME_INDEX.get(key)
+    if index is not None:
+        if index['generation'] == generation and is_file_cache_enabled():
+            return index
+        if not _directories_changed(index['dir_mtimes']):
+            index['generation'] = generation
+            return index
+
+    entries = []
+    # store time of top directory in case it does not exist yet
+    dir_mtimes = {data_dir: _get_mtime(data_dir)}
+    # step through all files under input directory in sorted order
+    for dirpath, _, all_files in os.walk(data_dir):
+        dir_mtimes[dirpath] = _get_mtime(dirpath)
+        for filename in sorted(all_files):
+            fullpath = os.path.join(dirpath, filename)
+
+            # remove input data directory to get relative path
+            rel_path = fullpath.replace(f'{data_dir}/', "")
+            # extract time information from relative path using template
+            file_time_info = get_time_from_file(rel_path, template, logger)
+            if file_time_info is None:
+                continue
+
+            # skip if could not extract valid time
+            file_valid = file_time_info.get('valid')
+            if not isinstance(file_valid, datetime.datetime):
+                continue
+
+            entries.append((file_valid, len(entries), fullpath))
+
+    entries.sort()
+    index = {
+        'times': [entry[0] for entry in entries],
+        'order': [entry[1] for entry in entries],
+        'paths': [entry[2] for entry in entries],
+        'dir_mtimes': dir_mtimes,
+        'generation': generation,
+    }
+    _FILE_TIME_INDEX[key] = index
+    return index
+
+
+def get_files_in_time_range(data_dir, template, lower_limit, upper_limit,
+                            logger=None):
+    """! Get files under a directory that match a template and have a valid
+     time within a time range. Uses the index from get_file_time_index so the
+     directory is only walked again if it has changed.
+
+     @param data_dir directory to search
+     @param template filename template relative to data_dir
+     @param lower_limit datetime of the start of the range (inclusive)
+     @param upper_limit datetime of the end of the range (inclusive)
+     @param logger optional logging object
+     @returns list of tuples containing the valid time and path of each file
+      in the order they are found when walking the directory
+    """
+    index = get_file_time_index(data_dir, template, logger)
+    start = bisect.bisect_left(index['times'], lower_limit)
+    end = bisect.bisect_right(index['times'], upper_limit)
+    found = sorted(zip(index['order'][start:end],
+                       index['times'][start:end],
+                       index['paths'][start:end]))
+    return [(file_valid, path) for _, file_valid, path in found]
+
+
+def _directories_changed(dir_mtimes):
+    for dirpath, mtime in dir_mtimes.items():
+        if _get_mtime(dirpath) != mtime:
+            return True
+    return False
+
+
+def _get_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
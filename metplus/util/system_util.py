@@ -6,7 +6,14 @@ Description: METplus utility to handle OS/system calls
 
 import os
 import re
+import time
+import glob
+import fnmatch
+import shutil
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import getpass
 import gzip
 import bz2
@@ -15,6 +22,286 @@ import struct
 
 from .constants import PYTHON_EMBEDDING_TYPES, COMPRESSION_EXTENSIONS
 
+# number of bytes to read at a time when uncompressing files
+DECOMPRESS_CHUNK_SIZE = 16 * 1024 * 1024
+
+# locks to prevent the same file from being uncompressed by 2 threads at once
+_STAGE_LOCKS = {}
+_STAGE_LOCKS_LOCK = threading.Lock()
+_EVICT_LOCK = threading.Lock()
+
+# number of commands that read each staged file that were started or
+# submitted by this process and have not finished yet. These files are not
+# removed to limit the size of the staging directory
+_STAGED_FILES_IN_USE = {}
+
+# files staged since the last command was started or submitted. They are not
+# removed until then so the inputs of the next command are not removed while
+# the rest of its inputs are staged
+_STAGED_FILES_FOR_NEXT_COMMAND = set()
+
+# last access time and size of each uncompressed file in a staging directory,
+# keyed by staging directory. The directory is read the first time its size
+# is limited, then the sizes are updated as files are staged and removed
+_STAGED_FILE_SIZES = {}
+
+# snapshots of directory contents used to check if paths exist without
+# querying the filesystem every time. Each snapshot maps the name of each
+# entry in the directory to a tuple of (exists, is file, is directory) or is
+# None if the directory does not exist. Only used if enabled by calling
+# enable_file_cache, which is done by run_metplus if METPLUS_FILE_CACHE=True.
+# The generation is incremented every time the cache is invalidated, even if
+# it is not enabled, so other indices of directory contents can tell when
+# files may have been written
+_FILE_CACHE = {
+    'enabled': False,
+    'snapshots': {},
+    'hits': 0,
+    'misses': 0,
+    'generation': 0,
+}
+_FILE_CACHE_LOCK = threading.Lock()
+
+# lines of column files read by group_lines_by_column, grouped by the values
+# of a column. Keyed by the file path and column name and only reused if the
+# size and modification time of the file have not changed. Only the most
+# recently read files are kept to limit memory usage
+_GROUPED_LINES_CACHE = OrderedDict()
+_GROUPED_LINES_CACHE_SIZE = 4
+_GROUPED_LINES_LOCK = threading.Lock()
+
+
+def enable_file_cache(enabled=True):
+    """! Turn the filesystem cache used by path_exists, path_isfile,
+         path_isdir, and glob_paths on or off. The cache is cleared either way.
+
+        @param enabled True to use the cache, False to query the filesystem
+    """
+    with _FILE_CACHE_LOCK:
+        _FILE_CACHE['enabled'] = enabled
+    clear_file_cache()
+
+
+def clear_file_cache():
+    """! Remove all directory snapshots and reset the hit/miss counters."""
+    with _FILE_CACHE_LOCK:
+        _FILE_CACHE['snapshots'].clear()
+        _FILE_CACHE['hits'] = 0
+        _FILE_CACHE['misses'] = 0
+        _FILE_CACHE['generation'] += 1
+
+
+def get_file_cache_stats():
+    """! Get the number of path checks that were answered from the cache and
+         the number of directories that were read to answer them.
+
+        @returns tuple of hits, misses, and number of directories in cache
+    """
+    with _FILE_CACHE_LOCK:
+        return (_FILE_CACHE['hits'], _FILE_CACHE['misses'],
+                len(_FILE_CACHE['snapshots']))
+
+
+def is_file_cache_enabled():
+    """! Check if the filesystem cache is used by path_exists, path_isfile,
+         path_isdir, and glob_paths. If it is not, files written outside of
+         METplus commands are not tracked by the cache generation.
+
+        @returns True if the cache is enabled, False if not
+    """
+    return _FILE_CACHE['enabled']
+
+
+def get_file_cache_generation():
+    """! Get the number of times the filesystem cache has been invalidated.
+         A value that has not changed means that no files have been written
+         by METplus since the value was read.
+
+        @returns integer that is incremented when the cache is invalidated
+    """
+    return _FILE_CACHE['generation']
+
+
+def invalidate_path(path):
+    """! Remove cached information about a path that was written or removed.
+         The snapshots of the path, every directory under it, and every
+         directory above it are removed because any of them may have been
+         created or removed.
+
+        @param path file or directory that was changed
+    """
+    if not path:
+        return
+
+    path = os.path.abspath(path)
+    prefix = os.path.join(path, '')
+    with _FILE_CACHE_LOCK:
+        _FILE_CACHE['generation'] += 1
+        snapshots = _FILE_CACHE['snapshots']
+        if not snapshots:
+            return
+
+        for key in [key for key in snapshots if key.startswith(prefix)]:
+            del snapshots[key]
+
+        while True:
+            snapshots.pop(path, None)
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+
+
+def invalidate_file_cache():
+    """! Remove all directory snapshots without resetting the hit/miss
+         counters. Used when files may have been written anywhere.
+    """
+    with _FILE_CACHE_LOCK:
+        _FILE_CACHE['snapshots'].clear()
+        _FILE_CACHE['generation'] += 1
+
+
+def _get_dir_snapshot(dir_path):
+    """! Get the contents of a directory, reading them with os.scandir the
+         first time the directory is queried.
+
+        @param dir_path absolute path to directory
+        @returns dictionary of entry name and tuple of (exists, is file,
+         is directory) or None if the directory cannot be read
+    """
+    with _FILE_CACHE_LOCK:
+        if dir_path in _FILE_CACHE['snapshots']:
+            _FILE_CACHE['hits'] += 1
+            return _FILE_CACHE['snapshots'][dir_path]
+        _FILE_CACHE['misses'] += 1
+
+    try:
+        snapshot = {}
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                is_file = entry.is_file()
+                is_dir = entry.is_dir()
+                # broken symbolic links do not exist
+                exists = is_file or is_dir or not entry.is_symlink()
+                snapshot[entry.name] = (exists, is_file, is_dir)
+    except OSError:
+        snapshot = None
+
+    with _FILE_CACHE_LOCK:
+        _FILE_CACHE['snapshots'][dir_path] = snapshot
+    return snapshot
+
+
+def _get_path_info(path):
+    """! Get cached information about a path.
+
+        @param path file or directory path
+        @returns tuple of (exists, is file, is directory)
+    """
+    path = os.path.abspath(path)
+    parent, name = os.path.split(path)
+    if not name:
+        return True, False, True
+
+    snapshot = _get_dir_snapshot(parent)
+    if not snapshot:
+        return False, False, False
+    return snapshot.get(name, (False, False, False))
+
+
+def _path_lexists(path):
+    """! Check if a path exists or is a broken symbolic link using the cache.
+
+        @param path file or directory path
+        @returns True if path exists or is a symbolic link, False if not
+    """
+    path = os.path.abspath(path)
+    parent, name = os.path.split(path)
+    if not name:
+        return True
+    return name in (_get_dir_snapshot(parent) or {})
+
+
+def path_exists(path):
+    """! Check if a path exists, using the filesystem cache if enabled.
+
+        @param path file or directory path
+        @returns True if path exists, False if not
+    """
+    if not _FILE_CACHE['enabled']:
+        return os.path.exists(path)
+    return _get_path_info(path)[0]
+
+
+def path_isfile(path):
+    """! Check if a path is a file, using the filesystem cache if enabled.
+
+        @param path file path
+        @returns True if path is an existing file, False if not
+    """
+    if not _FILE_CACHE['enabled']:
+        return os.path.isfile(path)
+    return _get_path_info(path)[1]
+
+
+def path_isdir(path):
+    """! Check if a path is a directory, using the filesystem cache if
+         enabled.
+
+        @param path directory path
+        @returns True if path is an existing directory, False if not
+    """
+    if not _FILE_CACHE['enabled']:
+        return os.path.isdir(path)
+    return _get_path_info(path)[2]
+
+
+def glob_paths(pattern):
+    """! Get paths that match a wildcard pattern like glob.glob, using the
+         filesystem cache if enabled. Recursive ** patterns are not supported
+         by the cache and are passed to glob.glob.
+
+        @param pattern path that may contain wildcard characters
+        @returns list of paths that match the pattern
+    """
+    if not _FILE_CACHE['enabled'] or '**' in pattern:
+        return glob.glob(pattern)
+
+    if not glob.has_magic(pattern):
+        if pattern.endswith(os.sep):
+            return [pattern] if path_isdir(pattern) else []
+        return [pattern] if _path_lexists(pattern) else []
+
+    dirname, basename = os.path.split(pattern)
+    if dirname and dirname != pattern and glob.has_magic(dirname):
+        parent_dirs = glob_paths(dirname)
+    else:
+        parent_dirs = [dirname]
+
+    matches = []
+    for parent_dir in parent_dirs:
+        if not glob.has_magic(basename):
+            path = os.path.join(parent_dir, basename)
+            # pattern that ends with a separator only matches directories
+            # and broken symbolic links match like they do in glob.glob
+            if path_isdir(path) if not basename else _path_lexists(path):
+                matches.append(path)
+            continue
+
+        snapshot = _get_dir_snapshot(os.path.abspath(parent_dir or os.curdir))
+        if not snapshot:
+            continue
+
+        names = list(snapshot)
+        # hidden files only match patterns that start with a dot
+        if not basename.startswith('.'):
+            names = [name for name in names if not name.startswith('.')]
+
+        matches.extend(os.path.join(parent_dir, name)
+                       for name in fnmatch.filter(names, basename))
+
+    return matches
+
 
 def mkdir_p(path):
     """!
@@ -28,6 +315,7 @@ def mkdir_p(path):
                  does nothing otherwise.
     """
     Path(path).mkdir(parents=True, exist_ok=True)
+    invalidate_path(path)
 
 
 def get_user_info():
@@ -65,46 +353,97 @@ def write_list_to_file(filename, output_list):
             f.write(f"{line}\n")
 
 
+def group_lines_by_column(filename, column, use_cache=True):
+    """! Read a file that contains a header line followed by lines of
+         whitespace-separated columns, e.g. TCST or MTD output, and group the
+         lines by the value of a column. The file is read in a single pass.
+
+         @param filename path of file to read
+         @param column name of the column to group lines by
+         @param use_cache if True, reuse the result of a previous call for the
+          same file and column if the file has not changed since. Default is
+          True
+         @returns 2 item tuple - 1) header line from the file, 2) dictionary
+          where key is each value of the column and value is the list of lines
+          with that value in the order they appear in the file.
+          Returns (None, None) if the file cannot be read or does not contain
+          the column
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None, None
+
+    key = (os.path.abspath(filename), column)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    if use_cache:
+        with _GROUPED_LINES_LOCK:
+            cached = _GROUPED_LINES_CACHE.get(key)
+            if cached and cached[0] == signature:
+                _GROUPED_LINES_CACHE.move_to_end(key)
+                return cached[1], cached[2]
+
+    try:
+        with open(filename, "r") as file_handle:
+            header = file_handle.readline()
+            column_index = header.split().index(column)
+
+            groups = {}
+            for line in file_handle:
+                # only split the line up to the column that is needed
+                values = line.split(None, column_index + 1)
+                if len(values) <= column_index:
+                    continue
+                groups.setdefault(values[column_index], []).append(line)
+    except (ValueError, OSError):
+        return None, None
+
+    if use_cache:
+        with _GROUPED_LINES_LOCK:
+            _GROUPED_LINES_CACHE[key] = (signature, header, groups)
+            _GROUPED_LINES_CACHE.move_to_end(key)
+            while len(_GROUPED_LINES_CACHE) > _GROUPED_LINES_CACHE_SIZE:
+                _GROUPED_LINES_CACHE.popitem(last=False)
+
+    return header, groups
+
+
+def clear_grouped_lines_cache():
+    """! Remove all files that were read by group_lines_by_column from the
+         cache.
+    """
+    with _GROUPED_LINES_LOCK:
+        _GROUPED_LINES_CACHE.clear()
+
+
 def get_storms(filter_filename, id_only=False, sort_column='STORM_ID'):
     """! Get each storm as identified by a column in the input file.
          Create dictionary storm ID as the key and a list of lines for that
          storm as the value.
 
          @param filter_filename name of tcst file to read and extract storm id
+         @param id_only if True, only return a sorted list of the storm IDs
          @param sort_column column to use to sort and group storms. Default
           value is STORM_ID
          @returns 2 item tuple - 1)dictionary where key is storm ID and value
           is list of relevant lines from tcst file, 2) header line from tcst
            file. Item with key 'header' contains the header of the tcst file
     """
-    # Initialize a set because we want unique storm ids.
-    storm_id_list = set()
-
-    try:
-        with open(filter_filename, "r") as file_handle:
-            header, *lines = file_handle.readlines()
-
-        storm_id_column = header.split().index(sort_column)
-        for line in lines:
-            storm_id_list.add(line.split()[storm_id_column])
-    except (ValueError, FileNotFoundError):
+    header, groups = group_lines_by_column(filter_filename, sort_column)
+    if not groups:
         if id_only:
             return []
         return {}
 
-    # sort the unique storm ids, copy the original
-    # set by using sorted rather than sort.
-    sorted_storms = sorted(storm_id_list)
+    # sort the unique storm ids
+    sorted_storms = sorted(groups)
     if id_only:
         return sorted_storms
 
-    if not sorted_storms:
-        return {}
-
     storm_dict = {'header': header}
-    # for each storm, get all lines for that storm
+    # copy lists so changes made by the caller do not modify the cache
     for storm in sorted_storms:
-        storm_dict[storm] = [line for line in lines if storm in line]
+        storm_dict[storm] = list(groups[storm])
 
     return storm_dict
 
@@ -142,6 +481,8 @@ def prune_empty(output_dir, logger):
                              "...removing")
                 os.rmdir(full_dir)
 
+    invalidate_path(output_dir)
+
 
 def get_files(filedir, filename_regex):
     """! Get all the files (with a particular naming format) by walking
@@ -181,7 +522,7 @@ def preprocess_file(filename, data_type, config, allow_dir=False):
     if not filename:
         return None
 
-    if allow_dir and os.path.isdir(filename):
+    if allow_dir and path_isdir(filename):
         return filename
 
     # if using python embedding for input, return the keyword
@@ -199,7 +540,7 @@ def preprocess_file(filename, data_type, config, allow_dir=False):
 
     stage_dir = config.getdir('STAGING_DIR')
 
-    if os.path.isfile(filename):
+    if path_isfile(filename):
         # if filename provided ends with a valid compression extension,
         # remove the extension and call function again so the
         # file will be uncompressed properly. This is done so that
@@ -215,7 +556,7 @@ def preprocess_file(filename, data_type, config, allow_dir=False):
                 stagefile = stage_dir + filename[:-3]+"nc"
             else:
                 stagefile = stage_dir + filename+".nc"
-            if os.path.isfile(stagefile):
+            if path_isfile(stagefile):
                 return stagefile
             # if it does not exist, run GempakToCF and return staged nc file
             # Create staging area if it does not exist
@@ -234,50 +575,25 @@ def preprocess_file(filename, data_type, config, allow_dir=False):
             if config.logger:
                 config.logger.debug("Converting Gempak file into {}".format(stagefile))
             run_g2c.build()
+            invalidate_path(stagefile)
             return stagefile
 
         return filename
 
     # nc file requested and the Gempak equivalent exists
-    if os.path.isfile(filename[:-2]+'grd'):
+    if path_isfile(filename[:-2]+'grd'):
         return preprocess_file(filename[:-2]+'grd', data_type, config)
 
-    # if file exists in the staging area, return that path
+    # uncompress gz, bz2, or zip file into the staging area
     outpath = stage_dir + filename
-    if os.path.isfile(outpath):
-        return outpath
+    for ext in COMPRESSION_EXTENSIONS:
+        if path_isfile(f'{filename}{ext}'):
+            return _stage_uncompressed_file(f'{filename}{ext}', outpath, ext,
+                                            config)
 
-    # Create staging area directory only if file has compression extension
-    if any([os.path.isfile(f'{filename}{ext}')
-            for ext in COMPRESSION_EXTENSIONS]):
-        mkdir_p(os.path.dirname(outpath))
-
-    # uncompress gz, bz2, or zip file
-    if os.path.isfile(filename+".gz"):
-        if config.logger:
-            config.logger.debug("Uncompressing gz file to {}".format(outpath))
-        with gzip.open(filename+".gz", 'rb') as infile:
-            with open(outpath, 'wb') as outfile:
-                outfile.write(infile.read())
-                infile.close()
-                outfile.close()
-                return outpath
-    elif os.path.isfile(filename+".bz2"):
-        if config.logger:
-            config.logger.debug("Uncompressing bz2 file to {}".format(outpath))
-        with open(filename+".bz2", 'rb') as infile:
-            with open(outpath, 'wb') as outfile:
-                outfile.write(bz2.decompress(infile.read()))
-                infile.close()
-                outfile.close()
-                return outpath
-    elif os.path.isfile(filename+".zip"):
-        if config.logger:
-            config.logger.debug("Uncompressing zip file to {}".format(outpath))
-        with zipfile.ZipFile(filename+".zip") as z:
-            with open(outpath, 'wb') as f:
-                f.write(z.read(os.path.basename(filename)))
-                return outpath
+    # if file exists in the staging area, return that path
+    if path_isfile(outpath):
+        return outpath
 
     # if input doesn't need to exist, return filename
     if not config.getbool('config', 'INPUT_MUST_EXIST', True):
@@ -286,6 +602,251 @@ def preprocess_file(filename, data_type, config, allow_dir=False):
     return None
 
 
+def preprocess_files(filenames, data_type, config, allow_dir=False):
+    """! Call preprocess_file for a list of files. If
+         STAGING_DECOMPRESS_THREADS is greater than 1, compressed files are
+         uncompressed in parallel.
+
+        @param filenames list of paths to process
+        @param data_type type of input data, i.e. GEMPAK or PYTHON_NUMPY
+        @param config METplusConfig object
+        @param allow_dir if True, directories are returned as they are
+        @returns list of paths returned by preprocess_file in the same order
+         as filenames
+    """
+    max_threads = config.getint('config', 'STAGING_DECOMPRESS_THREADS', 1)
+
+    # GempakToCF is run by a wrapper so it should not be run in parallel
+    run_parallel = (max_threads is not None and max_threads > 1 and
+                    len(filenames) > 1 and data_type != 'GEMPAK' and
+                    not any(filename and filename.endswith('.grd')
+                            for filename in filenames))
+    if not run_parallel:
+        return [preprocess_file(filename, data_type, config, allow_dir)
+                for filename in filenames]
+
+    # read config values in this thread so defaults are only set once
+    config.getdir('STAGING_DIR')
+    config.getbool('config', 'INPUT_MUST_EXIST', True)
+    config.getint('config', 'STAGING_DIR_MAX_SIZE_MB', 0)
+
+    with ThreadPoolExecutor(max_workers=min(max_threads, len(filenames)),
+                            thread_name_prefix='metplus_stage') as executor:
+        return list(executor.map(
+            lambda filename: preprocess_file(filename, data_type, config,
+                                             allow_dir),
+            filenames
+        ))
+
+
+def _get_stage_lock(path):
+    with _STAGE_LOCKS_LOCK:
+        return _STAGE_LOCKS.setdefault(path, threading.Lock())
+
+
+def _stage_uncompressed_file(compressed_path, outpath, ext, config):
+    """! Uncompress a file into the staging directory unless it was already
+         uncompressed from the same compressed file. The modification time of
+         the staged file is set to the time of the compressed file so a
+         staged file is only reused if the compressed file has not changed.
+         The data is written to a temporary file that is renamed when complete
+         so an incomplete file is never used.
+
+        @param compressed_path path to the compressed file
+        @param outpath path to write uncompressed file
+        @param ext compression extension, i.e. .gz, .bz2, or .zip
+        @param config METplusConfig object
+        @returns outpath
+    """
+    with _get_stage_lock(outpath):
+        source_mtime = os.stat(compressed_path).st_mtime_ns
+        if (os.path.isfile(outpath) and
+                os.stat(outpath).st_mtime_ns == source_mtime):
+            # update access time to track when staged file was last used
+            os.utime(outpath, ns=(time.time_ns(), source_mtime))
+            _add_staged_file(config, outpath)
+            return outpath
+
+        mkdir_p(os.path.dirname(outpath))
+        if config.logger:
+            config.logger.debug(f"Uncompressing {ext[1:]} file to {outpath}")
+
+        tmp_path = f'{outpath}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            _uncompress_file(compressed_path, ext, tmp_path)
+            os.utime(tmp_path, ns=(time.time_ns(), source_mtime))
+            os.replace(tmp_path, outpath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            invalidate_path(outpath)
+
+        _add_staged_file(config, outpath)
+
+    _limit_staging_dir_size(config)
+    return outpath
+
+
+def _uncompress_file(compressed_path, ext, out_path):
+    """! Uncompress a file, reading chunks so the uncompressed data is not
+         held in memory
+
+        @param compressed_path path to the compressed file
+        @param ext compression extension, i.e. .gz, .bz2, or .zip
+        @param out_path path to write uncompressed data
+    """
+    if ext == '.zip':
+        member_name = os.path.basename(compressed_path[:-len(ext)])
+        with zipfile.ZipFile(compressed_path) as zip_file:
+            with zip_file.open(member_name) as infile:
+                with open(out_path, 'wb') as outfile:
+                    shutil.copyfileobj(infile, outfile, DECOMPRESS_CHUNK_SIZE)
+        return
+
+    open_func = gzip.open if ext == '.gz' else bz2.open
+    with open_func(compressed_path, 'rb') as infile:
+        with open(out_path, 'wb') as outfile:
+            shutil.copyfileobj(infile, outfile, DECOMPRESS_CHUNK_SIZE)
+
+
+def _add_staged_file(config, path):
+    """! Keep a staged file until the next command is started and record its
+         size if the size of the staging directory is being tracked.
+
+        @param config METplusConfig object
+        @param path staged file
+    """
+    stage_dir = config.getdir('STAGING_DIR')
+    with _EVICT_LOCK:
+        _STAGED_FILES_FOR_NEXT_COMMAND.add(path)
+        staged_files = _STAGED_FILE_SIZES.get(stage_dir)
+        if staged_files is None:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            staged_files.pop(path, None)
+            return
+        staged_files[path] = (stat.st_atime_ns, stat.st_size)
+
+
+def use_staged_files(config, paths):
+    """! Mark the staged files read by a command that is starting or
+         submitted as in use so they are not removed to limit the size of
+         the staging directory. Files staged for other purposes, e.g. to
+         check if a file exists, can be removed afterwards. Call
+         release_staged_files with the returned list when the command
+         finishes.
+
+        @param config METplusConfig object
+        @param paths list of paths read by the command
+        @returns list of staged files that were marked as in use
+    """
+    max_size_mb = config.getint('config', 'STAGING_DIR_MAX_SIZE_MB', 0)
+    with _EVICT_LOCK:
+        if not max_size_mb or max_size_mb < 0:
+            _STAGED_FILES_FOR_NEXT_COMMAND.clear()
+            return []
+
+        staged_files = _STAGED_FILE_SIZES.get(config.getdir('STAGING_DIR'),
+                                              {})
+        in_use = [path for path in set(paths)
+                  if path in _STAGED_FILES_FOR_NEXT_COMMAND or
+                  path in staged_files]
+        for path in in_use:
+            _STAGED_FILES_IN_USE[path] = _STAGED_FILES_IN_USE.get(path, 0) + 1
+        _STAGED_FILES_FOR_NEXT_COMMAND.clear()
+        return in_use
+
+
+def release_staged_files(paths):
+    """! Mark staged files as no longer in use by a command so they can be
+         removed to limit the size of the staging directory.
+
+        @param paths list of paths returned by use_staged_files for a
+         command that finished
+    """
+    with _EVICT_LOCK:
+        if not _STAGED_FILES_IN_USE:
+            return
+        for path in paths:
+            count = _STAGED_FILES_IN_USE.get(path)
+            if count is None:
+                continue
+            if count > 1:
+                _STAGED_FILES_IN_USE[path] = count - 1
+            else:
+                del _STAGED_FILES_IN_USE[path]
+
+
+def _read_staged_file_sizes(stage_dir):
+    """! Find the uncompressed files in the staging directory that were
+         uncompressed from a compressed file that still exists.
+
+        @param stage_dir staging directory
+        @returns dictionary of path and tuple of access time and size
+    """
+    staged_files = {}
+    for dirpath, _, all_files in os.walk(stage_dir):
+        for filename in all_files:
+            path = os.path.join(dirpath, filename)
+            source = path[len(stage_dir):]
+            if not any(path_isfile(f'{source}{ext}')
+                       for ext in COMPRESSION_EXTENSIONS):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            staged_files[path] = (stat.st_atime_ns, stat.st_size)
+    return staged_files
+
+
+def _limit_staging_dir_size(config):
+    """! If STAGING_DIR_MAX_SIZE_MB is set, remove the least recently used
+         uncompressed files from the staging directory until the total size of
+         the uncompressed files is below the limit. Only files that were
+         uncompressed from a compressed file that still exists are removed.
+         Files read by commands that have not finished and files staged since
+         the last command was started are never removed.
+
+        @param config METplusConfig object
+    """
+    max_size_mb = config.getint('config', 'STAGING_DIR_MAX_SIZE_MB', 0)
+    if not max_size_mb or max_size_mb < 0:
+        return
+
+    stage_dir = config.getdir('STAGING_DIR')
+    max_size = max_size_mb * 1024 * 1024
+    with _EVICT_LOCK:
+        staged_files = _STAGED_FILE_SIZES.get(stage_dir)
+        if staged_files is None:
+            staged_files = _read_staged_file_sizes(stage_dir)
+            _STAGED_FILE_SIZES[stage_dir] = staged_files
+
+        total_size = sum(size for _, size in staged_files.values())
+        if total_size <= max_size:
+            return
+
+        for (_, size), path in sorted((info, path) for path, info
+                                      in staged_files.items()):
+            if total_size <= max_size:
+                break
+            if (path in _STAGED_FILES_IN_USE or
+                    path in _STAGED_FILES_FOR_NEXT_COMMAND):
+                continue
+            if config.logger:
+                config.logger.debug(f"Removing staged file to limit size of "
+                                    f"staging directory: {path}")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            invalidate_path(path)
+            del staged_files[path]
+            total_size -= size
+
+
 def netcdf_has_var(file_path, name, level):
     """! Check if name is a variable in the NetCDF file. If not, check if
          {name}_{level} (with level prefix letter removed, i.e. 06 from A06)
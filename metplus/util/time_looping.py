@@ -9,6 +9,26 @@ from .string_template_substitution import do_string_sub
 from .config_util import log_runtime_banner
 
 
+# run times and forecast leads computed from the config, keyed by the config
+# values that were used to compute them. They are computed once for each set
+# of values and reused every time they are requested, e.g. for each
+# forecast lead or run time in a wrapper. Values that could not be computed
+# because of a config error are not stored so the error is logged each time
+_RUN_TIMES_CACHE = {}
+_LEAD_SEQ_CACHE = {}
+# names of the LEAD_SEQ* variables set in each config and the number of
+# variables that were added to the config when they were found, keyed by
+# config run ID
+_LEAD_SEQ_NAMES = {}
+
+
+def clear_time_looping_cache():
+    """! Remove all run times and forecast leads that were computed."""
+    _RUN_TIMES_CACHE.clear()
+    _LEAD_SEQ_CACHE.clear()
+    _LEAD_SEQ_NAMES.clear()
+
+
 def time_generator(config):
     """! Generator used to read METplusConfig variables for time looping
 
@@ -16,77 +36,128 @@ def time_generator(config):
     @returns None if not enough information is available on config.
      Yields the next run time dictionary or None if something went wrong
     """
-    # determine INIT or VALID prefix
-    prefix = get_time_prefix(config)
-    if not prefix:
+    run_times = get_run_times(config)
+    if run_times is None:
         yield None
         return
 
-    # get clock time of when the run started
-    clock_dt = datetime.strptime(
-        config.getstr('config', 'CLOCK_TIME'),
-        '%Y%m%d%H%M%S'
-    )
+    prefix, clock_dt, time_list = run_times
+    today = clock_dt.strftime('%Y%m%d')
+    for current_dt in time_list:
+        if current_dt is None:
+            yield None
+            continue
+
+        # create a new dictionary each time because callers modify it
+        yield _create_time_input_dict(prefix, current_dt, clock_dt, today)
 
+
+def get_run_times(config):
+    """! Get all of the run times to process from [INIT/VALID]_LIST or
+    [INIT/VALID]_BEG, _END, and _INCREMENT. The times are only computed the
+    first time they are requested for the same config values.
+
+    @param config METplusConfig object to read
+    @returns tuple containing the time prefix (INIT or VALID), the datetime
+     of the clock time, and a tuple of datetime objects for each run time
+     (None for an item that could not be read) or None if the config values
+     are not valid
+    """
+    # determine INIT or VALID prefix
+    prefix = get_time_prefix(config)
+    if not prefix:
+        return None
+
+    clock_string = config.getstr('config', 'CLOCK_TIME')
     time_format = config.getraw('config', f'{prefix}_TIME_FMT', '')
     if not time_format:
         config.logger.error(f'Could not read {prefix}_TIME_FMT')
-        yield None
-        return
+        return None
 
-    # check for [INIT/VALID]_LIST and use that list if set
     if config.has_option('config', f'{prefix}_LIST'):
-        time_list = getlist(config.getraw('config', f'{prefix}_LIST'))
-        if not time_list:
-            config.logger.error(f"Could not read {prefix}_LIST")
-            yield None
-            return
+        time_values = ('LIST', config.getraw('config', f'{prefix}_LIST'))
+    else:
+        start_string = config.getraw('config', f'{prefix}_BEG')
+        time_values = (
+            start_string,
+            config.getraw('config', f'{prefix}_END', start_string),
+            config.getstr('config', f'{prefix}_INCREMENT', '60'),
+        )
 
-        for time_string in time_list:
-            current_dt = _get_current_dt(time_string,
-                                         time_format,
-                                         clock_dt,
-                                         config.logger)
-            if not current_dt:
-                yield None
+    key = (prefix, clock_string, time_format, time_values)
+    run_times = _RUN_TIMES_CACHE.get(key)
+    if run_times is not None:
+        return run_times
 
-            time_info = _create_time_input_dict(prefix, current_dt, clock_dt)
-            yield time_info
+    # get clock time of when the run started
+    clock_dt = datetime.strptime(clock_string, '%Y%m%d%H%M%S')
+    if time_values[0] == 'LIST':
+        time_list = _get_times_from_list(time_values[1], time_format,
+                                         clock_dt, prefix, config.logger)
+    else:
+        time_list = _get_times_from_range(*time_values, time_format,
+                                          clock_dt, prefix, config.logger)
+    if time_list is None:
+        return None
 
-        return
+    run_times = (prefix, clock_dt, tuple(time_list))
+    if None not in time_list:
+        _RUN_TIMES_CACHE[key] = run_times
+    return run_times
 
-    # if list is not provided, use _BEG, _END, and _INCREMENT
-    start_string = config.getraw('config', f'{prefix}_BEG')
-    end_string = config.getraw('config', f'{prefix}_END', start_string)
-    time_interval = get_relativedelta(
-        config.getstr('config', f'{prefix}_INCREMENT', '60')
-    )
 
-    start_dt = _get_current_dt(start_string,
-                               time_format,
-                               clock_dt,
-                               config.logger)
+def _get_times_from_list(list_string, time_format, clock_dt, prefix, logger):
+    """! Get run times from [INIT/VALID]_LIST
 
-    end_dt = _get_current_dt(end_string,
-                             time_format,
-                             clock_dt,
-                             config.logger)
+    @param list_string value of [INIT/VALID]_LIST
+    @param time_format format of the times in the list
+    @param clock_dt datetime object for time when execution started
+    @param prefix INIT or VALID
+    @param logger logger to output errors
+    @returns list of datetime objects (None for items that could not be read)
+     or None if the list could not be read
+    """
+    time_list = getlist(list_string)
+    if not time_list:
+        logger.error(f"Could not read {prefix}_LIST")
+        return None
+
+    return [_get_current_dt(time_string, time_format, clock_dt, logger)
+            for time_string in time_list]
+
+
+def _get_times_from_range(start_string, end_string, increment_string,
+                          time_format, clock_dt, prefix, logger):
+    """! Get run times from [INIT/VALID]_BEG, _END, and _INCREMENT
+
+    @param start_string value of [INIT/VALID]_BEG
+    @param end_string value of [INIT/VALID]_END
+    @param increment_string value of [INIT/VALID]_INCREMENT
+    @param time_format format of the begin and end times
+    @param clock_dt datetime object for time when execution started
+    @param prefix INIT or VALID
+    @param logger logger to output errors
+    @returns list of datetime objects or None if the values are not valid
+    """
+    time_interval = get_relativedelta(increment_string)
+    start_dt = _get_current_dt(start_string, time_format, clock_dt, logger)
+    end_dt = _get_current_dt(end_string, time_format, clock_dt, logger)
 
     if not _validate_time_values(start_dt,
                                  end_dt,
                                  time_interval,
                                  prefix,
-                                 config.logger):
-        yield None
-        return
+                                 logger):
+        return None
 
+    time_list = []
     current_dt = start_dt
     while current_dt <= end_dt:
-        time_info = _create_time_input_dict(prefix, current_dt, clock_dt)
-        yield time_info
-
+        time_list.append(current_dt)
         current_dt += time_interval
 
+    return time_list
+
 
 def get_start_and_end_times(config):
     prefix = get_time_prefix(config)
@@ -185,12 +256,12 @@ def _validate_time_values(start_dt, end_dt, time_interval, prefix, logger):
     return True
 
 
-def _create_time_input_dict(prefix, current_dt, clock_dt):
+def _create_time_input_dict(prefix, current_dt, clock_dt, today=None):
     return {
         'loop_by': prefix.lower(),
         prefix.lower(): current_dt,
         'now': clock_dt,
-        'today': clock_dt.strftime('%Y%m%d'),
+        'today': today if today else clock_dt.strftime('%Y%m%d'),
     }
 
 
@@ -340,13 +411,59 @@ def get_lead_sequence(config, input_dict=None, wildcard_if_empty=False):
             @returns list of relativedelta objects or a list containing 0 if none are found
     """
 
+    # leads computed from INIT_SEQ depend on the valid time, so they are
+    # always computed. Otherwise reuse leads computed for the same values
+    init_seq_string = config.getstr('config', 'INIT_SEQ', '')
+    key = None
+    if not init_seq_string:
+        key = (wildcard_if_empty,
+               tuple((name, config.getstr('config', name))
+                     for name in _get_lead_seq_names(config)))
+        out_leads = _LEAD_SEQ_CACHE.get(key)
+        if out_leads is not None:
+            return list(out_leads)
+
+    out_leads = _compute_lead_sequence(config, init_seq_string, input_dict,
+                                       wildcard_if_empty)
+    if key is not None and out_leads is not None:
+        _LEAD_SEQ_CACHE[key] = tuple(out_leads)
+    return out_leads
+
+
+def _get_lead_seq_names(config):
+    """!Get the names of the LEAD_SEQ* variables that are set in the config.
+    The config keys are only searched again if a variable was added.
+
+    @param config METplusConfig object to query config variable values
+    @returns tuple of variable names
+    """
+    keys_added, names = _LEAD_SEQ_NAMES.get(config.run_id, (None, None))
+    if keys_added != config.keys_added:
+        names = tuple(name for name in config.keys('config')
+                      if name.startswith('LEAD_SEQ'))
+        _LEAD_SEQ_NAMES[config.run_id] = (config.keys_added, names)
+    return names
+
+
+def _compute_lead_sequence(config, init_seq_string, input_dict,
+                           wildcard_if_empty):
+    """!Compute forecast lead list. See get_lead_sequence for details.
+
+    @param config METplusConfig object to query config variable values
+    @param init_seq_string value of INIT_SEQ
+    @param input_dict time dictionary needed to handle using INIT_SEQ
+    @param wildcard_if_empty if no lead sequence was set, return a
+     list with '*' if this is True, otherwise return a list with 0
+    @returns list of relativedelta objects, a list containing 0 or '*' if
+     none are found, or None if the config values are not valid
+    """
     out_leads = []
     lead_min, lead_max, no_max = _get_lead_min_max(config)
 
     # check if LEAD_SEQ, INIT_SEQ, or LEAD_SEQ_<n> are set
     # if more than one is set, report an error and exit
     lead_seq = getlist(config.getstr('config', 'LEAD_SEQ', ''))
-    init_seq = getlistint(config.getstr('config', 'INIT_SEQ', ''))
+    init_seq = getlistint(init_seq_string)
     lead_groups = get_lead_sequence_groups(config)
 
     if not _are_lead_configs_ok(lead_seq,
@@ -1,9 +1,10 @@
+import re
 from os import environ
-from inspect import isclass
 from pkgutil import iter_modules
 from pathlib import Path
 from importlib import import_module
 from ..util.metplus_check import plot_wrappers_are_enabled
+from ..util.string_manip import camel_to_underscore
 
 # these wrappers should not be imported if plotting is disabled
 plotting_wrappers = [
@@ -11,34 +12,72 @@ plotting_wrappers = [
     'cyclone_plotter_wrapper',
 ]
 
-# import classes that other wrappers import
-parent_classes = {
-    'command_builder': 'CommandBuilder',
-    'runtime_freq_wrapper': 'RuntimeFreqWrapper',
-    'loop_times_wrapper': 'LoopTimesWrapper',
-    'reformat_gridded_wrapper': 'ReformatGriddedWrapper',
-    'compare_gridded_wrapper': 'CompareGriddedWrapper',
-    'regrid_data_plane_wrapper': 'RegridDataPlaneWrapper',
-}
-
-for module_name, attribute_name in parent_classes.items():
-    module = import_module(f"{__name__}.{module_name}")
-    attribute = getattr(module, attribute_name)
-    globals()[attribute_name] = attribute
-
-# iterate through the modules in the current package
+# names of the modules in the current package. Wrapper classes are imported
+# from their module the first time they are accessed, e.g. GridStatWrapper
+# is imported from grid_stat_wrapper, so only the wrappers that are used and
+# the wrappers that they inherit from are loaded
 package_dir = str(Path(__file__).resolve().parent)
-for (_, module_name, _) in iter_modules([package_dir]):
+wrapper_modules = [module_name for (_, module_name, _)
+                   in iter_modules([package_dir])]
+
+
+def _get_module_name(class_name):
+    """! Get the name of the module that contains a wrapper class.
+
+    @param class_name name of class, e.g. GridStatWrapper or CommandBuilder
+    @returns name of module, e.g. grid_stat_wrapper, or None if the class is
+     not in this package or is a plotting wrapper that is disabled
+    """
+    if not class_name[:1].isupper():
+        return None
+
+    module_name = camel_to_underscore(class_name)
+    if module_name not in wrapper_modules:
+        return None
 
     # skip import of plot wrappers if they are not enabled
-    if not plot_wrappers_are_enabled(environ) and module_name in plotting_wrappers:
-        continue
+    if (module_name in plotting_wrappers and
+            not plot_wrappers_are_enabled(environ)):
+        return None
+
+    return module_name
+
+
+def _get_class_names(module_name):
+    """! Get the names of the wrapper classes that are defined in a module
+    without importing it.
+
+    @param module_name name of module, e.g. grid_stat_wrapper
+    @returns list of class names that can be imported from this package
+    """
+    module_path = Path(package_dir, f'{module_name}.py')
+    if not module_path.is_file():
+        return []
+
+    content = module_path.read_text()
+    return [class_name for class_name
+            in re.findall(r'^class (\w+)\b', content, re.MULTILINE)
+            if _get_module_name(class_name) == module_name]
+
+
+# names of the wrapper classes that are imported when they are first accessed
+# so they are included in dir() and imported by `from metplus.wrappers import *`
+__all__ = sorted(class_name for module_name in wrapper_modules
+                 for class_name in _get_class_names(module_name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+def __getattr__(name):
+    module_name = _get_module_name(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    attribute = getattr(import_module(f"{__name__}.{module_name}"), name)
 
-    # import the module and iterate through its attributes
-    module = import_module(f"{__name__}.{module_name}")
-    for attribute_name in dir(module):
-        attribute = getattr(module, attribute_name)
+    # add the class to this package's variables so it is only looked up once
+    globals()[name] = attribute
+    return attribute
 
-        if isclass(attribute) and attribute_name not in globals() and attribute_name.endswith("Wrapper"):
-            # Add the class to this package's variables
-            globals()[attribute_name] = attribute
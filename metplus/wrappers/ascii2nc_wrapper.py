@@ -24,6 +24,8 @@ from ..util import do_string_sub, skip_time, get_lead_sequence
 
 class ASCII2NCWrapper(CommandBuilder):
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_TIME_SUMMARY_DICT',
     ]
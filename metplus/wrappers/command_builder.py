@@ -11,7 +11,7 @@ Output Files: N/A
 
 import os
 import sys
-import glob
+import logging
 from datetime import datetime
 from abc import ABCMeta
 from inspect import getframeinfo, stack
@@ -20,8 +20,10 @@ from .command_runner import CommandRunner
 
 from ..util.constants import PYTHON_EMBEDDING_TYPES, COMPRESSION_EXTENSIONS
 from ..util import getlist, preprocess_file, loop_over_times_and_call
+from ..util import preprocess_files
 from ..util import do_string_sub, ti_calculate, get_seconds_from_string
-from ..util import get_time_from_file, shift_time_seconds, seconds_to_met_time
+from ..util import shift_time_seconds, seconds_to_met_time
+from ..util import get_files_in_time_range
 from ..util import replace_config_from_section
 from ..util import METConfig
 from ..util import MISSING_DATA_VALUE
@@ -32,6 +34,8 @@ from ..util import get_field_info, format_field_info
 from ..util import get_wrapper_name, is_python_script
 from ..util.met_config import add_met_config_dict, handle_climo_dict
 from ..util import mkdir_p, get_skip_times
+from ..util import glob_paths, path_exists, path_isdir, invalidate_path
+from ..util import format_copyable_env
 
 # pylint:disable=pointless-string-statement
 '''!@namespace CommandBuilder
@@ -51,6 +55,16 @@ class CommandBuilder:
     # name of variable to hold any MET config overrides
     MET_OVERRIDES_KEY = 'METPLUS_MET_CONFIG_OVERRIDES'
 
+    # set to True in wrappers where each command that is run does not depend
+    # on the output of another command run by the same wrapper so commands
+    # can run concurrently if METPLUS_MAX_PARALLEL_COMMANDS is greater than 1
+    ALLOW_CONCURRENT_COMMANDS = False
+
+    # set to True in wrappers that do not read or modify the input or output
+    # files of a command after it is built so commands can be run together
+    # in a single process if <APP_NAME>_BATCH_SIZE is greater than 1
+    ALLOW_BATCH_COMMANDS = False
+
     def __init__(self, config, instance=None):
         self.isOK = True
         self.errors = 0
@@ -65,6 +79,12 @@ class CommandBuilder:
         self.param = ""
         self.all_commands = []
 
+        # commands to run together in a single process, None if not batching
+        self.cmd_batch = None
+
+        # time info of the current run used to label the run profile
+        self.profile_time_info = None
+
         # store values to set in environment variables for each command
         self.env_var_dict = {}
 
@@ -117,10 +137,15 @@ class CommandBuilder:
 
         self.check_for_externals()
 
+        max_parallel = 1
+        if self.ALLOW_CONCURRENT_COMMANDS:
+            max_parallel = self.c_dict['MAX_PARALLEL_COMMANDS']
+
         self.cmdrunner = CommandRunner(
             self.config, logger=self.logger,
             verbose=self.c_dict['VERBOSITY'],
             skip_run=self.c_dict.get('DO_NOT_RUN_EXE', False),
+            max_parallel=max_parallel,
         )
 
         # set log name to app name by default
@@ -139,7 +164,7 @@ class CommandBuilder:
         if not hasattr(self, 'WRAPPER_ENV_VAR_KEYS'):
             return
 
-        if not os.path.exists(config_file):
+        if not path_exists(config_file):
             if self.c_dict.get('INPUT_MUST_EXIST', True):
                 self.log_error(f'Config file does not exist: {config_file}')
             return
@@ -198,6 +223,14 @@ class CommandBuilder:
                                                        'DO_NOT_RUN_EXE',
                                                        False)
 
+        c_dict['MAX_PARALLEL_COMMANDS'] = (
+            self.config.getint('config', 'METPLUS_MAX_PARALLEL_COMMANDS', 1)
+        )
+        if c_dict['MAX_PARALLEL_COMMANDS'] is None:
+            self.isOK = False
+        elif c_dict['MAX_PARALLEL_COMMANDS'] < 1:
+            c_dict['MAX_PARALLEL_COMMANDS'] = 1
+
         return c_dict
 
     def clear(self):
@@ -225,6 +258,8 @@ class CommandBuilder:
             )
             time_info = {'now': clock_time_fmt}
 
+        self.profile_time_info = time_info
+
         # loop over list of environment variables that need to be set for the
         # wrapper, apply time info substitution if available, and
         # set environment variable setting empty string if key is not set in
@@ -242,8 +277,10 @@ class CommandBuilder:
         self.set_user_environment(time_info)
 
         # send environment variables and copyable commands to logger
-        for msg in self.print_all_envs():
-            self.logger.debug(msg)
+        # only build the messages if they will be logged
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for msg in self.print_all_envs():
+                self.logger.debug(msg)
 
     def log_error(self, error_string):
         caller = getframeinfo(stack()[1][0])
@@ -382,7 +419,6 @@ class CommandBuilder:
         """!Print list of environment variables that can be easily
         copied into terminal
         """
-        out = ""
         if not var_list:
             var_list = self.env_list
 
@@ -393,22 +429,22 @@ class CommandBuilder:
                     continue
                 var_list.add(user_var)
 
-        shell = self.c_dict.get('USER_SHELL', '').lower()
-        for var in sorted(var_list):
-            if shell == 'csh':
-                # NOTE: Complex environment variables that have special characters
-                # like { or } will not be copyable in csh until modifications are
-                # made to the formatting of the setenv calls
-                clean_env = self.env[var].replace('"', '"\\""')
-                line = 'setenv ' + var + ' "' + clean_env + '"'
-            else:
-                # insert escape characters to allow export command to be copyable
-                clean_env = self.env[var].replace('"', r'\"').replace(r'\\"', r'\\\"')
-                line = 'export ' + var + '="' + clean_env + '"'
-            line = line.replace('\n', '')
-            out += line + '; '
+        return format_copyable_env(self.env, var_list,
+                                   self.c_dict.get('USER_SHELL', ''))
 
-        return out
+    def _get_command_env(self):
+        """!Get the environment variables that were set for the next
+        command, including variables from the [user_env_vars] section.
+        Like get_env_copy, the user variables are added to env_list so that
+        the variables listed for the next command match print_all_envs.
+
+        @returns dictionary of environment variable names and values
+        """
+        if 'user_env_vars' in self.config.sections():
+            self.env_list.update(name
+                                 for name in self.config.keys('user_env_vars')
+                                 if self.env.get(name) is not None)
+        return {name: self.env[name] for name in self.env_list}
 
     def print_env_item(self, item):
         """!Print single environment variable in the log file
@@ -645,12 +681,13 @@ class CommandBuilder:
             full_path = do_string_sub(full_template, **time_info, level=level)
 
             if os.path.sep not in full_path:
-                self.logger.debug(f"{full_path} is not a file path. "
-                                  "Returning that string.")
+                self.logger.debug("%s is not a file path. "
+                                  "Returning that string.", full_path)
                 check_file_list.append((full_path, full_template))
                 continue
 
-            self.logger.debug(f"Looking for {data_type}INPUT file {full_path}")
+            self.logger.debug("Looking for %sINPUT file %s",
+                              data_type, full_path)
 
             if '?' not in full_path and '*' not in full_path:
                 # add single file to list
@@ -658,10 +695,9 @@ class CommandBuilder:
                 continue
 
             # if wildcard expression, get all files that match
-            wildcard_files = sorted(glob.glob(full_path))
-            self.logger.debug(f'Wildcard file pattern: {full_path}')
-            self.logger.debug(f'{str(len(wildcard_files))} files '
-                              'match pattern')
+            wildcard_files = sorted(glob_paths(full_path))
+            self.logger.debug('Wildcard file pattern: %s', full_path)
+            self.logger.debug('%d files match pattern', len(wildcard_files))
 
             # add files to list of files
             for wildcard_file in wildcard_files:
@@ -675,13 +711,28 @@ class CommandBuilder:
         if not input_must_exist:
             return [value for value, _ in check_file_list]
 
+        # uncompress or convert files, in parallel if requested
+        input_data_type = self.c_dict.get(f'{data_type}INPUT_DATATYPE', '')
+        files_to_process = [
+            file_path for file_path, _ in check_file_list
+            if not self.cmdrunner.is_pending_output(file_path)
+        ]
+        processed_paths = dict(zip(
+            files_to_process,
+            preprocess_files(files_to_process, input_data_type, self.config,
+                             allow_dir=allow_dir)
+        ))
+
         found_file_list = []
         for file_path, template in check_file_list:
-            input_data_type = self.c_dict.get(f'{data_type}INPUT_DATATYPE', '')
-            processed_path = preprocess_file(file_path,
-                                             input_data_type,
-                                             self.config,
-                                             allow_dir=allow_dir)
+            # file will be written by a command that is still running
+            if file_path not in processed_paths:
+                self.logger.debug("Found file that will be written by a "
+                                  "command that is running: %s", file_path)
+                found_file_list.append(file_path)
+                continue
+
+            processed_path = processed_paths[file_path]
 
             # report error if file path could not be found
             if not processed_path:
@@ -697,10 +748,10 @@ class CommandBuilder:
 
                 return None
 
-            if os.path.isdir(processed_path):
-                self.logger.debug(f"Found directory: {processed_path}")
-            else:
-                self.logger.debug(f"Found file: {processed_path}")
+            # skip directory check if debug messages will not be logged
+            if self.logger.isEnabledFor(logging.DEBUG):
+                found = 'directory' if path_isdir(processed_path) else 'file'
+                self.logger.debug("Found %s: %s", found, processed_path)
             found_file_list.append(processed_path)
 
         return found_file_list
@@ -758,66 +809,39 @@ class CommandBuilder:
                                    self.config)
 
         # return list if multiple files are found
-        out = []
-        for close_file in closest_files_fixed:
-            outfile = preprocess_file(close_file,
-                                      self.c_dict.get(data_type + 'INPUT_DATATYPE', ''),
-                                      self.config)
-            out.append(outfile)
-
-        return out
+        return preprocess_files(closest_files_fixed,
+                                self.c_dict.get(data_type + 'INPUT_DATATYPE', ''),
+                                self.config)
 
     def _get_closest_files(self, data_dir, template, valid_time,
                            valid_range_lower, valid_range_upper):
-        closest_files = []
-
-        # get time of each file, compare to valid time, save best within range
-        closest_time = 9999999
-
-        valid_seconds = int(
-            datetime.strptime(valid_time, "%Y%m%d%H%M%S").strftime("%s")
+        valid_dt = datetime.strptime(valid_time, "%Y%m%d%H%M%S")
+        lower_limit = datetime.strptime(
+            shift_time_seconds(valid_time, valid_range_lower), "%Y%m%d%H%M%S"
+        )
+        upper_limit = datetime.strptime(
+            shift_time_seconds(valid_time, valid_range_upper), "%Y%m%d%H%M%S"
         )
-        lower_limit = int(datetime.strptime(shift_time_seconds(valid_time, valid_range_lower),
-                                            "%Y%m%d%H%M%S").strftime("%s"))
-        upper_limit = int(datetime.strptime(shift_time_seconds(valid_time, valid_range_upper),
-                                            "%Y%m%d%H%M%S").strftime("%s"))
-
-        # step through all files under input directory in sorted order
-        for dirpath, _, all_files in os.walk(data_dir):
-            for filename in sorted(all_files):
-                fullpath = os.path.join(dirpath, filename)
-
-                # remove input data directory to get relative path
-                rel_path = fullpath.replace(f'{data_dir}/', "")
-                # extract time information from relative path using template
-                file_time_info = get_time_from_file(rel_path, template,
-                                                    self.logger)
-                if file_time_info is None:
-                    continue
 
-                # get valid time and check if it is within the time range
-                file_valid_time = file_time_info['valid'].strftime("%Y%m%d%H%M%S")
-                # skip if could not extract valid time
-                if not file_valid_time:
-                    continue
-                file_valid_dt = datetime.strptime(file_valid_time, "%Y%m%d%H%M%S")
-                file_valid_seconds = int(file_valid_dt.strftime("%s"))
-                # skip if outside time range
-                if file_valid_seconds < lower_limit or file_valid_seconds > upper_limit:
-                    continue
+        # get files within range using index of valid times so that the
+        # directory is not walked for every run time
+        files_in_range = get_files_in_time_range(data_dir, template,
+                                                 lower_limit, upper_limit,
+                                                 self.logger)
 
-                # if multiple files are allowed, get all files within range
-                if self.c_dict.get('ALLOW_MULTIPLE_FILES', False):
-                    closest_files.append(fullpath)
-                    continue
+        # if multiple files are allowed, get all files within range
+        if self.c_dict.get('ALLOW_MULTIPLE_FILES', False):
+            return [fullpath for _, fullpath in files_in_range]
 
-                # if only 1 file is allowed, check if file is
-                # closer to desired valid time than previous match
-                diff = abs(valid_seconds - file_valid_seconds)
-                if diff < closest_time:
-                    closest_time = diff
-                    del closest_files[:]
-                    closest_files.append(fullpath)
+        # if only 1 file is allowed, get file closest to desired valid time
+        # use first file found if more than one are equally close
+        closest_files = []
+        closest_time = 9999999
+        for file_valid_dt, fullpath in files_in_range:
+            diff = abs((valid_dt - file_valid_dt).total_seconds())
+            if diff < closest_time:
+                closest_time = diff
+                closest_files = [fullpath]
 
         return closest_files
 
@@ -850,7 +874,7 @@ class CommandBuilder:
             file_list_path = do_string_sub(self.c_dict['FCST_INPUT_FILE_LIST'],
                                            **time_info)
             self.logger.debug(f"Explicit file list file: {file_list_path}")
-            if not os.path.exists(file_list_path):
+            if not path_exists(file_list_path):
                 self.log_error("Could not find file list file")
                 return False
 
@@ -958,6 +982,7 @@ class CommandBuilder:
                 self.logger.debug(f"Adding file to list: {f_path}")
                 file_handle.write(f_path + '\n')
 
+        invalidate_path(list_path)
         self.logger.debug(f"Wrote list of filenames to {list_path}")
         return list_path
 
@@ -1038,14 +1063,14 @@ class CommandBuilder:
                 search_path = f'{search_path}{check_extension}'
             self.set_output_path(output_path)
 
-        output_exists = bool(glob.glob(search_path))
+        output_exists = bool(glob_paths(search_path))
 
         if not parent_dir:
             self.log_error('Must specify path to output file')
             return False
 
         # create full output dir if it doesn't already exist
-        if (not os.path.exists(parent_dir) and
+        if (not path_exists(parent_dir) and
                 not self.c_dict.get('DO_NOT_RUN_EXE', False)):
             self.logger.debug(f"Creating output directory: {parent_dir}")
             mkdir_p(parent_dir)
@@ -1099,7 +1124,7 @@ class CommandBuilder:
             self.logger.info("Refer to the GempakToCF use case documentation for information "
                              "on how to obtain the tool: parm/use_cases/met_tool_wrapper/GempakToCF/GempakToCF.py")
             self.isOK = False
-        elif not os.path.exists(gempaktocf_jar):
+        elif not path_exists(gempaktocf_jar):
             self.log_error(f"GempakToCF Jar file does not exist at {gempaktocf_jar}. " +
                            "This is required to process Gempak data.")
             self.logger.info("Refer to the GempakToCF use case documentation for information "
@@ -1279,33 +1304,195 @@ class CommandBuilder:
 
     def run_command(self, cmd, cmd_name=None):
         """! Run a command with the appropriate environment. Add command to
-        list of all commands run.
+        list of all commands run. If commands are run concurrently, the
+        command is submitted to run in the background and the return code is
+        checked when wait_for_commands is called.
 
         @param cmd command to run
         @param cmd_name optional command name to use in the log filename
         @returns True on success, False otherwise
         """
+        # write command to the journal if one is being written, otherwise
         # add command to list of all commands run
-        self.all_commands.append((cmd,
-                                  self.print_all_envs(print_copyable=True)))
+        journal = self.config.command_journal
+        if journal is not None:
+            env_list = sorted(self.env_list)
+            journal.add(cmd, self._get_command_env(),
+                        self.c_dict.get('USER_SHELL', ''), env_list=env_list)
+        else:
+            self.all_commands.append((cmd,
+                                      self.print_all_envs(print_copyable=True)))
 
         log_name = cmd_name if cmd_name else self.log_name
 
         if self.instance:
             log_name = f"{log_name}.{self.instance}"
 
+        # track output so commands that read it wait for this command
+        # and so it is removed from the filesystem cache when written
+        outputs = output_dirs = None
+        if self.outfile:
+            outputs = [self.get_output_path()]
+        elif self.outdir:
+            output_dirs = [self.outdir]
+
+        # skip command if it already completed in a previous run
+        ledger_task = None
+        if self.cmdrunner.ledger is not None:
+            ledger_task = self._get_ledger_task(cmd, outputs, output_dirs)
+            if ledger_task is None:
+                return True
+
+        profile_info = None
+        if self.cmdrunner.profile is not None:
+            profile_info = self._get_profile_info()
+
+        # copyable environment is only written to separate MET log files
+        copyable_env = None
+        if not self.cmdrunner.log_met_to_metplus:
+            copyable_env = self.get_env_copy()
+
+        # add command to batch to run with other commands in one process
+        if self.cmd_batch is not None:
+            self.cmd_batch.append({'cmd': cmd,
+                                   'env': self.env.copy(),
+                                   'log_name': log_name,
+                                   'copyable_env': copyable_env,
+                                   'outputs': outputs,
+                                   'output_dirs': output_dirs,
+                                   'ledger_task': ledger_task,
+                                   'profile_info': profile_info})
+            if len(self.cmd_batch) < (self.c_dict.get('BATCH_SIZE') or 1):
+                return True
+            return self.run_cmd_batch()
+
+        if self.cmdrunner.is_concurrent:
+            self.cmdrunner.submit_cmd(cmd,
+                                      env=self.env,
+                                      log_name=log_name,
+                                      copyable_env=copyable_env,
+                                      outputs=outputs,
+                                      output_dirs=output_dirs,
+                                      ledger_task=ledger_task,
+                                      profile_info=profile_info)
+            return True
+
         ret, out_cmd = self.cmdrunner.run_cmd(cmd,
                                               env=self.env,
                                               log_name=log_name,
-                                              copyable_env=self.get_env_copy())
+                                              copyable_env=copyable_env,
+                                              outputs=outputs,
+                                              output_dirs=output_dirs,
+                                              ledger_task=ledger_task,
+                                              profile_info=profile_info)
         if not ret:
             return True
 
+        self._report_command_failure(cmd, log_name)
+        return False
+
+    def _get_profile_info(self):
+        """!Get values to label the run profile record of a command with
+        the wrapper and the run time that it was run for
+
+        @returns dictionary with wrapper name, instance, init, valid, and
+         lead time of the current run
+        """
+        time_info = self.profile_time_info or {}
+        return {
+            'wrapper': self.__class__.__name__.replace('Wrapper', ''),
+            'instance': self.instance,
+            'init': time_info.get('init_fmt'),
+            'valid': time_info.get('valid_fmt'),
+            'lead': time_info.get('lead_string'),
+        }
+
+    def _get_ledger_task(self, cmd, outputs, output_dirs):
+        """! Get the run ledger entry for a command. The entry is identified
+        by the command and the environment variables that are set for it, so
+        a change to the configuration of the command will cause it to run
+        again.
+
+        @param cmd command to run
+        @param outputs list of files written by the command or None
+        @param output_dirs list of directories written to by the command or
+         None
+        @returns LedgerTask object or None if the command already completed
+        """
+        env_vars = {key: self.env.get(key) for key in self.env_list}
+        if 'user_env_vars' in self.config.sections():
+            for user_var in self.config.keys('user_env_vars'):
+                env_vars[user_var] = self.env.get(user_var)
+
+        ledger_task = self.cmdrunner.ledger.get_task(cmd, env_vars,
+                                                     outputs=outputs,
+                                                     output_dirs=output_dirs)
+
+        # run command if an input is still being written by another command
+        if self.cmdrunner.has_pending_input(cmd):
+            return ledger_task
+
+        if not ledger_task.is_complete():
+            return ledger_task
+
+        self.logger.info("Skipping command that already completed "
+                         f"successfully in a previous run: {cmd}")
+        return None
+
+    def run_cmd_batch(self):
+        """! Run the commands that were added to the batch in a single
+        process. If commands are run concurrently, the batch is submitted to
+        run in the background.
+
+        @returns True if all commands succeeded or were submitted, False
+         otherwise
+        """
+        if not self.cmd_batch:
+            return True
+
+        batch = self.cmd_batch
+        self.cmd_batch = []
+
+        if self.cmdrunner.is_concurrent:
+            self.cmdrunner.submit_batch(batch)
+            return True
+
+        success = True
+        for item, (ret, cmd) in zip(batch, self.cmdrunner.run_batch(batch)):
+            if not ret:
+                continue
+            self._report_command_failure(cmd, item['log_name'])
+            success = False
+
+        return success
+
+    def wait_for_commands(self):
+        """! Wait for any commands that are running in the background to
+        finish. An error is logged for each command that failed.
+
+        @returns True if all commands succeeded, False otherwise
+        """
+        if not self.cmdrunner.is_concurrent:
+            return True
+
+        failed_commands = self.cmdrunner.wait_for_cmds()
+        for cmd, log_name in failed_commands:
+            self._report_command_failure(cmd, log_name)
+
+        return not failed_commands
+
+    def _report_command_failure(self, cmd, log_name):
+        """! Log error for a command that returned a non-zero return code and
+        log the path to the log file that contains more information.
+
+        @param cmd command that failed
+        @param log_name name used in the log filename of the command
+        """
         self.log_error(f"Command returned a non-zero return code: {cmd}")
 
         logfile_path = self.config.getstr('config', 'LOG_METPLUS')
         if not logfile_path:
-            return False
+            return
 
         # if MET output is written to its own logfile, get that filename
         if not self.config.getbool('config', 'LOG_MET_OUTPUT_TO_METPLUS'):
@@ -1313,7 +1500,6 @@ class CommandBuilder:
 
         self.logger.info("Check the logfile for more information on why "
                          f"it failed: {logfile_path}")
-        return False
 
     def run_all_times(self, custom=None):
         """! Loop over time range specified in conf file and
@@ -34,27 +34,773 @@ Output Files: N/A
 #
 
 import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import resource
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
 from produtil.run import exe, run
+from produtil.datastore import Datastore, Task, COMPLETED, FAILED, RUNNING
 import shlex
 from datetime import datetime, timezone
 
+from ..util import invalidate_path, invalidate_file_cache
+from ..util import use_staged_files, release_staged_files
+
+# lock used to prevent concurrent commands from writing to a log file at once
+_LOG_LOCK = threading.Lock()
+
+# run ledgers that are open in this process, keyed by database path
+_LEDGERS = {}
+_LEDGERS_LOCK = threading.Lock()
+
+# absolute paths found in environment variable values and config files
+_ABS_PATH_REGEX = re.compile(r'(?<![\w.$}])/[^\s"\',;\[\]{}()=]+')
+
+
+def _get_paths_from_cmd(cmd):
+    """!Get the absolute paths in a command and the paths listed in any file
+    list files that are passed to the command.
+
+    @param cmd command to read
+    @returns list of paths
+    """
+    paths = []
+    for arg in _split_cmd(cmd):
+        if not arg.startswith(os.sep):
+            continue
+        paths.append(arg)
+        # include files listed in file list files
+        paths.extend(_read_file_list(arg) or [])
+
+    return paths
+
+
+def _split_cmd(cmd):
+    """!Split a command into arguments.
+
+    @param cmd command to split
+    @returns list of arguments
+    """
+    try:
+        return shlex.split(cmd)
+    except ValueError:
+        return cmd.split()
+
+
+def _read_file_list(path):
+    """!Read the paths listed in a file list file.
+
+    @param path file to read
+    @returns list of paths or None if path is not a file list file
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'r') as file_handle:
+            if file_handle.readline().strip() != 'file_list':
+                return None
+            return [line.strip() for line in file_handle if line.strip()]
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _find_existing_files(text):
+    """!Find the absolute paths of files that exist in text, e.g. the value
+    of an environment variable or the contents of a MET config file.
+
+    @param text string to search
+    @returns list of paths of files that exist
+    """
+    return [path for path in dict.fromkeys(_ABS_PATH_REGEX.findall(text))
+            if os.path.isfile(path)]
+
+
+def _read_config_files(args):
+    """!Read the contents of the files passed to a command with -config.
+
+    @param args list of command arguments
+    @returns list of strings containing the contents of each file
+    """
+    contents = []
+    for flag, arg in zip(args[:-1], args[1:]):
+        if flag != '-config' or not os.path.isfile(arg):
+            continue
+        try:
+            with open(arg, 'r') as file_handle:
+                contents.append(file_handle.read())
+        except (OSError, UnicodeDecodeError):
+            continue
+    return contents
+
+
+class CommandPool(object):
+    """!Pool of worker threads used to run commands in the background.
+    A pool can be shared by the CommandRunner objects of many wrappers so
+    that the commands of a process can start while the commands of the
+    processes before it in the PROCESS_LIST are still running. The output
+    files of each submitted command are tracked so that a command that
+    reads a file that is written by a command that is still running waits
+    for that command to finish before it starts.
+    """
+    def __init__(self, max_workers, logger=None):
+        """!Create a pool of workers
+
+        @param max_workers maximum number of commands to run at the same time
+        @param logger (optional) logger to output messages
+        """
+        self.max_workers = max_workers
+        self.logger = logger
+        self._executor = None
+        self._pending = []
+        # output file path -> futures of commands that write to it
+        self._outputs = {}
+        # output directory -> futures of commands that write files in it
+        self._output_dirs = {}
+        # parent directory of an output -> futures of commands that write
+        # under it
+        self._parent_dirs = {}
+
+    def submit(self, func, cmd, owner=None, log_name=None, outputs=None,
+               output_dirs=None):
+        """!Submit a function that runs a command to the pool. The function
+        is not called until all commands that write files read by the
+        command have finished.
+
+        @param func function to call to run the command. It must return a
+         tuple of the return code and the command that was run
+        @param cmd command that is run. Used to find the commands that
+         it depends on
+        @param owner object that submitted the command. Used by wait to
+         only wait for commands submitted by a given object
+        @param log_name name of the executable used to name the log file
+        @param outputs list of paths to files that are written by the command
+        @param output_dirs list of directories that the command writes files
+         into when the names of the files are not known
+        @returns Future of the submitted command
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='metplus_cmd'
+            )
+
+        # futures run in the order they are submitted, so all dependencies
+        # have started running before a command starts to wait for them
+        dependencies = self.get_dependencies(cmd)
+        future = self._executor.submit(self._run_when_ready,
+                                       func, cmd, dependencies)
+        self._pending.append((owner, cmd, log_name, future))
+
+        for output in outputs if outputs else []:
+            self._register(self._outputs, output, future)
+        for output_dir in output_dirs if output_dirs else []:
+            self._register(self._output_dirs, output_dir, future)
+
+        return future
+
+    def _register(self, registry, path, future):
+        path = os.path.abspath(path)
+        registry.setdefault(path, []).append(future)
+        parent = os.path.dirname(path)
+        while parent and parent != os.path.dirname(parent):
+            self._parent_dirs.setdefault(parent, []).append(future)
+            parent = os.path.dirname(parent)
+
+    def _run_when_ready(self, func, cmd, dependencies):
+        for dependency in dependencies:
+            try:
+                ret, _ = dependency.result()
+            except Exception:
+                ret = -1
+            if ret:
+                if self.logger:
+                    self.logger.error('Not running command because a command '
+                                      f'that it depends on failed: {cmd}')
+                return -1, cmd
+        return func()
+
+    def get_dependencies(self, cmd):
+        """!Get the commands that write files that are read by a command.
+        The paths in the command and the paths listed in any file list files
+        that are passed to the command are compared to the outputs of the
+        commands that were already submitted.
+
+        @param cmd command to check
+        @returns list of futures of the commands that must finish before
+         the command can run
+        """
+        if not self._outputs and not self._output_dirs:
+            return []
+
+        dependencies = []
+        for path in _get_paths_from_cmd(cmd):
+            path = os.path.abspath(path)
+            # path is an output or is a directory containing outputs
+            dependencies.extend(self._outputs.get(path, []))
+            dependencies.extend(self._output_dirs.get(path, []))
+            dependencies.extend(self._parent_dirs.get(path, []))
+
+            # path is inside a directory that a command writes into
+            parent = os.path.dirname(path)
+            while parent and parent != os.path.dirname(parent):
+                dependencies.extend(self._output_dirs.get(parent, []))
+                parent = os.path.dirname(parent)
+
+        # remove duplicates but keep order
+        return list(dict.fromkeys(dependencies))
+
+    def has_pending(self):
+        """!Check if any submitted commands have not finished running
+
+        @returns True if a submitted command is waiting or running
+        """
+        return any(not future.done() for *_, future in list(self._pending))
+
+    def is_pending_output(self, path):
+        """!Check if a file will be written by a command that was submitted
+
+        @param path file path to check
+        @returns True if a submitted command writes the file, False otherwise
+        """
+        return os.path.abspath(path) in self._outputs
+
+    def is_pending_path(self, path):
+        """!Check if a submitted command writes to a path, inside of a
+        directory, or into a directory that contains the path
+
+        @param path file or directory path to check
+        @returns True if a submitted command writes to the path
+        """
+        path = os.path.abspath(path)
+        if (path in self._outputs or path in self._output_dirs or
+                path in self._parent_dirs):
+            return True
+
+        parent = os.path.dirname(path)
+        while parent and parent != os.path.dirname(parent):
+            if parent in self._output_dirs:
+                return True
+            parent = os.path.dirname(parent)
+
+        return False
+
+    def wait(self, owner=None):
+        """!Wait for commands that were submitted to finish running.
+
+        @param owner only wait for commands that were submitted by this
+         object. Wait for all commands if None
+        @returns list of tuples containing the command and log name of each
+         command that returned a non-zero return code, in the order that the
+         commands were submitted
+        """
+        failed = []
+        remaining = []
+        for item in self._pending:
+            item_owner, cmd, log_name, future = item
+            if owner is not None and item_owner is not owner:
+                remaining.append(item)
+                continue
+            try:
+                ret, _ = future.result()
+            except Exception:
+                ret = -1
+            if ret:
+                failed.append((cmd, log_name))
+
+        self._pending = remaining
+        if not self._pending:
+            self._outputs.clear()
+            self._output_dirs.clear()
+            self._parent_dirs.clear()
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+        return failed
+
+
+class RunLedger(object):
+    """!Record of the commands that completed successfully, stored in a
+    sqlite database using produtil.datastore. Each command is stored as a
+    Task named with a hash of the command and the environment variables
+    that were set for it. The task also stores a hash of the size and
+    modification time of each file read by the command, including the files
+    listed in file list files and files referenced by the environment
+    variables or config files, and of each output,
+    so a command is only skipped on a later run if it is run the same way,
+    its input files have not changed, and its output has not been changed
+    or removed since it completed.
+    """
+    def __init__(self, filename, logger=None):
+        """!Open or create a run ledger
+
+        @param filename path to the sqlite database file
+        @param logger (optional) logger to output messages
+        """
+        self.filename = filename
+        self.logger = logger
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self.datastore = Datastore(filename, logger=logger)
+
+    @staticmethod
+    def get_ledger(filename, logger=None):
+        """!Get the run ledger for a database file, opening it if it is not
+        already open in this process so all wrappers share one ledger.
+
+        @param filename path to the sqlite database file
+        @param logger (optional) logger to output messages
+        @returns RunLedger object
+        """
+        filename = os.path.abspath(filename)
+        with _LEDGERS_LOCK:
+            if filename not in _LEDGERS:
+                _LEDGERS[filename] = RunLedger(filename, logger=logger)
+            return _LEDGERS[filename]
+
+    def get_task(self, cmd, env_vars=None, outputs=None, output_dirs=None):
+        """!Get the ledger entry for a command. The paths of file list files
+        in the command are replaced with the paths they contain so that the
+        entry does not change if the file list files are written to a
+        different location, e.g. a path that includes the log timestamp.
+        Files referenced by absolute path in the environment variables or in
+        the -config files, e.g. climatology or mask files, are also inputs.
+
+        @param cmd command that is run
+        @param env_vars dictionary of environment variables set for the
+         command that affect its output
+        @param outputs list of files written by the command
+        @param output_dirs list of directories the command writes files into
+        @returns LedgerTask object
+        """
+        outputs = list(outputs or [])
+        output_dirs = list(output_dirs or [])
+        skip_paths = {os.path.normpath(path) for path in outputs + output_dirs}
+
+        args = []
+        inputs = []
+        cmd_args = _split_cmd(cmd)
+        for arg in cmd_args:
+            file_list = None
+            if arg.startswith(os.sep):
+                file_list = _read_file_list(arg)
+            if file_list is not None:
+                args.append(['file_list', file_list])
+                inputs.extend(file_list)
+                continue
+
+            args.append(arg)
+            if (arg.startswith(os.sep) and
+                    os.path.normpath(arg) not in skip_paths):
+                inputs.append(arg)
+
+        texts = [str(value) for value in (env_vars or {}).values() if value]
+        texts.extend(_read_config_files(cmd_args))
+        for text in texts:
+            for path in _find_existing_files(text):
+                if (path not in inputs and
+                        os.path.normpath(path) not in skip_paths):
+                    inputs.append(path)
+
+        key = json.dumps([args, sorted((env_vars or {}).items())])
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return LedgerTask(self, name, cmd, inputs, outputs, output_dirs)
+
+
+class LedgerTask(object):
+    """!Entry in a RunLedger for a single command. The files written into
+    output directories are recorded when the command finishes so that only
+    those files are checked on a later run, not the directories themselves,
+    which change when other commands write to them.
+    """
+    def __init__(self, ledger, name, cmd, inputs=None, outputs=None,
+                 output_dirs=None):
+        self.ledger = ledger
+        self.name = name
+        self.cmd = cmd
+        self.inputs = list(inputs or [])
+        self.outputs = list(outputs or [])
+        self.output_dirs = list(output_dirs or [])
+        self._output_dir_files = {}
+        self._task = None
+
+    @property
+    def task(self):
+        if self._task is None:
+            self._task = Task(self.ledger.datastore, self.name,
+                              logger=self.ledger.logger, cache=False)
+        return self._task
+
+    @staticmethod
+    def _get_signature(paths):
+        """!Get a hash of the size and modification time of paths.
+
+        @param paths list of file or directory paths
+        @returns string containing the hash
+        """
+        items = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                items.append([path, stat.st_size, stat.st_mtime_ns])
+            except OSError:
+                items.append([path, None, None])
+        return hashlib.sha1(json.dumps(items).encode('utf-8')).hexdigest()
+
+    def _get_dir_files(self):
+        """!Get the modification time of each file in the output directories.
+
+        @returns dictionary of file path and modification time
+        """
+        dir_files = {}
+        for output_dir in self.output_dirs:
+            for root, _, files in os.walk(output_dir):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    try:
+                        dir_files[path] = os.stat(path).st_mtime_ns
+                    except OSError:
+                        continue
+        return dir_files
+
+    def get_recorded_outputs(self):
+        """!Get the files that were written into the output directories by
+        the command when it last completed.
+
+        @returns list of file paths
+        """
+        return json.loads(self.task.meta('output_files') or '[]')
+
+    def get_input_signature(self):
+        return self._get_signature(self.inputs)
+
+    def get_output_signature(self, output_files=None):
+        return self._get_signature(self.outputs + (output_files or []))
+
+    def is_complete(self):
+        """!Check if the command completed successfully in a previous run
+        and its inputs and outputs have not changed since.
+
+        @returns True if the command does not need to run again
+        """
+        if self.task.state != COMPLETED:
+            return False
+
+        output_files = self.get_recorded_outputs()
+        if any(not os.path.exists(path)
+               for path in self.outputs + self.output_dirs + output_files):
+            return False
+
+        return (self.task.meta('inputs') == self.get_input_signature() and
+                self.task.meta('outputs') ==
+                self.get_output_signature(output_files))
+
+    def start(self):
+        """!Mark command as running so an interrupted run is not complete"""
+        if self.output_dirs:
+            self._output_dir_files = self._get_dir_files()
+        self.task.state = RUNNING
+
+    def finish(self, ret):
+        """!Record the result of running the command. Files in the output
+        directories that were created or modified while the command ran are
+        recorded as its outputs.
+
+        @param ret return code of the command
+        """
+        if ret:
+            self.task.state = FAILED
+            return
+
+        output_files = []
+        if self.output_dirs:
+            output_files = sorted(
+                path for path, mtime in self._get_dir_files().items()
+                if self._output_dir_files.get(path) != mtime
+            )
+
+        self.task['inputs'] = self.get_input_signature()
+        self.task['outputs'] = self.get_output_signature(output_files)
+        self.task['output_files'] = json.dumps(output_files)
+        self.task.state = COMPLETED
+
+
+class RunProfile(object):
+    """!Writes the time and resources used by each command that is run to a
+    file with one JSON object per line. The CPU time, maximum resident set
+    size, and bytes read and written are read from resource.getrusage before
+    and after the command runs. Usage of child processes is only available
+    for all children together, so the values of commands that run at the
+    same time include each other and are marked as concurrent. The maximum
+    resident set size is the largest of any child process that finished so
+    far, so it is exact for the command that used the most memory.
+    """
+    # size of blocks reported by getrusage in ru_inblock and ru_oublock
+    BLOCK_SIZE = 512
+
+    def __init__(self, path):
+        """!@param path file to write. It is created when the first record
+         is added
+        """
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        """!Write a record to the profile file
+
+        @param record dictionary that can be converted to JSON
+        """
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                            exist_ok=True)
+                self._file = open(self.path, 'a')
+            self._file.write(json.dumps(record, default=str) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @contextmanager
+    def measure(self, record, who=resource.RUSAGE_CHILDREN):
+        """!Measure the code that runs inside the with block, then add the
+        start and end time, wall clock seconds, and resource usage to the
+        record and write it.
+
+        @param record dictionary to write. Values can be added to it inside
+         the with block, e.g. the return code of the command
+        @param who resource.RUSAGE_CHILDREN to measure the commands that are
+         run or resource.RUSAGE_SELF to measure the Python process
+        @returns record
+        """
+        start_time = datetime.now(timezone.utc)
+        start_usage = resource.getrusage(who)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - start
+            usage = resource.getrusage(who)
+            record.update({
+                'start': start_time.isoformat(),
+                'end': datetime.now(timezone.utc).isoformat(),
+                'wall': wall,
+                'user_cpu': usage.ru_utime - start_usage.ru_utime,
+                'sys_cpu': usage.ru_stime - start_usage.ru_stime,
+                'max_rss_kb': usage.ru_maxrss,
+                'bytes_read': ((usage.ru_inblock - start_usage.ru_inblock)
+                               * self.BLOCK_SIZE),
+                'bytes_written': ((usage.ru_oublock - start_usage.ru_oublock)
+                                  * self.BLOCK_SIZE),
+            })
+            self.add(record)
+
 
 class CommandRunner(object):
     """! Class for Creating and Running External Programs
     """
-    def __init__(self, config, logger=None, verbose=2, skip_run=False):
+    def __init__(self, config, logger=None, verbose=2, skip_run=False,
+                 max_parallel=1):
         """!Class for Creating and Running External Programs.
             It was intended to handle the MET executables but
-            can be used by other executables."""
+            can be used by other executables.
+
+            @param max_parallel maximum number of commands that can run at
+             the same time. If greater than 1, commands passed to submit_cmd
+             are run in the background. Defaults to 1.
+        """
         self.logger = logger
         self.config = config
         self.verbose = verbose
         self.skip_run = skip_run
         self.log_met_to_metplus = config.getbool('config',
                                                  'LOG_MET_OUTPUT_TO_METPLUS')
+        self.max_parallel = max_parallel
+        # pool of workers, which may be shared with other command runners
+        self.pool = None
+
+        # record of completed commands used to skip commands on a rerun
+        self.ledger = None
+        if (not skip_run and
+                config.getbool('config', 'METPLUS_RUN_LEDGER', False)):
+            self.ledger = RunLedger.get_ledger(
+                config.getstr('config', 'METPLUS_RUN_LEDGER_FILE'),
+                logger=logger
+            )
+
+        # record of the time and resources used by each command
+        self.profile = config.run_profile
+
+    @property
+    def is_concurrent(self):
+        """!True if commands are run in the background, False otherwise"""
+        return self.max_parallel > 1 and not self.skip_run
+
+    def submit_cmd(self, cmd, env=None, log_name=None,
+                   copyable_env=None, outputs=None, output_dirs=None,
+                   ledger_task=None, profile_info=None, **kwargs):
+        """!Submit a command to the pool of workers so that it runs in the
+        background. Up to max_parallel commands are run at the same time.
+        The output of each command is buffered and written to its log file
+        when the command finishes so output of different commands is not
+        interleaved. Call wait_for_cmds to wait for all submitted commands
+        to finish and obtain the commands that failed.
+
+        @param cmd command to run
+        @param env environment to use to run the command. A copy is made so
+         changes made after this call do not affect the command
+        @param log_name name of the executable being run used to name the
+         log file
+        @param copyable_env string of shell commands to set the environment
+        @param outputs list of files written by the command
+        @param output_dirs list of directories the command writes files into
+        @param ledger_task LedgerTask to update when the command finishes
+        @param profile_info dictionary of values to add to the run profile
+         record of the command, e.g. wrapper name and lead time
+        @param kwargs other options sent to run_cmd
+        """
+        if self.pool is None:
+            self.pool = CommandPool(self.max_parallel, logger=self.logger)
+
+        env = (os.environ if env is None else env).copy()
+        staged_files = self._use_staged_files([cmd])
+        future = self.pool.submit(
+            lambda: self.run_cmd(cmd, env=env, log_name=log_name,
+                                 copyable_env=copyable_env,
+                                 buffer_output=True, outputs=outputs,
+                                 output_dirs=output_dirs,
+                                 ledger_task=ledger_task,
+                                 profile_info=profile_info,
+                                 staged_files=staged_files, **kwargs),
+            cmd, owner=self, log_name=log_name,
+            outputs=outputs, output_dirs=output_dirs,
+        )
+        self._release_when_done(future, staged_files)
+
+    def submit_batch(self, batch):
+        """!Submit a batch of commands to the pool of workers so that they run
+        in the background in a single shell process. See run_batch for more
+        information. An error is logged for each command in the batch that
+        fails and the batch is reported as failed by wait_for_cmds.
+
+        @param batch list of dictionaries describing each command to run
+        """
+        if self.pool is None:
+            self.pool = CommandPool(self.max_parallel, logger=self.logger)
+
+        outputs = []
+        output_dirs = []
+        for item in batch:
+            outputs.extend(item.get('outputs') or [])
+            output_dirs.extend(item.get('output_dirs') or [])
+
+        batch_cmd = '\n'.join(item['cmd'] for item in batch)
+        staged_files = self._use_staged_files(item['cmd'] for item in batch)
+        future = self.pool.submit(
+            lambda: self._run_batch_in_background(batch, batch_cmd,
+                                                  staged_files),
+            batch_cmd, owner=self, log_name=batch[0].get('log_name'),
+            outputs=outputs, output_dirs=output_dirs,
+        )
+        self._release_when_done(future, staged_files)
+
+    def _run_batch_in_background(self, batch, batch_cmd, staged_files):
+        ret = 0
+        for cmd_ret, cmd in self.run_batch(batch, staged_files=staged_files):
+            if cmd_ret:
+                self.logger.error("Command in batch returned a non-zero "
+                                  f"return code: {cmd}")
+                ret = cmd_ret
+        return ret, batch_cmd
+
+    def _use_staged_files(self, cmds):
+        """!Mark the staged files read by commands as in use so they are not
+        removed to limit the size of the staging directory until the
+        commands finish.
+
+        @param cmds commands that are starting or submitted
+        @returns list of staged files that were marked as in use
+        """
+        return use_staged_files(self.config,
+                                (path for cmd in cmds
+                                 for path in _get_paths_from_cmd(cmd)))
+
+    @staticmethod
+    def _release_when_done(future, staged_files):
+        """!Release staged files when a submitted command finishes, even if
+        it did not run because a command that it depends on failed.
+
+        @param future Future of the submitted command
+        @param staged_files list of staged files read by the command
+        """
+        if staged_files:
+            future.add_done_callback(
+                lambda _: release_staged_files(staged_files)
+            )
+
+    def has_pending_cmds(self):
+        """!Check if commands are running in the background in the pool
+        used by this runner, which may have been submitted by another runner
+
+        @returns True if commands are waiting or running, False otherwise
+        """
+        return self.pool is not None and self.pool.has_pending()
+
+    def is_pending_output(self, path):
+        """!Check if a file will be written by a command that is running in
+        the background.
+
+        @param path file path to check
+        @returns True if file will be written, False otherwise
+        """
+        return self.pool is not None and self.pool.is_pending_output(path)
+
+    def is_pending_path(self, path):
+        """!Check if a command running in the background writes to a path or
+        to a directory that is or contains the path.
+
+        @param path file or directory path to check
+        @returns True if a command writes to the path, False otherwise
+        """
+        return self.pool is not None and self.pool.is_pending_path(path)
+
+    def has_pending_input(self, cmd):
+        """!Check if a command reads a path that a command running in the
+        background writes to.
+
+        @param cmd command to check
+        @returns True if an input to the command is pending, False otherwise
+        """
+        return any(self.is_pending_path(path)
+                   for path in _get_paths_from_cmd(cmd))
+
+    def wait_for_cmds(self):
+        """!Wait for all commands that were submitted with submit_cmd to
+        finish running.
+
+        @returns list of tuples containing the command and log name of each
+         command that returned a non-zero return code, in the order that the
+         commands were submitted
+        """
+        if self.pool is None:
+            return []
+
+        return self.pool.wait(owner=self)
 
     def run_cmd(self, cmd, env=None, log_name=None,
-                copyable_env=None, **kwargs):
+                copyable_env=None, buffer_output=False, outputs=None,
+                output_dirs=None, ledger_task=None, profile_info=None,
+                staged_files=None, **kwargs):
         """!The command cmd is a string which is converted to a produtil
         exe Runner object and than run. Output of the command may also
         be redirected to either METplus log, MET log, or TTY.
@@ -69,6 +815,22 @@ class CommandRunner(object):
             os.environ if not set.
             @param log_name: Used only when ismetcmd=True, The name of the exectable
             being run.
+            @param buffer_output: If True, write output to a temporary file
+            that is appended to the log file when the command finishes.
+            Used when running commands concurrently.
+            @param outputs: list of files written by the command. Removed
+            from the filesystem cache when the command finishes.
+            @param output_dirs: list of directories the command writes files
+            into. Removed from the filesystem cache when the command
+            finishes. If neither outputs or output_dirs are set, the whole
+            cache is invalidated.
+            @param ledger_task: LedgerTask to record the result of the
+            command in the run ledger
+            @param profile_info: dictionary of values to add to the run
+            profile record of the command, e.g. wrapper name and lead time
+            @param staged_files: list of staged files read by the command that
+            were marked as in use when it was submitted and are released by
+            the caller. If None, they are marked while the command runs
             @param kwargs Other options sent to the produtil Run constructor
         """
         if cmd is None:
@@ -89,6 +851,11 @@ class CommandRunner(object):
         # Determine where to send the output from the MET command.
         log_dest = self.get_log_path(log_filename=log_name+'.log')
 
+        # write to a temporary file to avoid interleaving output
+        final_log_dest = log_dest
+        if log_dest and buffer_output:
+            log_dest = f'{log_dest}.{uuid.uuid4().hex[:8]}.tmp'
+
         # determine if command must be run in a shell
         run_inshell = '*' in cmd or ';' in cmd or '<' in cmd or '>' in cmd
 
@@ -119,24 +886,221 @@ class CommandRunner(object):
             else:
                 cmd_exe = exe(the_exe)[the_args].env(**env).err2out()
 
+        if ledger_task is not None:
+            ledger_task.start()
+
+        # keep staged input files until the command finishes
+        release_staged = staged_files is None
+        if release_staged:
+            staged_files = self._use_staged_files([cmd])
+
         # get current time to calculate total time to run command
         start_cmd_time = datetime.now()
 
-        # run command
-        try:
-            ret = run(cmd_exe, **kwargs)
-        except Exception:
-            ret = -1
-        else:
-            # calculate time to run
-            end_cmd_time = datetime.now()
-            total_cmd_time = end_cmd_time - start_cmd_time
-            self.logger.info(f'Finished running {the_exe} '
-                             f'- took {total_cmd_time}')
+        # run command and record the time and resources it used
+        with self._profile_command(cmd, profile_info,
+                                   concurrent=buffer_output) as record:
+            try:
+                ret = run(cmd_exe, **kwargs)
+            except Exception:
+                ret = -1
+            else:
+                # calculate time to run
+                end_cmd_time = datetime.now()
+                total_cmd_time = end_cmd_time - start_cmd_time
+                self.logger.info(f'Finished running {the_exe} '
+                                 f'- took {total_cmd_time}')
+            finally:
+                if log_dest != final_log_dest:
+                    self._append_log(log_dest, final_log_dest)
+
+                # files written by the command are not in the filesystem cache
+                if outputs or output_dirs:
+                    for path in (outputs or []) + (output_dirs or []):
+                        invalidate_path(path)
+                else:
+                    invalidate_file_cache()
+
+                # staged input files can be removed to limit staging dir size
+                if release_staged and staged_files:
+                    release_staged_files(staged_files)
+            record['exit_code'] = ret
+
+        if ledger_task is not None:
+            ledger_task.finish(ret)
 
         return ret, cmd
 
+    def run_batch(self, batch, staged_files=None):
+        """!Run a group of commands one after another in a single shell
+        process instead of starting a new process from Python for each
+        command. Each command runs in a subshell with its own environment
+        variables and its output is written to a temporary file that is
+        appended to the log file of the command when the batch finishes, so
+        the log output is the same as if each command was run by run_cmd.
+
+        @param batch list of dictionaries describing each command to run.
+         Each contains cmd, the command to run, and optionally env,
+         log_name, copyable_env, outputs, output_dirs, ledger_task, and
+         profile_info, which are used like the arguments of run_cmd with the
+         same name
+        @param staged_files list of staged files read by the commands that
+         were marked as in use when the batch was submitted and are released
+         by the caller. If None, they are marked while the batch runs
+        @returns list of tuples containing the return code and command for
+         each command in the batch in the order they were run
+        """
+        for item in batch:
+            self.logger.info(f"COMMAND: {item['cmd']}")
+
+        # don't run app if DO_NOT_RUN_EXE is set to True
+        if self.skip_run:
+            self.logger.info("Not running commands (DO_NOT_RUN_EXE = True)")
+            return [(0, item['cmd']) for item in batch]
+
+        batch_dir = os.path.join(self.config.getdir('STAGING_DIR'), 'batch')
+        os.makedirs(batch_dir, exist_ok=True)
+        batch_dir = tempfile.mkdtemp(dir=batch_dir)
+        script_path = os.path.join(batch_dir, 'batch.sh')
+        status_path = os.path.join(batch_dir, 'status')
+
+        log_paths = []
+        lines = ['#!/bin/sh', f'# run {len(batch)} commands', '']
+        for index, item in enumerate(batch):
+            cmd = item['cmd']
+            log_name = item.get('log_name')
+            if not log_name:
+                log_name = os.path.basename(shlex.split(cmd)[0])
+
+            log_dest = self.get_log_path(log_filename=f'{log_name}.log')
+            tmp_log = None
+            if log_dest:
+                tmp_log = os.path.join(batch_dir, f'{index}.log')
+                self.logger.debug(f"Logging command output to: {log_dest}")
+                self.log_header_info(tmp_log, item.get('copyable_env'), cmd)
+            log_paths.append((tmp_log, log_dest))
+
+            lines.append('(')
+            env = item.get('env') or {}
+            for name, value in sorted(env.items()):
+                if os.environ.get(name) != value:
+                    lines.append(f'export {name}={shlex.quote(value)}')
+            lines.append(cmd)
+            redirect = f' >> {shlex.quote(tmp_log)} 2>&1' if tmp_log else ''
+            lines.append(f'){redirect}')
+            lines.append(f'echo "{index} $?" >> {shlex.quote(status_path)}')
+            lines.append('')
+
+        with open(script_path, 'w') as file_handle:
+            file_handle.write('\n'.join(lines))
+
+        for item in batch:
+            if item.get('ledger_task') is not None:
+                item['ledger_task'].start()
+
+        # keep staged input files until the commands finish
+        release_staged = staged_files is None
+        if release_staged:
+            staged_files = self._use_staged_files(item['cmd']
+                                                  for item in batch)
+
+        start_cmd_time = datetime.now()
+        with self._profile_command(batch[0]['cmd'],
+                                   batch[0].get('profile_info'),
+                                   concurrent=self.is_concurrent) as record:
+            try:
+                run(exe('sh')[script_path])
+            except Exception:
+                pass
+            total_cmd_time = datetime.now() - start_cmd_time
+            self.logger.info(f'Finished running batch of {len(batch)} '
+                             f'commands - took {total_cmd_time}')
+
+            # read return code of each command, -1 if command did not run
+            return_codes = [-1] * len(batch)
+            if os.path.exists(status_path):
+                with open(status_path, 'r') as file_handle:
+                    for line in file_handle:
+                        index, ret = line.split()
+                        return_codes[int(index)] = int(ret)
+
+            record['batch_size'] = len(batch)
+            record['exit_code'] = next((ret for ret in return_codes if ret),
+                                       0)
+
+        results = []
+        for item, ret, (tmp_log, log_dest) in zip(batch, return_codes,
+                                                   log_paths):
+            if log_dest:
+                self._append_log(tmp_log, log_dest)
+            results.append((ret, item['cmd']))
+            if item.get('ledger_task') is not None:
+                item['ledger_task'].finish(ret)
+
+            outputs = item.get('outputs')
+            output_dirs = item.get('output_dirs')
+            if outputs or output_dirs:
+                for path in (outputs or []) + (output_dirs or []):
+                    invalidate_path(path)
+            else:
+                invalidate_file_cache()
+
+        # staged input files can be removed to limit staging dir size
+        if release_staged and staged_files:
+            release_staged_files(staged_files)
+
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return results
+
+    def _profile_command(self, cmd, profile_info, concurrent=False):
+        """!Get a context manager that records the time and resources used
+        by a command in the run profile. Does nothing if the run profile is
+        not enabled.
+
+        @param cmd command that is run
+        @param profile_info dictionary of values to add to the record
+        @param concurrent True if other commands may run at the same time.
+         Also set if commands are running in the background
+        @returns context manager that yields the record dictionary
+        """
+        if self.profile is None:
+            return nullcontext({})
+
+        record = {
+            'type': 'command',
+            'exe': os.path.basename(shlex.split(cmd)[0]),
+            'cmd': cmd,
+            'concurrent': concurrent or self.has_pending_cmds(),
+        }
+        record.update(profile_info or {})
+        return self.profile.measure(record)
+
+    def _append_log(self, tmp_log_path, log_path):
+        """!Append content of temporary log file to log file and remove it
+
+        @param tmp_log_path path to temporary log file to read and remove
+        @param log_path path to log file to append content
+        """
+        if not os.path.exists(tmp_log_path):
+            return
+
+        self._flush_metplus_log()
+        with _LOG_LOCK:
+            with open(tmp_log_path, 'r') as tmp_handle, \
+                    open(log_path, 'a+') as log_handle:
+                shutil.copyfileobj(tmp_handle, log_handle)
+
+        os.remove(tmp_log_path)
+
+    def _flush_metplus_log(self):
+        """!Write queued log messages before MET output is appended to
+        the METplus log file so the log stays in order.
+        """
+        if self.log_met_to_metplus:
+            self.config.flush_log()
+
     def log_header_info(self, log_dest, copyable_env, cmd):
+        self._flush_metplus_log()
         with open(log_dest, 'a+') as log_file_handle:
             # if logging MET command to its own log file,
             # add command that was run to that log
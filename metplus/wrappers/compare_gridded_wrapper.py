@@ -32,6 +32,8 @@ class CompareGriddedWrapper(CommandBuilder):
 that reformat gridded data
     """
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     def __init__(self, config, instance=None):
         # set app_name if not set by child class for unit tests
         if not hasattr(self, 'app_name'):
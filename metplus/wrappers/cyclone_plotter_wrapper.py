@@ -10,13 +10,19 @@ import time
 import datetime
 import re
 import sys
+import glob
+import pickle
+import hashlib
+import threading
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 
 # handle if module can't be loaded to run wrapper
 WRAPPER_CANNOT_RUN = False
 EXCEPTION_ERR = ''
 try:
+    import numpy as np
     import pandas as pd
     import matplotlib.pyplot as plt
     import matplotlib.ticker as mticker
@@ -40,6 +46,7 @@ except Exception as err_msg:
 from ..util import do_string_sub
 from ..util import time_generator, add_to_time_input
 from ..util import mkdir_p, get_files
+from ..util import path_isdir
 from . import CommandBuilder
 
 
@@ -60,6 +67,7 @@ class CyclonePlotterWrapper(CommandBuilder):
 
         self.input_data = self.config.getdir('CYCLONE_PLOTTER_INPUT_DIR')
         self.output_dir = self.config.getdir('CYCLONE_PLOTTER_OUTPUT_DIR')
+        self.cache_dir = self.config.getdir('CYCLONE_PLOTTER_CACHE_DIR', '')
         self.init_date = self.config.getraw('config',
                                             'CYCLONE_PLOTTER_INIT_DATE')
         self.init_hr = self.config.getraw('config', 'CYCLONE_PLOTTER_INIT_HR')
@@ -189,175 +197,152 @@ class CyclonePlotterWrapper(CommandBuilder):
         """
         self.logger.debug("Begin retrieving data...")
 
-        # Store the data in the track list.
-        if os.path.isdir(self.input_data):
-            self.logger.debug("Get data from all files in the directory " +
-                              self.input_data)
-            # Get the list of all files (full file path) in this directory
-            all_input_files = get_files(self.input_data, ".*.tcst")
-
-            # read each file into pandas then concatenate them together
-            df_list = [pd.read_csv(file, delim_whitespace=True) for file in all_input_files]
-            combined = pd.concat(df_list, ignore_index=True)
-
-            # check for empty dataframe, set error message and exit
-            if combined.empty:
-                self.logger.error("No data found in specified files. Please check your config file settings.")
-                return None
-
-            # if there are any NaN values in the ALAT, ALON, STORM_ID, LEAD, INIT, AMODEL, or VALID column,
-            # drop that row of data (axis=0).  We need all these columns to contain valid data in order
-            # to create a meaningful plot.
-            combined_df = combined.dropna(axis=0, how='any',
-                                          subset=self.columns_of_interest)
-
-            # Retrieve and create the columns of interest
-            self.logger.debug(f"Number of rows of data: {combined_df.shape[0]}")
-            combined_subset = combined_df[self.columns_of_interest]
-            df = combined_subset.copy(deep=True)
-            df.allows_duplicate_labels = False
-            # INIT, LEAD, VALID correspond to the column headers from the MET
-            # TC tool output.  INIT_YMD, INIT_HOUR, VALID_DD, and VALID_HOUR are
-            # new columns (for a new dataframe) created from these MET columns.
-            df['INIT'] = df['INIT'].astype(str)
-            df['INIT_YMD'] = (df['INIT'].str[:8]).astype(int)
-            df['INIT_HOUR'] = (df['INIT'].str[9:11]).astype(int)
-            df['LEAD']  = df['LEAD']/10000
-            df['LEAD'] = df['LEAD'].astype(int)
-            df['VALID_DD'] = (df['VALID'].str[6:8]).astype(int)
-            df['VALID_HOUR'] = (df['VALID'].str[9:11]).astype(int)
-            df['VALID'] = df['VALID'].astype(int)
-
-            # Subset the dataframe to include only the data relevant to the user's criteria as
-            # specified in the configuration file.
-            init_date = int(self.init_date)
-            init_hh = int(self.init_hr)
-            model_name = self.model
-
-            if model_name:
-                self.logger.debug("Subsetting based on " + str(init_date) + " " + str(init_hh) +
-                                  ", and model:" + model_name )
-                mask = df[(df['AMODEL'] == model_name) & (df['INIT_YMD'] >= init_date) &
-                          (df['INIT_HOUR'] >= init_hh)]
-            else:
-                # no model specified, just subset on init date and init hour
-                mask = df[(df['INIT_YMD'] >= init_date) &
-                          (df['INIT_HOUR'] >= init_hh)]
-                self.logger.debug("Subsetting based on " + str(init_date) + ", and "+ str(init_hh))
-
-            user_criteria_df = mask
-            # reset the index so things are ordered properly in the new dataframe
-            user_criteria_df.reset_index(inplace=True)
-
-            # Aggregate the ALON values based on unique storm id to facilitate "sanitizing" the
-            # longitude values (to handle lons that cross the International Date Line).
-            unique_storm_ids_set = set(user_criteria_df['STORM_ID'])
-            self.unique_storm_ids = list(unique_storm_ids_set)
-            nunique = len(self.unique_storm_ids)
-            self.logger.debug(f" {nunique} unique storm ids identified")
-
-            # Use named tuples to store the relevant storm track information (their index value in the dataframe,
-            # track id, and ALON values and later on the SLON (sanitized ALON values).
-            TrackPt = namedtuple("TrackPt", "indices track alons alats")
-
-            # named tuple holding "sanitized" longitudes
-            SanTrackPt = namedtuple("SanTrackPt", "indices track alons slons")
-
-            # Keep track of the unique storm tracks by their storm_id
-            storm_track_dict = {}
-
-            for cur_unique in self.unique_storm_ids:
-                idx_list = user_criteria_df.index[user_criteria_df['STORM_ID'] == cur_unique].tolist()
-                alons = []
-                alats = []
-                indices = []
-
-                for idx in idx_list:
-                    alons.append(user_criteria_df.loc[idx, 'ALON'])
-                    alats.append(user_criteria_df.loc[idx, 'ALAT'])
-                    indices.append(idx)
-
-                # create the track_pt tuple and add it to the storm track dictionary
-                track_pt = TrackPt(indices, cur_unique, alons, alats)
-                storm_track_dict[cur_unique] = track_pt
-
-            # create a new dataframe to contain the sanitized lons (i.e. the original ALONs that have
-            # been cleaned up when crossing the International Date Line)
-            sanitized_df = user_criteria_df.copy(deep=True)
-
-            # Now we have a dictionary that helps in aggregating the data based on
-            # storm tracks (via storm id) and will contain the "sanitized" lons
-            sanitized_storm_tracks = {}
-            for key in storm_track_dict:
-                # "Sanitize" the longitudes to shift the lons that cross the International Date Line.
-                # Create a new SanTrackPt named tuple and add that to a new dictionary
-                # that keeps track of the sanitized data based on the storm id
-                # sanitized_lons = self.sanitize_lonlist(storm_track_dict[key].alons)
-                sanitized_lons = self.sanitize_lonlist(storm_track_dict[key].alons)
-                sanitized_track_pt = SanTrackPt(storm_track_dict[key].indices, storm_track_dict[key].track,
-                                                  storm_track_dict[key].alons, sanitized_lons)
-                sanitized_storm_tracks[key] = sanitized_track_pt
-
-            # fill in the sanitized dataframe, sanitized_df
-            for key in sanitized_storm_tracks:
-                # now use the indices of the storm tracks to correctly assign the sanitized
-                # lons to the appropriate row in the dataframe to maintain the row ordering of
-                # the original dataframe
-                idx_list = sanitized_storm_tracks[key].indices
-
-                for i, idx in enumerate(idx_list):
-                    sanitized_df.loc[idx,'SLON'] = sanitized_storm_tracks[key].slons[i]
-
-                    # Set some useful values used for plotting.
-                    # Set the IS_FIRST value to True if this is the first
-                    # point in the storm track, False
-                    # otherwise
-                    if i == 0:
-                        sanitized_df.loc[idx, 'IS_FIRST'] = True
-                    else:
-                        sanitized_df.loc[idx, 'IS_FIRST'] = False
-
-                    # Set the lead group to the character '0' if the valid hour is 0 or 12,
-                    # or to the charcter '6' if the valid hour is 6 or 18. Set the marker
-                    # to correspond to the valid hour: 'o' (open circle) for 0 or 12 valid hour,
-                    # or '+' (small plus/cross) for 6 or 18.
-                    if sanitized_df.loc[idx, 'VALID_HOUR'] == 0 or sanitized_df.loc[idx, 'VALID_HOUR'] == 12:
-                        sanitized_df.loc[idx, 'LEAD_GROUP'] ='0'
-                        sanitized_df.loc[idx, 'MARKER'] = self.circle_marker
-                    elif sanitized_df.loc[idx, 'VALID_HOUR'] == 6 or sanitized_df.loc[idx, 'VALID_HOUR'] == 18:
-                        sanitized_df.loc[idx, 'LEAD_GROUP'] = '6'
-                        sanitized_df.loc[idx, 'MARKER'] = self.cross_marker
-
-            # If the user has specified a region of interest rather than the
-            # global extent, subset the data even further to points that are within a bounding box.
-            if not self.is_global_extent:
-                self.logger.debug(f"Subset the data based on the region of interest.")
-                subset_by_region_df = self.subset_by_region(sanitized_df)
-                final_df = subset_by_region_df.copy(deep=True)
-            else:
-                final_df = sanitized_df.copy(deep=True)
-
-            # Write output ASCII file (csv) summarizing the information extracted from the input
-            # which is used to generate the plot.
-            if self.gen_ascii:
-               self.logger.debug(f" output dir: {self.output_dir}")
-               mkdir_p(self.output_dir)
-               ascii_track_parts = [self.init_date, '.csv']
-               ascii_track_output_name = ''.join(ascii_track_parts)
-               final_df_filename = os.path.join(self.output_dir, ascii_track_output_name)
-
-               # Make sure that the dataframe is sorted by STORM_ID, INIT_YMD, INIT_HOUR, and LEAD
-               # to ensure that the line plot is connecting the points in the correct order.
-               final_sorted_df = final_df.sort_values(by=['STORM_ID', 'INIT_YMD', 'INIT_HOUR', 'LEAD'], ignore_index=True)
-               final_df.reset_index(drop=True,inplace=True)
-               final_sorted_df.to_csv(final_df_filename)
-        else:
+        if not path_isdir(self.input_data):
             # The user's specified directory isn't valid, log the error and exit.
             self.logger.error("CYCLONE_PLOTTER_INPUT_DIR isn't a valid directory, check config file.")
             return None
 
+        # Store the data in the track list.
+        self.logger.debug("Get data from all files in the directory " +
+                          self.input_data)
+        # Get the list of all files (full file path) in this directory
+        all_input_files = get_files(self.input_data, ".*.tcst")
+
+        # read each file into pandas then concatenate them together
+        combined = self.read_track_files(all_input_files)
+
+        # check for empty dataframe, set error message and exit
+        if combined is None or combined.empty:
+            self.logger.error("No data found in specified files. Please check your config file settings.")
+            return None
+
+        # if there are any NaN values in the ALAT, ALON, STORM_ID, LEAD, INIT, AMODEL, or VALID column,
+        # drop that row of data (axis=0).  We need all these columns to contain valid data in order
+        # to create a meaningful plot.
+        combined_df = combined.dropna(axis=0, how='any',
+                                      subset=self.columns_of_interest)
+
+        # Retrieve and create the columns of interest
+        self.logger.debug(f"Number of rows of data: {combined_df.shape[0]}")
+        combined_subset = combined_df[self.columns_of_interest]
+        df = combined_subset.copy(deep=True)
+        df.allows_duplicate_labels = False
+        # INIT, LEAD, VALID correspond to the column headers from the MET
+        # TC tool output.  INIT_YMD, INIT_HOUR, VALID_DD, and VALID_HOUR are
+        # new columns (for a new dataframe) created from these MET columns.
+        df['INIT'] = df['INIT'].astype(str)
+        df['INIT_YMD'] = (df['INIT'].str[:8]).astype(int)
+        df['INIT_HOUR'] = (df['INIT'].str[9:11]).astype(int)
+        df['LEAD']  = df['LEAD']/10000
+        df['LEAD'] = df['LEAD'].astype(int)
+        df['VALID_DD'] = (df['VALID'].str[6:8]).astype(int)
+        df['VALID_HOUR'] = (df['VALID'].str[9:11]).astype(int)
+        df['VALID'] = df['VALID'].astype(int)
+
+        # Subset the dataframe to include only the data relevant to the user's criteria as
+        # specified in the configuration file.
+        init_date = int(self.init_date)
+        init_hh = int(self.init_hr)
+        model_name = self.model
+
+        if model_name:
+            self.logger.debug("Subsetting based on " + str(init_date) + " " + str(init_hh) +
+                              ", and model:" + model_name )
+            mask = df[(df['AMODEL'] == model_name) & (df['INIT_YMD'] >= init_date) &
+                      (df['INIT_HOUR'] >= init_hh)]
+        else:
+            # no model specified, just subset on init date and init hour
+            mask = df[(df['INIT_YMD'] >= init_date) &
+                      (df['INIT_HOUR'] >= init_hh)]
+            self.logger.debug("Subsetting based on " + str(init_date) + ", and "+ str(init_hh))
+
+        # reset the index so things are ordered properly in the new dataframe
+        user_criteria_df = mask.reset_index()
+
+        # The storm ids in the order they first appear in the data
+        self.unique_storm_ids = list(pd.unique(user_criteria_df['STORM_ID']))
+        nunique = len(self.unique_storm_ids)
+        self.logger.debug(f" {nunique} unique storm ids identified")
+
+        # create a new dataframe to contain the sanitized lons (i.e. the original ALONs that have
+        # been cleaned up when crossing the International Date Line). The rows of each storm
+        # track are sanitized together in the order they appear in the data.
+        sanitized_df = user_criteria_df.copy(deep=True)
+        storm_ids = sanitized_df['STORM_ID']
+        sanitized_df['SLON'] = unwrap_longitudes(sanitized_df['ALON'],
+                                                 storm_ids)
+
+        # Set some useful values used for plotting.
+        # Set the IS_FIRST value to True if this is the first
+        # point in the storm track, False otherwise
+        sanitized_df['IS_FIRST'] = ~storm_ids.duplicated()
+
+        # Set the lead group to the character '0' if the valid hour is 0 or 12,
+        # or to the charcter '6' if the valid hour is 6 or 18. Set the marker
+        # to correspond to the valid hour: 'o' (open circle) for 0 or 12 valid hour,
+        # or '+' (small plus/cross) for 6 or 18.
+        lead_groups = [sanitized_df['VALID_HOUR'].isin((0, 12)),
+                       sanitized_df['VALID_HOUR'].isin((6, 18))]
+        sanitized_df['LEAD_GROUP'] = np.select(lead_groups, ['0', '6'],
+                                               default=None)
+        sanitized_df['MARKER'] = np.select(lead_groups,
+                                           [self.circle_marker,
+                                            self.cross_marker],
+                                           default=None)
+
+        # If the user has specified a region of interest rather than the
+        # global extent, subset the data even further to points that are within a bounding box.
+        if not self.is_global_extent:
+            self.logger.debug(f"Subset the data based on the region of interest.")
+            subset_by_region_df = self.subset_by_region(sanitized_df)
+            final_df = subset_by_region_df.copy(deep=True)
+        else:
+            final_df = sanitized_df.copy(deep=True)
+
+        # Make sure that the dataframe is sorted by STORM_ID, INIT_YMD, INIT_HOUR, and LEAD
+        # to ensure that the line plot is connecting the points in the correct order.
+        final_sorted_df = final_df.sort_values(by=['STORM_ID', 'INIT_YMD', 'INIT_HOUR', 'LEAD'], ignore_index=True)
+
+        # Write output ASCII file (csv) summarizing the information extracted from the input
+        # which is used to generate the plot.
+        if self.gen_ascii:
+           self.logger.debug(f" output dir: {self.output_dir}")
+           mkdir_p(self.output_dir)
+           ascii_track_parts = [self.init_date, '.csv']
+           ascii_track_output_name = ''.join(ascii_track_parts)
+           final_df_filename = os.path.join(self.output_dir, ascii_track_output_name)
+           final_sorted_df.to_csv(final_df_filename)
+
         return final_sorted_df
 
+    def read_track_files(self, input_files):
+        """! Read the columns of interest from track files into a single
+             dataframe. Files are read at the same time in separate threads
+             if METPLUS_MAX_PARALLEL_COMMANDS is greater than 1. Parsed
+             files are saved in CYCLONE_PLOTTER_CACHE_DIR if it is set.
+
+             @param input_files list of paths to .tcst files
+             @returns pandas dataframe containing the data from all files in
+              the order they were provided, or None if no files were provided
+        """
+        if not input_files:
+            return None
+
+        def read_file(path):
+            return read_tcst_file(path, self.columns_of_interest,
+                                  self.cache_dir)
+
+        max_threads = min(self.c_dict.get('MAX_PARALLEL_COMMANDS', 1),
+                          len(input_files))
+        if max_threads > 1:
+            with ThreadPoolExecutor(max_workers=max_threads,
+                                    thread_name_prefix='metplus_tcst') as executor:
+                df_list = list(executor.map(read_file, input_files))
+        else:
+            df_list = [read_file(path) for path in input_files]
+
+        return pd.concat(df_list, ignore_index=True)
+
 
     def create_plot(self):
         """
@@ -528,29 +513,18 @@ class CyclonePlotterWrapper(CommandBuilder):
         # Create a named tuple to store the point information
         PlotPt = namedtuple("PlotPt", "storm_id lon lat is_first marker valid_dd valid_hour annotation")
 
-        points_list = []
-        storm_id = self.sanitized_df['STORM_ID']
-        lons = self.sanitized_df['SLON']
-        lats = self.sanitized_df['ALAT']
-        is_first_list = self.sanitized_df['IS_FIRST']
-        marker_list = self.sanitized_df['MARKER']
-        valid_dd_list = self.sanitized_df['VALID_DD']
-        valid_hour_list = self.sanitized_df['VALID_HOUR']
-        annotation_list = []
+        df = self.sanitized_df
+        storm_id = df['STORM_ID']
 
-        for idx, cur_lon in enumerate(lons):
-            if is_first_list[idx] is True:
-                annotation = str(valid_dd_list[idx]).zfill(2) + '/' + \
-                             str(valid_hour_list[idx]).zfill(2) + 'z'
-            else:
-                annotation = None
+        # annotate the first point of each track with the valid day and hour
+        annotations = (df['VALID_DD'].astype(str).str.zfill(2) + '/' +
+                       df['VALID_HOUR'].astype(str).str.zfill(2) + 'z')
+        annotations = annotations.where(df['IS_FIRST'].astype(bool), None)
 
-            annotation_list.append(annotation)
-            cur_pt = PlotPt(storm_id, lons[idx], lats[idx], is_first_list[idx], marker_list[idx],
-                            valid_dd_list[idx], valid_hour_list[idx], annotation)
-            points_list.append(cur_pt)
-
-        return points_list
+        return [PlotPt(storm_id, *values)
+                for values in zip(df['SLON'], df['ALAT'], df['IS_FIRST'],
+                                  df['MARKER'], df['VALID_DD'],
+                                  df['VALID_HOUR'], annotations)]
 
 
     def get_points_by_track(self):
@@ -565,23 +539,11 @@ class CyclonePlotterWrapper(CommandBuilder):
                                 Returns a dictionary where the key is the storm_id
                                 and values are the points (lon,lat) stored in a named tuple
         """
-        track_dict = {}
         LonLat = namedtuple("LonLat", "lon lat")
-        for cur_unique in self.unique_storm_ids:
-            # retrieve the ALAT and ALON values that correspond to the rows for a unique storm id.
-            # i.e. Get the index value(s) corresponding to this unique storm id
-            idx_list = self.sanitized_df.index[self.sanitized_df['STORM_ID'] == cur_unique].tolist()
-            sanitized_lons_and_lats = []
-            indices = []
-            for idx in idx_list:
-                cur_lonlat = LonLat(self.sanitized_df.loc[idx, 'SLON'], self.sanitized_df.loc[idx, 'ALAT'])
-                sanitized_lons_and_lats.append(cur_lonlat)
-                indices.append(idx)
-
-            # update the track dictionary
-            track_dict[cur_unique] = sanitized_lons_and_lats
-
-        return track_dict
+        groups = self.sanitized_df.groupby('STORM_ID', sort=False)
+        return {storm_id: [LonLat(*lonlat)
+                           for lonlat in zip(track['SLON'], track['ALAT'])]
+                for storm_id, track in groups}
 
 
     def subset_by_region(self, sanitized_df):
@@ -599,19 +561,17 @@ class CyclonePlotterWrapper(CommandBuilder):
         # Copy the sanitized_df dataframe
         sanitized_by_region_df = sanitized_df.copy(deep=True)
 
-        # Iterate over ALL the rows and if any point is within the polygon,
-        # save it's index so we can create a new dataframe with just the
-        # relevant data.
-        for index, row in sanitized_by_region_df.iterrows():
-            if (self.west_lon <= row['ALON'] <= self.east_lon) and (self.south_lat <= row['ALAT'] <= self.north_lat):
-                sanitized_by_region_df.loc[index,'INSIDE'] = True
-            else:
-                sanitized_by_region_df.loc[index,'INSIDE'] = False
+        # Flag the points that are within the polygon so we can create a
+        # new dataframe with just the relevant data.
+        sanitized_by_region_df['INSIDE'] = (
+            sanitized_by_region_df['ALON'].between(self.west_lon, self.east_lon) &
+            sanitized_by_region_df['ALAT'].between(self.south_lat, self.north_lat)
+        )
 
         # Now filter the input dataframe based on the whether points are inside
         # the specified boundaries.
-        masked = sanitized_by_region_df[sanitized_by_region_df['INSIDE'] == True]
-        masked.reset_index(drop=True,inplace=True)
+        masked = sanitized_by_region_df[sanitized_by_region_df['INSIDE']]
+        masked = masked.reset_index(drop=True)
 
         if len(masked) == 0:
             sys.exit("No data in region specified, please check your lon and lat values in the config file.")
@@ -622,7 +582,8 @@ class CyclonePlotterWrapper(CommandBuilder):
     @staticmethod
     def sanitize_lonlist(lon_list):
         """
-        Solution from Stack Overflow for "sanitizing" longitudes that cross the International Date Line
+        "Sanitize" longitudes that cross the International Date Line so that
+        adjacent points in a storm track are never more than 180 degrees apart
         https://stackoverflow.com/questions/67730660/plotting-line-across-international-dateline-with-cartopy
 
         Args:
@@ -632,16 +593,84 @@ class CyclonePlotterWrapper(CommandBuilder):
             new_list: a list of "sanitized" lons that are "corrected" for crossing the
             International Date Line
         """
+        return list(unwrap_longitudes(lon_list))
+
+
+def unwrap_longitudes(lons, tracks=None):
+    """! Shift longitudes by multiples of 360 degrees so that adjacent points
+         in a track are never more than 180 degrees apart, e.g. a track that
+         crosses the International Date Line from 179 to -179 becomes 179 to
+         181.
 
-        new_list = []
-        oldval = 0
-        # used to compare adjacent longitudes in a storm track
-        treshold = 10
-        for ix, ea in enumerate(lon_list):
-            diff = oldval - ea
-            if ix > 0 and diff > treshold:
-                ea = ea + 360
-            oldval = ea
-            new_list.append(ea)
-
-        return new_list
+         @param lons sequence of longitudes in degrees
+         @param tracks (optional) sequence with the track id of each point.
+          Each track is unwrapped separately using the points in the order
+          they appear. If not set, all points are treated as one track
+         @returns numpy array of unwrapped longitudes
+    """
+    lons = np.asarray(lons, dtype=float)
+    if lons.size == 0:
+        return lons
+
+    if tracks is None:
+        steps = np.diff(lons, prepend=lons[0])
+        return lons - 360.0 * np.cumsum(np.round(steps / 360.0))
+
+    # difference from the previous point of the same track, 0 for the first
+    tracks = np.asarray(tracks)
+    steps = pd.Series(lons).groupby(tracks).diff().fillna(0.0)
+    shifts = np.round(steps / 360.0).groupby(tracks).cumsum()
+    return lons - 360.0 * shifts.to_numpy()
+
+
+def read_tcst_file(path, columns, cache_dir=None):
+    """! Read columns from a .tcst file generated by MET TC-Pairs. If a cache
+         directory is set, the parsed data is saved there and reused as long
+         as the modification time and size of the file have not changed.
+
+         @param path path to .tcst file
+         @param columns list of column names to read
+         @param cache_dir (optional) directory to store parsed data
+         @returns pandas dataframe containing the columns that are in the file
+    """
+    if not cache_dir:
+        return _read_tcst_columns(path, columns)
+
+    stat = os.stat(path)
+    key = f"{os.path.realpath(path)}|{','.join(columns)}"
+    prefix = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir,
+                              f'{prefix}_{stat.st_mtime_ns}_{stat.st_size}.pkl')
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_pickle(cache_path)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            pass
+
+    df = _read_tcst_columns(path, columns)
+
+    # remove data cached from older versions of the file
+    mkdir_p(cache_dir)
+    for old_path in glob.glob(os.path.join(cache_dir, f'{prefix}_*.pkl')):
+        if old_path != cache_path:
+            os.remove(old_path)
+
+    tmp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    df.to_pickle(tmp_path, compression=None)
+    os.replace(tmp_path, cache_path)
+    return df
+
+
+def _read_tcst_columns(path, columns):
+    """! Read columns from a whitespace delimited .tcst file.
+
+         @param path path to .tcst file
+         @param columns list of column names to read
+         @returns pandas dataframe containing the columns that are in the
+          file, or an empty dataframe if the file is empty
+    """
+    try:
+        return pd.read_csv(path, sep=r'\s+',
+                           usecols=lambda name: name in columns)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(columns=columns)
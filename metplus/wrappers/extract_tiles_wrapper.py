@@ -16,9 +16,51 @@ import re
 from ..util import do_string_sub, ti_calculate, skip_time
 from ..util import get_lead_sequence, sub_var_list
 from ..util import parse_var_list, round_0p5, get_storms, prune_empty
+from ..util import path_exists
 from .regrid_data_plane_wrapper import RegridDataPlaneWrapper
 from . import CommandBuilder
 
+
+class TileRegridDataPlaneWrapper(RegridDataPlaneWrapper):
+    """! RegridDataPlane wrapper used by ExtractTiles to create tiles.
+         Tiles can be created concurrently. If a tile is requested with the
+         same input file, grid, and fields as a tile that was already
+         requested, the existing tile is copied instead of reading the input
+         file again.
+    """
+    ALLOW_CONCURRENT_COMMANDS = True
+
+    def __init__(self, config, instance=None):
+        # output path of each tile, keyed by the command without the output
+        self.tile_outputs = {}
+        super().__init__(config, instance=instance)
+
+    def run_command(self, cmd, cmd_name=None):
+        if not self.outfile:
+            return super().run_command(cmd, cmd_name=cmd_name)
+
+        output_path = self.get_output_path()
+        env_items = tuple((key, self.env.get(key))
+                          for key in sorted(self.env_list))
+        key = (cmd.replace(output_path, '{OUTPUT}'), env_items)
+
+        existing_path = self.tile_outputs.get(key)
+        if existing_path is None:
+            self.tile_outputs[key] = output_path
+            return super().run_command(cmd, cmd_name=cmd_name)
+
+        if existing_path == output_path:
+            self.logger.debug(f"Tile was already requested: {output_path}")
+            return True
+
+        # copy identical tile. The copy waits for the tile to be created
+        # if it is being created in the background
+        self.logger.debug(f"Copying identical tile {existing_path} to "
+                          f"{output_path}")
+        return super().run_command(f"cp {existing_path} {output_path}",
+                                   cmd_name=cmd_name)
+
+
 class ExtractTilesWrapper(CommandBuilder):
     """! Takes tc-pairs data and regrids paired data to an n x m grid as
          specified in the config file.
@@ -54,6 +96,7 @@ class ExtractTilesWrapper(CommandBuilder):
         self.app_name = 'extract_tiles'
         super().__init__(config, instance=instance)
         self.regrid_data_plane = self.regrid_data_plane_init()
+        self.tile_requests = []
 
     def create_c_dict(self):
         """!Create dictionary from config items to be used in the wrapper
@@ -153,6 +196,11 @@ class ExtractTilesWrapper(CommandBuilder):
 
         c_dict['VAR_LIST_TEMP'] = parse_var_list(self.config,
                                                  met_tool=self.app_name)
+
+        # number of regrid_data_plane commands to run in a single process
+        c_dict['BATCH_SIZE'] = (
+            self.config.getint('config', 'EXTRACT_TILES_BATCH_SIZE', 1)
+        )
         return c_dict
 
     def regrid_data_plane_init(self):
@@ -193,9 +241,10 @@ class ExtractTilesWrapper(CommandBuilder):
         for key, value in overrides.items():
             self.config.set(instance, key, value)
 
-        rdp_wrapper = RegridDataPlaneWrapper(self.config,
-                                             instance=instance)
+        rdp_wrapper = TileRegridDataPlaneWrapper(self.config,
+                                                 instance=instance)
         rdp_wrapper.c_dict['SHOW_WARNINGS'] = False
+        rdp_wrapper.c_dict['BATCH_SIZE'] = self.c_dict['BATCH_SIZE']
         return rdp_wrapper
 
     def run_at_time(self, input_dict):
@@ -262,10 +311,13 @@ class ExtractTilesWrapper(CommandBuilder):
         idx_dict = self.get_header_indices(storm_dict['header'],
                                            location_input)
 
+        # get tiles to create for all storms, then create them
+        self.tile_requests = []
         if location_input == 'MTD':
             self.use_mtd_input(storm_dict, idx_dict)
         else:
             self.use_tc_stat_input(storm_dict, idx_dict)
+        self.create_tiles()
 
         prune_empty(self.c_dict['OUTPUT_DIR'], self.logger)
 
@@ -291,7 +343,7 @@ class ExtractTilesWrapper(CommandBuilder):
 
                 time_info = self.set_time_info_from_track_data(storm_data,
                                                                storm_id)
-                self.call_regrid_data_plane(time_info, track_data, 'TC_STAT')
+                self.tile_requests.append((time_info, track_data, 'TC_STAT'))
 
     def use_mtd_input(self, object_dict, idx_dict):
         """! Find lat/lons in MTD input file and create tiles from locations.
@@ -332,7 +384,7 @@ class ExtractTilesWrapper(CommandBuilder):
                 time_info = (
                     self.set_time_info_from_track_data(track_data['FCST'])
                 )
-                self.call_regrid_data_plane(time_info, track_data, 'MTD')
+                self.tile_requests.append((time_info, dict(track_data), 'MTD'))
 
     def get_cluster_data(self, lines, idx_dict):
         cluster_data = []
@@ -359,7 +411,7 @@ class ExtractTilesWrapper(CommandBuilder):
                                    **time_info)
 
         self.logger.debug(f"Looking for {input_type} file: {input_path}")
-        if not os.path.exists(input_path):
+        if not path_exists(input_path):
             self.log_error(f"Could not find {input_type} file: {input_path}")
             return None
 
@@ -381,6 +433,35 @@ class ExtractTilesWrapper(CommandBuilder):
 
         return indices
 
+    def create_tiles(self):
+        """! Run RegridDataPlane to create each tile that was requested. If
+        EXTRACT_TILES_BATCH_SIZE is greater than 1, tiles are sorted by valid
+        time so tiles that read the same input file are run together in a
+        single process. Waits for any tiles created in the background to
+        finish.
+        """
+        rdp = self.regrid_data_plane
+        rdp.tile_outputs.clear()
+
+        tile_requests = self.tile_requests
+        self.tile_requests = []
+        if (self.c_dict['BATCH_SIZE'] > 1 and
+                not self.c_dict.get('DO_NOT_RUN_EXE', False)):
+            tile_requests = sorted(tile_requests,
+                                   key=lambda item: item[0]['valid'])
+            rdp.cmd_batch = []
+
+        for time_info, track_data, input_type in tile_requests:
+            self.call_regrid_data_plane(time_info, track_data, input_type)
+
+        # run any commands remaining in the batch
+        rdp.run_cmd_batch()
+        rdp.cmd_batch = None
+        self.all_commands.extend(rdp.all_commands)
+        rdp.all_commands.clear()
+
+        rdp.wait_for_commands()
+
     def call_regrid_data_plane(self, time_info, track_data, input_type):
         # set var list from config using time info
         var_list = sub_var_list(self.c_dict['VAR_LIST_TEMP'], time_info)
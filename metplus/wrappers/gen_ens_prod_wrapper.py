@@ -13,6 +13,9 @@ from . import LoopTimesWrapper
 class GenEnsProdWrapper(LoopTimesWrapper):
     """! Wrapper for gen_ens_prod MET application """
 
+    ALLOW_CONCURRENT_COMMANDS = True
+    ALLOW_BATCH_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_MODEL',
         'METPLUS_DESC',
@@ -17,11 +17,16 @@ from dateutil.relativedelta import relativedelta
 
 from ..util import do_string_sub, ti_calculate, get_lead_sequence
 from ..util import remove_quotes, parse_template
+from ..util import path_exists
 from . import CommandBuilder
 
 class GFDLTrackerWrapper(CommandBuilder):
     """!Configures and runs GFDL Tracker"""
 
+    # GRIB index commands and, if each init time runs in its own scratch
+    # directory, tracker commands can run in the background
+    ALLOW_CONCURRENT_COMMANDS = True
+
     CONFIG_NAMES = {
         "DATEIN_INP_MODEL": "int",
         "DATEIN_INP_MODTYP": "string",
@@ -120,6 +125,8 @@ class GFDLTrackerWrapper(CommandBuilder):
     def __init__(self, config, instance=None):
         self.app_name = 'gfdl_tracker'
         super().__init__(config, instance=instance)
+        # directory where the tracker runs for the current init time
+        self.work_dir = self.c_dict.get('OUTPUT_DIR')
 
     def create_c_dict(self):
         c_dict = super().create_c_dict()
@@ -147,14 +154,14 @@ class GFDLTrackerWrapper(CommandBuilder):
         c_dict['INDEX_APP'] = os.path.join(gfdl_tracker_exec,
                                            index_script_name)
 
-        if not os.path.exists(c_dict['INDEX_APP']):
+        if not path_exists(c_dict['INDEX_APP']):
             self.log_error("GRIB index exe does not exist: "
                            f"{c_dict['INDEX_APP']}")
 
         c_dict['TRACKER_APP'] = os.path.join(gfdl_tracker_exec,
                                              'gettrk.exe')
 
-        if not os.path.exists(c_dict['TRACKER_APP']):
+        if not path_exists(c_dict['TRACKER_APP']):
             self.log_error("GFDL tracker exe does not exist: "
                            f"{c_dict['TRACKER_APP']}")
 
@@ -176,7 +183,7 @@ class GFDLTrackerWrapper(CommandBuilder):
         )
         if not c_dict['NML_TEMPLATE_FILE']:
             self.log_error('Must set GFDL_TRACKER_NML_TEMPLATE_FILE')
-        elif not os.path.exists(c_dict['NML_TEMPLATE_FILE']):
+        elif not path_exists(c_dict['NML_TEMPLATE_FILE']):
             self.log_error("GFDL_TRACKER_NML_TEMPLATE_FILE does not "
                            f"exist: {c_dict['NML_TEMPLATE_FILE']}")
 
@@ -208,6 +215,11 @@ class GFDLTrackerWrapper(CommandBuilder):
                                 False)
         )
 
+        # run each init time in its own directory so they can run at once
+        c_dict['SCRATCH_DIRS'] = (
+            self.config.getbool('config', 'GFDL_TRACKER_SCRATCH_DIRS', False)
+        )
+
         # allow multiple input files
         c_dict['ALLOW_MULTIPLE_FILES'] = True
 
@@ -279,6 +291,10 @@ class GFDLTrackerWrapper(CommandBuilder):
         if not self.find_and_check_output_file(input_dict):
             return False
 
+        # set directory to run the tracker and write intermediate files
+        self.work_dir = self.get_work_dir(input_dict)
+        os.makedirs(self.work_dir, exist_ok=True)
+
         # create sym link to output directory for all files (including tcvit)
         all_output_files, tc_vitals_out = (
             self.link_files_to_output_dir(all_input_files, tc_vitals_file)
@@ -292,6 +308,11 @@ class GFDLTrackerWrapper(CommandBuilder):
         if not self.run_grib_index(all_output_files):
             return False
 
+        # wait for index files unless the tracker runs in the background
+        # after the index commands that it depends on
+        if not self.c_dict['SCRATCH_DIRS'] and not self.wait_for_commands():
+            return False
+
         # create empty fort.14 file
         self.create_fort_14_file(tc_vitals_out)
 
@@ -309,10 +330,18 @@ class GFDLTrackerWrapper(CommandBuilder):
         if not input_nml_path:
             return False
 
+        # run tracker, copy output, and remove scratch directory in one
+        # command that can run in the background
+        if self.c_dict['SCRATCH_DIRS']:
+            return self.run_tracker_in_scratch_dir(input_nml_path, input_dict)
+
         # run tracker application from output directory passing in input.nml
         if not self.run_tracker(input_nml_path):
             return False
 
+        if not self.wait_for_commands():
+            return False
+
         # rename fort.64 output file to output filename template
         if not self.rename_fort_to_output_path(input_dict):
             return False
@@ -339,12 +368,11 @@ class GFDLTrackerWrapper(CommandBuilder):
         filedir = self.c_dict['GEN_VITALS_INPUT_DIR']
         src_path = os.path.join(filedir, template)
         src_path = do_string_sub(src_path, **input_dict)
-        if not os.path.exists(src_path):
+        if not path_exists(src_path):
             self.log_error(f"Gen vitals file does not exist: {src_path}")
             return False
 
-        dest_path = os.path.join(self.c_dict['OUTPUT_DIR'],
-                                 'tcvit_genesis_storms.txt')
+        dest_path = os.path.join(self.work_dir, 'tcvit_genesis_storms.txt')
         try:
             shutil.copyfile(src_path, dest_path)
         except (OSError, shutil.SameFileError):
@@ -355,8 +383,7 @@ class GFDLTrackerWrapper(CommandBuilder):
 
         # check if fort.67 already exists in output directory
         # do not copy file if it does
-        dest_path = os.path.join(self.c_dict['OUTPUT_DIR'],
-                                 'fort.67')
+        dest_path = os.path.join(self.work_dir, 'fort.67')
         if os.path.exists(dest_path):
             self.logger.debug(f"Gen vitals file already exists: {dest_path}. "
                               f"Skip copying of {src_path}")
@@ -385,8 +412,7 @@ class GFDLTrackerWrapper(CommandBuilder):
         self._remove_symlink(tc_vitals_out)
 
         # remove all fort files
-        all_forts = glob.glob(os.path.join(self.c_dict.get('OUTPUT_DIR'),
-                                           f'fort.*'))
+        all_forts = glob.glob(os.path.join(self.work_dir, 'fort.*'))
         for fort_file in all_forts:
             # remove symlink if link, otherwise remove file
             if not self._remove_symlink(fort_file):
@@ -454,13 +480,13 @@ class GFDLTrackerWrapper(CommandBuilder):
         # create symbolic links for input files
         for input_file_dict in all_input_files:
             src_path = input_file_dict.get('filepath')
-            dest_path = os.path.join(self.c_dict.get('OUTPUT_DIR'),
+            dest_path = os.path.join(self.work_dir,
                                      input_file_dict.get('rename'))
             self._create_symlink(src_path, dest_path)
             all_output_files.append(dest_path)
 
         # create symbolic links for TCVitals file
-        tc_vitals_dest = os.path.join(self.c_dict.get('OUTPUT_DIR'),
+        tc_vitals_dest = os.path.join(self.work_dir,
                                       os.path.basename(tc_vitals_src))
         self._create_symlink(tc_vitals_src, tc_vitals_dest)
 
@@ -481,19 +507,58 @@ class GFDLTrackerWrapper(CommandBuilder):
         return False
 
     def run_grib_index(self, all_output_files):
+        """!Create a GRIB index file for each input file. Index files that
+        are newer than the input file are reused. Commands run in the
+        background if more than one command can run at once.
+
+        @param all_output_files list of input files linked in the work dir
+        @returns True if all commands succeeded or were submitted
+        """
         index_script = self.c_dict.get('INDEX_APP')
         cmd_name = os.path.basename(index_script)
         for output_file in all_output_files:
             index_file = f'{output_file}.ix'
+            if self._reuse_index_file(output_file, index_file):
+                continue
+
             command = f'{index_script} {output_file} {index_file}'
+            self.set_output_path(index_file)
             if not self.run_command(command, cmd_name=cmd_name):
                 return False
 
         return True
 
+    def _reuse_index_file(self, output_file, index_file):
+        """!Check for an index file that is newer than the GRIB file, either
+        in the work dir from a previous run or next to the original input
+        file, and link it to the index file path if it is not already there.
+
+        @param output_file link in the work dir to the GRIB input file
+        @param index_file path of the index file that the tracker reads
+        @returns True if an index file was found, False otherwise
+        """
+        src_path = os.path.realpath(output_file)
+        try:
+            src_mtime = os.path.getmtime(src_path)
+        except OSError:
+            return False
+
+        for existing in (index_file, f'{src_path}.ix'):
+            try:
+                if os.path.getmtime(existing) < src_mtime:
+                    continue
+            except OSError:
+                continue
+
+            if existing != index_file:
+                self._create_symlink(existing, index_file)
+            self.logger.debug(f"Using existing index file: {existing}")
+            return True
+
+        return False
+
     def create_fort_14_file(self, tc_vitals_out):
-        output_dir = self.c_dict.get('OUTPUT_DIR')
-        fort_14_path = os.path.join(output_dir, 'fort.14')
+        fort_14_path = os.path.join(self.work_dir, 'fort.14')
 
         if os.path.exists(fort_14_path):
             self.logger.debug("Removing existing fort.14 file")
@@ -517,14 +582,13 @@ class GFDLTrackerWrapper(CommandBuilder):
         # format must match index (starting with 1) taking up 4 characters
         # then forecast lead minutes taking up 5 characters - pad with spaces
         file_lines = []
-        output_dir = self.c_dict.get('OUTPUT_DIR')
 
         for index, lead_minutes in enumerate(all_lead_minutes, start=1):
             file_lines.append(f"{str(index).rjust(4)} {str(lead_minutes).rjust(5)}")
 
         write_content = '\n'.join(file_lines)
 
-        fort_15_path = os.path.join(output_dir, 'fort.15')
+        fort_15_path = os.path.join(self.work_dir, 'fort.15')
         self.logger.debug(f"Writing fort.15 file: {fort_15_path}")
         with open(fort_15_path, 'w') as file_handle:
             file_handle.write(write_content)
@@ -537,7 +601,7 @@ class GFDLTrackerWrapper(CommandBuilder):
         # set up dictionary of text to substitute in XML file
         sub_dict = self.populate_sub_dict(input_dict)
 
-        output_path = os.path.join(self.c_dict.get('OUTPUT_DIR'),
+        output_path = os.path.join(self.work_dir,
                                    'input.{init?fmt=%Y%m%d%H%M}.nml')
         output_path = do_string_sub(output_path, **input_dict)
 
@@ -553,7 +617,7 @@ class GFDLTrackerWrapper(CommandBuilder):
             return output_path
 
         sgv_template_file = self.c_dict['SGV_TEMPLATE_FILE']
-        sgv_output_path = os.path.join(self.c_dict.get('OUTPUT_DIR'),
+        sgv_output_path = os.path.join(self.work_dir,
                                        'sgv.{init?fmt=%Y%m%d%H%M}.txt')
         sgv_output_path = do_string_sub(sgv_output_path, **input_dict)
         self.sub_template(sgv_template_file, sgv_output_path, sub_dict)
@@ -629,8 +693,7 @@ class GFDLTrackerWrapper(CommandBuilder):
         return sub_dict
 
     def run_tracker(self, input_nml_path):
-        output_dir = self.c_dict.get('OUTPUT_DIR')
-        command = (f"cd {output_dir}; "
+        command = (f"cd {self.work_dir}; "
                    f"{self.c_dict['TRACKER_APP']} "
                    f"< {os.path.basename(input_nml_path)}; "
                    f"ret=$?; "
@@ -638,24 +701,67 @@ class GFDLTrackerWrapper(CommandBuilder):
                    f"if [ $ret != 0 ]; then false; fi")
         return self.run_command(command)
 
-    def rename_fort_to_output_path(self, time_info):
+    def run_tracker_in_scratch_dir(self, input_nml_path, time_info):
+        """!Run the tracker in the scratch directory of the current init
+        time, then copy the track file to the output path and remove the
+        scratch directory unless intermediate files should be kept. The
+        command waits for the index commands of the init time because it
+        reads the scratch directory that they write into.
+
+        @param input_nml_path path to namelist file in scratch directory
+        @param time_info dictionary containing time information
+        @returns True if command succeeded or was submitted
+        """
+        fort_path = os.path.join(self.work_dir, self._get_fort_file())
+        output_path = self._get_output_path(time_info)
+        command = (f"cd {self.work_dir} && "
+                   f"{self.c_dict['TRACKER_APP']} "
+                   f"< {os.path.basename(input_nml_path)} && "
+                   f"cp {fort_path} {output_path}")
+        if not self.c_dict.get('KEEP_INTERMEDIATE', False):
+            command += f" && rm -rf {self.work_dir}"
+
+        self.set_output_path(output_path)
+        return self.run_command(command)
+
+    def get_work_dir(self, time_info):
+        """!Get directory to write intermediate files and run the tracker.
+        If GFDL_TRACKER_SCRATCH_DIRS is True, each init time and custom
+        string uses its own directory under OUTPUT_DIR/scratch.
+
+        @param time_info dictionary containing time information
+        @returns path to directory
+        """
         output_dir = self.c_dict.get('OUTPUT_DIR')
+        if not self.c_dict['SCRATCH_DIRS']:
+            return output_dir
 
+        name = time_info['init'].strftime('%Y%m%d%H%M')
+        if time_info.get('custom'):
+            name = f"{name}_{time_info['custom']}"
+        return os.path.join(output_dir, 'scratch', name)
+
+    def _get_fort_file(self):
         run_type = remove_quotes(self.c_dict["REPLACE_CONF_TRACKERINFO_TYPE"])
         if run_type == 'tcgen' or run_type == 'midlat':
-            fort_file = 'fort.66'
-        else:
-            fort_file = 'fort.64'
+            return 'fort.66'
+        return 'fort.64'
+
+    def _get_output_path(self, time_info):
+        output_path = os.path.join(self.c_dict.get('OUTPUT_DIR'),
+                                   self.c_dict.get('OUTPUT_TEMPLATE'))
+        return do_string_sub(output_path, **time_info)
+
+    def rename_fort_to_output_path(self, time_info):
+        fort_file = self._get_fort_file()
 
         # check that fort.64 file was created successfully
-        fort_path = os.path.join(output_dir, fort_file)
+        fort_path = os.path.join(self.work_dir, fort_file)
         if not os.path.exists(fort_path):
             self.log_error(f"Could not find output file: {fort_path}")
             return False
 
-        output_path = os.path.join(output_dir,
-                                   self.c_dict.get('OUTPUT_TEMPLATE'))
-        output_path = do_string_sub(output_path, **time_info)
+        output_path = self._get_output_path(time_info)
 
         # copy fort.64/66 file to new file name
         self.logger.debug(f"Copying {fort_file} file to: {output_path}")
@@ -24,6 +24,9 @@ from ..util import do_string_sub, parse_var_list, sub_var_list
 
 class GridDiagWrapper(RuntimeFreqWrapper):
 
+    ALLOW_CONCURRENT_COMMANDS = True
+    ALLOW_BATCH_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_DESC',
         'METPLUS_REGRID_DICT',
@@ -17,6 +17,9 @@ from . import LoopTimesWrapper
 
 class IODA2NCWrapper(LoopTimesWrapper):
 
+    ALLOW_CONCURRENT_COMMANDS = True
+    ALLOW_BATCH_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_MESSAGE_TYPE',
         'METPLUS_MESSAGE_TYPE_GROUP_MAP',
@@ -11,6 +11,7 @@ Condition codes: 0 for success, 1 for failure
 """
 
 import os
+import json
 from datetime import datetime
 
 from ..util import ti_calculate
@@ -51,6 +52,9 @@ class METDbLoadWrapper(RuntimeFreqWrapper):
                                      'ush',
                                      'met_db_load')
         self.app_name = os.path.basename(self.app_path)
+        # directory info to add to the manifest after a successful load
+        self._manifest_updates = {}
+        self._manifest_key = None
         super().__init__(config, instance=instance)
 
     def create_c_dict(self):
@@ -78,6 +82,20 @@ class METDbLoadWrapper(RuntimeFreqWrapper):
                                 True)
         )
 
+        c_dict['INCREMENTAL'] = (
+            self.config.getbool('config',
+                                'MET_DB_LOAD_INCREMENTAL',
+                                False)
+        )
+        c_dict['MANIFEST_FILE'] = (
+            self.config.getstr('config',
+                               'MET_DB_LOAD_MANIFEST_FILE',
+                               os.path.join(self.config.getdir('OUTPUT_BASE'),
+                                            'met_db_load_manifest.json'))
+        )
+        if c_dict['INCREMENTAL'] and c_dict['XML_TEMPLATE']:
+            self._check_incremental_xml(c_dict['XML_TEMPLATE'])
+
         # read config variables
         for name, input_type in self.CONFIG_NAMES.items():
             if input_type == 'int':
@@ -98,6 +116,29 @@ class METDbLoadWrapper(RuntimeFreqWrapper):
 
         return c_dict
 
+    def _check_incremental_xml(self, xml_template):
+        """! Report an error if the XML file does not load the files set in
+        ${METPLUS_INPUT_FILES} when loading incrementally. Loading the
+        directories instead would load every file in a directory with a new
+        or changed file again, adding duplicate rows to the database.
+
+        @param xml_template path to XML template file
+        """
+        try:
+            with open(xml_template, 'r') as file_handle:
+                if '${METPLUS_INPUT_FILES}' in file_handle.read():
+                    return
+        except OSError as err:
+            self.log_error(f"Could not read {xml_template}: {err}")
+            return
+
+        self.log_error("MET_DB_LOAD_INCREMENTAL is True but "
+                       f"{xml_template} does not use "
+                       "${METPLUS_INPUT_FILES}. Use "
+                       "<load_files>${METPLUS_INPUT_FILES}</load_files> "
+                       "in the XML file to only load the new or changed "
+                       "files instead of every file in their directories.")
+
     def get_command(self):
         """! Builds the command to run the MET application
            @rtype string
@@ -127,6 +168,9 @@ class METDbLoadWrapper(RuntimeFreqWrapper):
         # run command
         if not self.build():
             success = False
+        elif (self.c_dict['INCREMENTAL'] and
+                not self.c_dict.get('DO_NOT_RUN_EXE', False)):
+            self.update_manifest()
 
         # remove tmp file
         if self.c_dict.get('REMOVE_TMP_XML', True):
@@ -144,19 +188,145 @@ class METDbLoadWrapper(RuntimeFreqWrapper):
         @param input_path top level directory to search
         @returns list of unique directories that contain stat files
         """
-        stat_dirs = set()
+        return list(self.get_stat_files(input_paths))
+
+    def get_stat_files(self, input_paths, manifest=None):
+        """! Traverse through files under input path and find all .stat,
+        .tcst, mode*.txt, and mtd*.txt files. If a manifest from a previous
+        load is provided, only the files that are new or changed since then
+        are returned and the directory information to add to the manifest
+        after the files are loaded is stored.
+
+        @param input_paths top level directory or list of directories to
+         search
+        @param manifest (optional) dictionary of directory and dictionary
+         with the newest modification time and number of files that were
+         found in the directory when it was last loaded
+        @returns dictionary of directories that contain stat files to load
+         and list of paths to the files in each directory
+        """
+        stat_files = {}
+        self._manifest_updates = {}
         for input_path in getlist(input_paths):
             self.logger.debug("Finding directories with stat files "
                               f"under {input_path}")
             for root, _, files in os.walk(input_path):
-                if self._has_loadable_file(files):
-                    stat_dirs.add(root)
+                files = sorted(filename for filename in files
+                               if self._is_loadable_file(filename))
+                if not files or root in stat_files:
+                    continue
 
-        stat_dirs = list(stat_dirs)
-        for stat_dir in stat_dirs:
+                if manifest is not None:
+                    files = self._get_new_files(root, files,
+                                                manifest.get(root))
+                    if not files:
+                        continue
+
+                stat_files[root] = [os.path.join(root, filename)
+                                    for filename in files]
+
+        for stat_dir, files in stat_files.items():
             self.logger.info(f"Adding stat file directory: {stat_dir}")
+            if manifest is not None:
+                self.logger.debug(f"Loading {len(files)} new or changed "
+                                  f"files from {stat_dir}")
+
+        return stat_files
+
+    def _get_new_files(self, stat_dir, files, dir_info):
+        """! Get the files in a directory that were added or changed since
+        the directory was last loaded. Files with a modification time that is
+        newer than the newest file from the last load are new or changed. If
+        more files were added than are newer, e.g. files were copied with
+        their modification times, then all files in the directory are loaded.
+
+        @param stat_dir directory containing the files
+        @param files list of names of loadable files in the directory
+        @param dir_info dictionary with newest_mtime and file_count from the
+         last load of the directory or None if it was not loaded before
+        @returns list of names of files to load
+        """
+        mtimes = {}
+        for filename in files:
+            try:
+                mtimes[filename] = os.stat(os.path.join(stat_dir,
+                                                        filename)).st_mtime_ns
+            except OSError:
+                continue
+
+        if not mtimes:
+            return []
+
+        self._manifest_updates[stat_dir] = {
+            'newest_mtime': max(mtimes.values()),
+            'file_count': len(mtimes),
+        }
+        if self._manifest_updates[stat_dir] == dir_info:
+            return []
+
+        if not dir_info:
+            return list(mtimes)
+
+        new_files = [filename for filename, mtime in mtimes.items()
+                     if mtime > dir_info['newest_mtime']]
+        if len(mtimes) - dir_info['file_count'] > len(new_files):
+            self.logger.debug(f"Cannot determine which files in {stat_dir} "
+                              "are new, so loading all files")
+            return list(mtimes)
+
+        return new_files
+
+    def get_manifest_key(self, sub_dict):
+        """! Get the key used to store the directories that were loaded into
+        a database in the manifest file.
+
+        @param sub_dict dictionary of values substituted into the XML file
+        @returns string containing the database host and name
+        """
+        return (f"{sub_dict.get('METPLUS_MV_HOST', '')}/"
+                f"{sub_dict.get('METPLUS_MV_DATABASE', '')}")
+
+    def read_manifest(self):
+        """! Read the file that contains the directories that were loaded
+        into each database by previous runs.
+
+        @returns dictionary of database key and dictionary of directories or
+         empty dictionary if the file does not exist or cannot be read
+        """
+        manifest_file = self.c_dict['MANIFEST_FILE']
+        if not os.path.exists(manifest_file):
+            return {}
+
+        try:
+            with open(manifest_file, 'r') as file_handle:
+                return json.load(file_handle)
+        except (OSError, ValueError) as err:
+            self.logger.warning(f"Could not read {manifest_file}, so all "
+                                f"files will be loaded: {err}")
+            return {}
+
+    def update_manifest(self):
+        """! Add the directories that were loaded to the manifest file so
+        they are skipped by the next run unless their files change.
+        """
+        if not self._manifest_updates:
+            return
+
+        manifest = self.read_manifest()
+        manifest.setdefault(self._manifest_key, {}).update(
+            self._manifest_updates
+        )
 
-        return stat_dirs
+        manifest_file = self.c_dict['MANIFEST_FILE']
+        self.logger.debug(f"Writing load manifest: {manifest_file}")
+        manifest_dir = os.path.dirname(manifest_file)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        tmp_file = f'{manifest_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'w') as file_handle:
+            json.dump(manifest, file_handle, indent=1, sort_keys=True)
+        os.replace(tmp_file, manifest_file)
+        self._manifest_updates = {}
 
     @staticmethod
     def _has_loadable_file(files):
@@ -186,17 +356,25 @@ class METDbLoadWrapper(RuntimeFreqWrapper):
         output_string = '\n      '.join(formatted_stat_dirs)
         return output_string
 
+    @staticmethod
+    def format_stat_files(stat_files):
+        """! Format list of stat files to substitute into XML file.
+        <file></file> tags will be added around each value.
+
+        @param stat_files list of stat files
+        @returns string of formatted values
+        """
+        return '\n    '.join(f'<file>{stat_file}</file>'
+                              for stat_file in stat_files)
+
     def populate_sub_dict(self, time_info):
-        sub_dict = {}
+        """! Get the values to substitute into the XML file.
 
-        # substitute values from time dictionary
-        input_paths = (
-            do_string_sub(self.c_dict['INPUT_TEMPLATE'],
-                          **time_info)
-        )
-        stat_dirs = self.get_stat_directories(input_paths)
-        formatted_stat_dirs = self.format_stat_dirs(stat_dirs)
-        sub_dict['METPLUS_INPUT_PATHS'] = formatted_stat_dirs
+        @param time_info dictionary containing time information
+        @returns dictionary of values to substitute or None if running in
+         incremental mode and there are no new or changed files to load
+        """
+        sub_dict = {}
 
         for name, input_type in self.CONFIG_NAMES.items():
             value = str(self.c_dict.get(f'MV_{name}'))
@@ -208,6 +386,29 @@ class METDbLoadWrapper(RuntimeFreqWrapper):
 
             sub_dict[f'METPLUS_MV_{name}'] = value
 
+        # substitute values from time dictionary
+        input_paths = (
+            do_string_sub(self.c_dict['INPUT_TEMPLATE'],
+                          **time_info)
+        )
+
+        manifest = None
+        if self.c_dict['INCREMENTAL']:
+            self._manifest_key = self.get_manifest_key(sub_dict)
+            manifest = self.read_manifest().get(self._manifest_key, {})
+
+        stat_files = self.get_stat_files(input_paths, manifest)
+        if self.c_dict['INCREMENTAL'] and not stat_files:
+            self.logger.info("No new or changed files to load since the "
+                             "last load")
+            return None
+
+        formatted_stat_dirs = self.format_stat_dirs(stat_files.keys())
+        sub_dict['METPLUS_INPUT_PATHS'] = formatted_stat_dirs
+        all_files = [stat_file for files in stat_files.values()
+                     for stat_file in files]
+        sub_dict['METPLUS_INPUT_FILES'] = self.format_stat_files(all_files)
+
         return sub_dict
 
     def replace_values_in_xml(self, time_info):
@@ -219,6 +420,8 @@ class METDbLoadWrapper(RuntimeFreqWrapper):
 
         # set up dictionary of text to substitute in XML file
         sub_dict = self.populate_sub_dict(time_info)
+        if sub_dict is None:
+            return False
 
         # open XML template file and replace any values encountered
         with open(xml_template, 'r') as file_handle:
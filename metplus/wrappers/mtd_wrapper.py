@@ -16,6 +16,7 @@ from ..util import get_lead_sequence, sub_var_list
 from ..util import ti_calculate
 from ..util import do_string_sub, skip_time
 from ..util import parse_var_list, add_field_info_to_time_info
+from ..util import path_exists
 from . import CompareGriddedWrapper
 
 class MTDWrapper(CompareGriddedWrapper):
@@ -224,7 +225,7 @@ class MTDWrapper(CompareGriddedWrapper):
                 model_list_path = do_string_sub(self.c_dict['FCST_FILE_LIST'],
                                                 **time_info)
                 self.logger.debug(f"Explicit FCST file: {model_list_path}")
-                if not os.path.exists(model_list_path):
+                if not path_exists(model_list_path):
                     self.log_error('FCST file list file does not exist: '
                                    f'{model_list_path}')
                     return None
@@ -232,7 +233,7 @@ class MTDWrapper(CompareGriddedWrapper):
                 obs_list_path = do_string_sub(self.c_dict['OBS_FILE_LIST'],
                                               **time_info)
                 self.logger.debug(f"Explicit OBS file: {obs_list_path}")
-                if not os.path.exists(obs_list_path):
+                if not path_exists(obs_list_path):
                     self.log_error('OBS file list file does not exist: '
                                    f'{obs_list_path}')
                     return None
@@ -320,7 +321,7 @@ class MTDWrapper(CompareGriddedWrapper):
                 **time_info
             )
             self.logger.debug(f"Explicit file list: {single_list_path}")
-            if not os.path.exists(single_list_path):
+            if not path_exists(single_list_path):
                 self.log_error(f'{data_src} file list file does not exist: '
                                f'{single_list_path}')
                 return None
@@ -23,6 +23,8 @@ class PB2NCWrapper(CommandBuilder):
          to NetCDF for MET's point_stat tool can recognize.
     """
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_MESSAGE_TYPE',
         'METPLUS_STATION_ID',
@@ -23,6 +23,8 @@ class PCPCombineWrapper(ReformatGriddedWrapper):
     """! Wraps the MET tool pcp_combine to combine or divide
          precipitation accumulations """
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     # valid values for [FCST/OBS]_PCP_COMBINE_METHOD
     valid_run_methods = ['ADD', 'SUM', 'SUBTRACT', 'DERIVE', 'USER_DEFINED']
 
@@ -30,6 +32,12 @@ class PCPCombineWrapper(ReformatGriddedWrapper):
         self.app_name = 'pcp_combine'
         self.app_path = os.path.join(config.getdir('MET_BIN_DIR', ''),
                                      self.app_name)
+        # results of input file searches keyed by the values that determine
+        # the result. Rolling accumulations search for the same files at
+        # many run times, so each search is only done once per run
+        self._input_search_cache = {}
+        self._input_search_stats = {'searched': 0, 'reused': 0,
+                                    'checks_avoided': 0}
         super().__init__(config, instance=instance)
 
     def create_c_dict(self):
@@ -226,6 +234,100 @@ class PCPCombineWrapper(ReformatGriddedWrapper):
 
         return c_dict
 
+    def run_all_times(self):
+        """! Run for all times and log how many input file searches were
+        reused from earlier run times.
+
+        @returns list of commands that were run
+        """
+        self.clear_input_search_cache()
+        all_commands = super().run_all_times()
+        self.log_input_search_stats()
+        return all_commands
+
+    def clear_input_search_cache(self):
+        """! Remove the results of all input file searches and reset the
+        counts of searches that were done or reused.
+        """
+        self._input_search_cache.clear()
+        for key in self._input_search_stats:
+            self._input_search_stats[key] = 0
+
+    def log_input_search_stats(self):
+        """! Log the number of input file searches that were reused and the
+        number of file checks that were avoided by reusing them.
+        """
+        stats = self._input_search_stats
+        total = stats['searched'] + stats['reused']
+        if not total:
+            return
+
+        self.logger.info(f"Reused {stats['reused']} of {total} input "
+                         "searches, avoiding "
+                         f"{stats['checks_avoided']} file checks")
+
+    def _search_with_cache(self, key, search_function):
+        """! Get the result of a search from the cache or call the search
+        function and store its result to reuse for later searches with the
+        same key. Searches that did not find a file are stored as well.
+
+        @param key hashable tuple of the values that determine the result
+        @param search_function function that takes no arguments and returns
+         a tuple of the result and the number of file checks that were done
+        @returns result of the search
+        """
+        cached = self._input_search_cache.get(key)
+        if cached is not None:
+            result, num_checks = cached
+            self._input_search_stats['reused'] += 1
+            self._input_search_stats['checks_avoided'] += num_checks
+            return result
+
+        result, num_checks = search_function()
+        self._input_search_cache[key] = (result, num_checks)
+        self._input_search_stats['searched'] += 1
+        return result
+
+    def _find_file_with_cache(self, key, search_function, data_src):
+        """! Get the path to an input file and its forecast lead from the
+        cache or by calling the search function. The path that was found is
+        cached before it is passed to preprocess_file, which is called again
+        each time the result is reused so files that must be uncompressed are
+        staged again if they were removed from the staging directory. Searches
+        that did not find a file are not cached while commands are running in
+        the background because they may write the file.
+
+        @param key hashable tuple of the values that determine the result
+        @param search_function function that takes no arguments and returns
+         a tuple of the result and the number of file checks that were done.
+         The result is a tuple of the path that was found (None if not
+         found), the forecast lead in seconds, and the path returned by
+         preprocess_file
+        @param data_src data type (FCST or OBS)
+        @returns tuple of the path returned by preprocess_file (None if not
+         found) and the forecast lead in seconds
+        """
+        cached = self._input_search_cache.get(key)
+        if cached is not None:
+            (path, lead), num_checks = cached
+            input_path = None
+            if path is not None:
+                input_path = preprocess_file(
+                    path, self.c_dict[f'{data_src}_INPUT_DATATYPE'],
+                    self.config
+                )
+            # search again if the file was removed after it was found
+            if path is None or input_path is not None:
+                self._input_search_stats['reused'] += 1
+                self._input_search_stats['checks_avoided'] += num_checks
+                return input_path, lead
+
+        (path, lead, input_path), num_checks = search_function()
+        if path is not None or not self.cmdrunner.has_pending_cmds():
+            self._input_search_cache[key] = ((path, lead), num_checks)
+        self._input_search_stats['searched'] += 1
+        return input_path, lead
+
     def run_at_time_once(self, time_info, var_list, data_src):
 
         if not var_list:
@@ -707,17 +809,9 @@ class PCPCombineWrapper(ReformatGriddedWrapper):
                 else:
                     accum_amount = accum_dict['amount']
 
-                search_time_info = {
-                    'valid': search_time,
-                    'lead': lead,
-                }
-                field_info = self.get_field_string(
-                    time_info=search_time_info,
-                    search_accum=time_string_to_met_time(accum_amount),
-                    name=accum_dict['name'],
-                    level=accum_dict['level'],
-                    extra=accum_dict['extra']
-                )
+                field_info = self._get_accum_field_string(search_time, lead,
+                                                          accum_amount,
+                                                          accum_dict)
                 # add file to input list and step back to find more data
                 self.args.append(search_file)
                 if field_info_after_file:
@@ -746,6 +840,36 @@ class PCPCombineWrapper(ReformatGriddedWrapper):
 
         return files_found
 
+    def _get_accum_field_string(self, search_time, lead, accum_amount,
+                                accum_dict):
+        """! Get the field information to read an accumulation from an input
+        file. The result is reused for later run times that read the same
+        accumulation from the same file.
+
+        @param search_time valid time of the input file
+        @param lead forecast lead of the input file in seconds
+        @param accum_amount accumulation to read in seconds
+        @param accum_dict dictionary with name, level, and extra field info
+        @returns field information string
+        """
+        def search():
+            search_time_info = {
+                'valid': search_time,
+                'lead': lead,
+            }
+            field_info = self.get_field_string(
+                time_info=search_time_info,
+                search_accum=time_string_to_met_time(accum_amount),
+                name=accum_dict['name'],
+                level=accum_dict['level'],
+                extra=accum_dict['extra']
+            )
+            return field_info, 0
+
+        key = ('field', search_time, lead, accum_amount, accum_dict['name'],
+               accum_dict['level'], accum_dict['extra'])
+        return self._search_with_cache(key, search)
+
     def get_lowest_fcst_file(self, valid_time, data_src):
         """! Find the lowest forecast hour that corresponds to the valid time
 
@@ -770,15 +894,42 @@ class PCPCombineWrapper(ReformatGriddedWrapper):
         if smallest_input_accum > 3600:
             smallest_input_accum = 3600
 
+        custom = self.c_dict.get('CUSTOM_STRING', '')
+        key = ('lowest', data_src, valid_time, custom, min_forecast,
+               max_forecast, smallest_input_accum)
+        return self._find_file_with_cache(
+            key,
+            lambda: self._find_lowest_fcst_file(valid_time, data_src, custom,
+                                                min_forecast, max_forecast,
+                                                smallest_input_accum),
+            data_src
+        )
+
+    def _find_lowest_fcst_file(self, valid_time, data_src, custom,
+                               min_forecast, max_forecast, interval):
+        """! Check each forecast lead from the min to max forecast for a file
+        valid at the valid time.
+
+          @param valid_time valid time to search
+          @param data_src data type (FCST or OBS) to get filename template
+          @param custom custom string to use in the filename template
+          @param min_forecast lowest forecast lead to check in seconds
+          @param max_forecast highest forecast lead to check in seconds
+          @param interval time between forecast leads to check in seconds
+          @returns tuple of the result and number of files checked. The result
+           is a tuple of the path to the file with the lowest forecast lead,
+           the lead in seconds, and the path returned by preprocess_file, or
+           (None, 0, None) if no file was found
+        """
         min_forecast_string = ti_get_lead_string(min_forecast)
         max_forecast_string = ti_get_lead_string(max_forecast)
-        smallest_input_accum_string = ti_get_lead_string(smallest_input_accum,
-                                                         plural=False)
+        interval_string = ti_get_lead_string(interval, plural=False)
         self.logger.debug("Looking for file with lowest forecast lead valid "
                           f"at {valid_time} between {min_forecast_string} "
                           f"and {max_forecast_string} using "
-                          f"{smallest_input_accum_string} intervals")
+                          f"{interval_string} intervals")
 
+        num_checks = 0
         forecast_lead = min_forecast
         while forecast_lead <= max_forecast:
             input_dict = {
@@ -786,22 +937,23 @@ class PCPCombineWrapper(ReformatGriddedWrapper):
                 'lead_seconds': forecast_lead
             }
             time_info = ti_calculate(input_dict)
-            time_info['custom'] = self.c_dict.get('CUSTOM_STRING', '')
+            time_info['custom'] = custom
             search_file = os.path.join(self.c_dict[f'{data_src}_INPUT_DIR'],
                                        self.c_dict[data_src+'_INPUT_TEMPLATE'])
             search_file = do_string_sub(search_file, **time_info)
             self.logger.debug(f"Looking for {search_file}")
 
-            search_file = preprocess_file(
+            input_path = preprocess_file(
                 search_file,
                 self.c_dict[data_src+'_INPUT_DATATYPE'],
                 self.config)
+            num_checks += 1
 
-            if search_file is not None:
-                return search_file, forecast_lead
-            forecast_lead += smallest_input_accum
+            if input_path is not None:
+                return (search_file, forecast_lead, input_path), num_checks
+            forecast_lead += interval
 
-        return None, 0
+        return (None, 0, None), num_checks
 
     def get_field_string(self, time_info=None, search_accum=0, name=None,
                          level=None, extra=None):
@@ -841,16 +993,28 @@ class PCPCombineWrapper(ReformatGriddedWrapper):
             else:
                 input_dict = {'valid': valid_time}
 
-        time_info = ti_calculate(input_dict)
-        time_info['custom'] = self.c_dict.get('CUSTOM_STRING', '')
-        time_info['level'] = int(search_accum)
-        input_path = os.path.join(self.c_dict[f'{data_src}_INPUT_DIR'],
-                                  in_template)
-        input_path = do_string_sub(input_path, **time_info)
+        custom = self.c_dict.get('CUSTOM_STRING', '')
+
+        def search():
+            time_info = ti_calculate(input_dict)
+            time_info['custom'] = custom
+            time_info['level'] = int(search_accum)
+            input_path = os.path.join(self.c_dict[f'{data_src}_INPUT_DIR'],
+                                      in_template)
+            input_path = do_string_sub(input_path, **time_info)
+
+            processed_path = preprocess_file(
+                input_path,
+                self.c_dict[f'{data_src}_INPUT_DATATYPE'],
+                self.config
+            )
+            if processed_path is None:
+                input_path = None
+            return (input_path, lead, processed_path), 1
 
-        return preprocess_file(input_path,
-                               self.c_dict[f'{data_src}_INPUT_DATATYPE'],
-                               self.config), lead
+        key = ('file', data_src, tuple(sorted(input_dict.items())),
+               int(search_accum), custom)
+        return self._find_file_with_cache(key, search, data_src)
 
     def get_template_accum(self, accum_dict, search_time, lead, data_src):
         # apply string substitution to accum amount
@@ -20,6 +20,9 @@ from . import LoopTimesWrapper
 class PlotPointObsWrapper(LoopTimesWrapper):
     """! Wrapper used to build commands to call plot_point_obs """
 
+    ALLOW_CONCURRENT_COMMANDS = True
+    ALLOW_BATCH_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_GRID_DATA_DICT',
         'METPLUS_MSG_TYP',
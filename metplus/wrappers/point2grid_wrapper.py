@@ -26,6 +26,8 @@ from . import CommandBuilder
 
 class Point2GridWrapper(CommandBuilder):
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     def __init__(self, config, instance=None):
         self.app_name = "point2grid"
         self.app_path = os.path.join(config.getdir('MET_BIN_DIR', ''),
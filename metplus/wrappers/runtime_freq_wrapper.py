@@ -36,7 +36,13 @@ class RuntimeFreqWrapper(CommandBuilder):
         'RUN_ONCE_FOR_EACH'
     ]
 
+    # time information used to index ALL_FILES so subset_input_files only
+    # compares the files that can match the current run time
+    SUBSET_INDEX_KEYS = ('init', 'valid', 'lead')
+
     def __init__(self, config, instance=None):
+        # indices of ALL_FILES used by subset_input_files
+        self._subset_index = None
         super().__init__(config, instance=instance)
 
     def create_c_dict(self):
@@ -58,6 +64,16 @@ class RuntimeFreqWrapper(CommandBuilder):
                                        '').upper()
         )
 
+        # number of commands to run in a single process for RUN_ONCE_FOR_EACH
+        c_dict['BATCH_SIZE'] = (
+            self.config.getint('config', f'{app_name_upper}_BATCH_SIZE', 1)
+        )
+        if c_dict['BATCH_SIZE'] > 1 and not self.ALLOW_BATCH_COMMANDS:
+            self.logger.warning(f'{app_name_upper}_BATCH_SIZE is ignored '
+                                f'because {self.__class__.__name__} cannot '
+                                'run commands in batches')
+            c_dict['BATCH_SIZE'] = 1
+
         return c_dict
 
     def get_input_templates(self, c_dict):
@@ -213,6 +229,13 @@ class RuntimeFreqWrapper(CommandBuilder):
     def run_once_for_each(self, custom):
         self.logger.debug(f"Running once for each init/valid and lead time")
 
+        # run groups of commands in a single process if requested
+        if ((self.c_dict.get('BATCH_SIZE') or 1) > 1 and
+                not self.c_dict.get('DO_NOT_RUN_EXE', False)):
+            self.logger.debug(f"Running {self.c_dict['BATCH_SIZE']} "
+                              "commands at a time in a single process")
+            self.cmd_batch = []
+
         success = True
         for time_input in time_generator(self.config):
             if time_input is None:
@@ -228,6 +251,11 @@ class RuntimeFreqWrapper(CommandBuilder):
             if not self.run_at_time(time_input):
                 success = False
 
+        # run any commands remaining in the batch
+        if not self.run_cmd_batch():
+            success = False
+        self.cmd_batch = None
+
         return success
 
     def run_at_time(self, input_dict):
@@ -453,29 +481,34 @@ class RuntimeFreqWrapper(CommandBuilder):
         else:
             lead_loop = leads
 
-        for file_dict in self.c_dict['ALL_FILES']:
-            for lead in lead_loop:
-                if lead is not None:
-                    current_time_info = time_info.copy()
-                    current_time_info['lead'] = lead
-                else:
-                    current_time_info = time_info
-
-                # compare time information for each input file
-                # add file to list of files to use if it matches
-                if not self.compare_time_info(current_time_info,
-                                              file_dict['time_info']):
+        all_files = self.c_dict['ALL_FILES']
+        matches = []
+        for lead in lead_loop:
+            if lead is not None:
+                current_time_info = time_info.copy()
+                current_time_info['lead'] = lead
+            else:
+                current_time_info = time_info
+
+            # compare time information for each input file that could match
+            # add file to list of files to use if it matches
+            for file_index in self._get_subset_candidates(current_time_info):
+                if self.compare_time_info(current_time_info,
+                                          all_files[file_index]['time_info']):
+                    matches.append(file_index)
+
+        # add files in the order they were found
+        for file_index in sorted(matches):
+            file_dict = all_files[file_index]
+            for input_key in file_dict:
+                # skip time info key
+                if input_key == 'time_info':
                     continue
 
-                for input_key in file_dict:
-                    # skip time info key
-                    if input_key == 'time_info':
-                        continue
-
-                    if input_key not in all_input_files:
-                        all_input_files[input_key] = []
+                if input_key not in all_input_files:
+                    all_input_files[input_key] = []
 
-                    all_input_files[input_key].extend(file_dict[input_key])
+                all_input_files[input_key].extend(file_dict[input_key])
 
         # return None if no matching input files were found
         if not all_input_files:
@@ -492,6 +525,81 @@ class RuntimeFreqWrapper(CommandBuilder):
 
         return list_file_dict
 
+    def _get_subset_candidates(self, time_info):
+        """! Get the indices of the files in ALL_FILES that could match the
+             time information. Files are grouped by the values of
+             SUBSET_INDEX_KEYS that are not wildcards for the run time, so
+             only the files with the same values are returned, along with
+             any files whose values cannot be indexed. The groups are built
+             the first time they are needed for each combination of keys.
+
+             @param time_info dictionary containing time information
+             @returns list of indices of files to compare
+        """
+        all_files = self.c_dict['ALL_FILES']
+        keys = []
+        values = []
+        for key in self.SUBSET_INDEX_KEYS:
+            value = self._get_subset_index_value(key, time_info)
+            if value is not None:
+                keys.append(key)
+                values.append(value)
+
+        if not keys:
+            return range(len(all_files))
+
+        # rebuild index if the list of files has changed
+        index = self._subset_index
+        if (index is None or index['files'] is not all_files or
+                index['count'] != len(all_files)):
+            index = {'files': all_files, 'count': len(all_files), 'keys': {}}
+            self._subset_index = index
+
+        keys = tuple(keys)
+        if keys not in index['keys']:
+            groups = {}
+            not_indexed = []
+            for file_index, file_dict in enumerate(all_files):
+                file_values = tuple(
+                    self._get_subset_index_value(key, file_dict['time_info'])
+                    for key in keys
+                )
+                if None in file_values:
+                    not_indexed.append(file_index)
+                    continue
+                groups.setdefault(file_values, []).append(file_index)
+            index['keys'][keys] = (groups, not_indexed)
+
+        groups, not_indexed = index['keys'][keys]
+        return groups.get(tuple(values), []) + not_indexed
+
+    @staticmethod
+    def _get_subset_index_value(key, time_info):
+        """! Get value used to group files by time information. Forecast
+             leads are converted to seconds so they are grouped the same way
+             that compare_time_info compares them.
+
+             @param key name of time information item, e.g. init or lead
+             @param time_info dictionary containing time information
+             @returns value to group by or None if the value is a wildcard or
+              cannot be used to group files
+        """
+        value = time_info.get(key, '*')
+        if isinstance(value, str) and value == '*':
+            return None
+
+        if key == 'lead':
+            return time_util.ti_get_seconds_from_lead(value,
+                                                      time_info.get('valid',
+                                                                    '*'))
+
+        try:
+            hash(value)
+        except TypeError:
+            return None
+
+        return value
+
     def get_list_file_name(self, time_info, identifier):
         """! Build name of ascii file that contains a list of files to process.
              If wildcard is set for init, valid, or lead then use the text ALL
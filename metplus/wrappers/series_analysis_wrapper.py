@@ -31,6 +31,7 @@ from ..util import ti_get_seconds_from_relativedelta
 from ..util import parse_var_list
 from ..util import add_to_time_input
 from ..util import field_read_prob_info, add_field_info_to_time_info
+from ..util import path_exists
 from .plot_data_plane_wrapper import PlotDataPlaneWrapper
 from . import RuntimeFreqWrapper
 
@@ -84,6 +85,9 @@ class SeriesAnalysisWrapper(RuntimeFreqWrapper):
         'prc',
     ]
 
+    # storm_id is also compared in compare_time_info
+    SUBSET_INDEX_KEYS = ('init', 'valid', 'lead', 'storm_id')
+
     def __init__(self, config, instance=None):
         self.app_name = 'series_analysis'
         self.app_path = os.path.join(config.getdir('MET_BIN_DIR', ''),
@@ -555,7 +559,7 @@ class SeriesAnalysisWrapper(RuntimeFreqWrapper):
                                        self.c_dict['TC_STAT_INPUT_TEMPLATE'])
         filter_file = do_string_sub(filter_template, **time_info)
         self.logger.debug(f"Getting storms from filter file: {filter_file}")
-        if not os.path.exists(filter_file):
+        if not path_exists(filter_file):
             self.log_error(f"Filter file does not exist: {filter_file}")
             return None
 
@@ -682,7 +686,7 @@ class SeriesAnalysisWrapper(RuntimeFreqWrapper):
                 both_path = do_string_sub(self.c_dict['BOTH_INPUT_FILE_LIST'],
                                           **time_info)
                 self.logger.debug(f"Explicit BOTH file list file: {both_path}")
-                if not os.path.exists(both_path):
+                if not path_exists(both_path):
                     self.log_error(f'Could not find file: {both_path}')
                     return None, None
 
@@ -691,14 +695,14 @@ class SeriesAnalysisWrapper(RuntimeFreqWrapper):
             fcst_path = do_string_sub(self.c_dict['FCST_INPUT_FILE_LIST'],
                                       **time_info)
             self.logger.debug(f"Explicit FCST file list file: {fcst_path}")
-            if not os.path.exists(fcst_path):
+            if not path_exists(fcst_path):
                 self.log_error(f'Could not find forecast file: {fcst_path}')
                 fcst_path = None
 
             obs_path = do_string_sub(self.c_dict['OBS_INPUT_FILE_LIST'],
                                      **time_info)
             self.logger.debug(f"Explicit OBS file list file: {obs_path}")
-            if not os.path.exists(obs_path):
+            if not path_exists(obs_path):
                 self.log_error(f'Could not find observation file: {obs_path}')
                 obs_path = None
 
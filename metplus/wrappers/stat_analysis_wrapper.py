@@ -5,7 +5,10 @@ Abstract: Builds commands to run stat_analysis
 """
 
 import os
-import glob
+import re
+import shlex
+import shutil
+import tempfile
 from datetime import datetime
 import itertools
 from dateutil.relativedelta import relativedelta
@@ -18,6 +21,8 @@ from ..util import get_start_and_end_times, get_time_prefix
 from ..util import ti_get_seconds_from_relativedelta
 from ..util import get_met_time_list, get_delta_list
 from ..util import YMD, YMD_HMS
+from ..util import mkdir_p
+from ..util import glob_paths, path_isfile, path_isdir
 from . import RuntimeFreqWrapper
 
 
@@ -27,6 +32,8 @@ class StatAnalysisWrapper(RuntimeFreqWrapper):
          ensemble_stat, and wavelet_stat
     """
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_MODEL',
         'METPLUS_OBTYPE',
@@ -116,11 +123,26 @@ class StatAnalysisWrapper(RuntimeFreqWrapper):
         'lead', 'lead_hour', 'lead_min', 'lead_sec', 'lead_totalsec'
     ]
 
+    # .stat file columns used to subset the -lookin files for each run and
+    # the job command line argument that also filters each column
+    SUBSET_COLUMNS = {
+        'MODEL': '-model',
+        'FCST_VAR': '-fcst_var',
+        'LINE_TYPE': '-line_type',
+        'FCST_LEAD': '-fcst_lead',
+        'FCST_VALID_BEG': '-fcst_valid',
+        'FCST_INIT_BEG': '-fcst_init',
+    }
+    # columns filtered by a range of times set with _beg and _end arguments
+    SUBSET_TIME_COLUMNS = ('FCST_VALID_BEG', 'FCST_INIT_BEG')
+
     def __init__(self, config, instance=None):
         self.app_path = os.path.join(config.getdir('MET_BIN_DIR', ''),
                                      'stat_analysis')
         self.app_name = os.path.basename(self.app_path)
         super().__init__(config, instance=instance)
+        # subset directories used by commands running in the background
+        self._subset_dirs = []
 
     def get_command(self):
         """! Build command to run. It is assumed that any errors preventing a
@@ -163,6 +185,16 @@ class StatAnalysisWrapper(RuntimeFreqWrapper):
             self.config.getraw('config', 'STAT_ANALYSIS_OUTPUT_TEMPLATE', '')
         )
 
+        # read the .stat files once and pass each run only the lines it uses
+        c_dict['SUBSET_LOOKIN'] = (
+            self.config.getbool('config', 'STAT_ANALYSIS_SUBSET_LOOKIN', False)
+        )
+        # remove the subset files when the runs that use them are done
+        # unless intermediate files should be preserved
+        c_dict['SCRUB_SUBSET_DIR'] = (
+            self.config.getbool('config', 'SCRUB_STAGING_DIR', True)
+        )
+
         # set date type, which is controlled by LOOP_BY
         c_dict['DATE_TYPE'] = get_time_prefix(self.config)
         if not c_dict['DATE_TYPE']:
@@ -248,9 +280,424 @@ class StatAnalysisWrapper(RuntimeFreqWrapper):
             self.log_error('Could not get runtime settings dict list')
             return False
 
+        subset_dir = None
+        if (self.c_dict['SUBSET_LOOKIN'] and
+                len(runtime_settings_dict_list) > 1 and
+                not self.c_dict.get('DO_NOT_RUN_EXE', False)):
+            subset_dir = self._subset_lookin(runtime_settings_dict_list)
+
         for runtime_settings in runtime_settings_dict_list:
             self._run_stat_analysis_job(runtime_settings)
 
+        if subset_dir and self.c_dict.get('SCRUB_SUBSET_DIR', True):
+            # commands running in the background may still read the files
+            if self.cmdrunner.is_concurrent:
+                self._subset_dirs.append(subset_dir)
+            else:
+                self._remove_subset_dir(subset_dir)
+
+        return True
+
+    def wait_for_commands(self):
+        """! Wait for any commands that are running in the background to
+        finish, then remove the subset directories that they read.
+
+        @returns True if all commands succeeded, False otherwise
+        """
+        success = super().wait_for_commands()
+        while self._subset_dirs:
+            self._remove_subset_dir(self._subset_dirs.pop())
+        return success
+
+    def _remove_subset_dir(self, subset_dir):
+        """! Remove a directory of subset .stat files.
+
+        @param subset_dir directory to remove
+        """
+        self.logger.debug(f"Removing subset directory: {subset_dir}")
+        shutil.rmtree(subset_dir, ignore_errors=True)
+
+    def _subset_lookin(self, runtime_settings_dict_list):
+        """! Read each .stat file found in the -lookin directories and write
+        the lines that each run of stat_analysis can use to a directory that
+        replaces the -lookin value for that run. Lines are selected using
+        only the columns in SUBSET_COLUMNS, so stat_analysis still applies all
+        of its filtering to the subset. Each file is read once to find the
+        runs that use each line and again to write the subset files one at a
+        time. Runs that can use every line, that read a file that does not
+        exist yet, or whose filters cannot be determined read the original
+        -lookin directories.
+
+        @param runtime_settings_dict_list list of dictionaries containing
+         settings for each run. LOOKIN_DIR is changed for each subset run
+        @returns directory containing the subset files or None if no subset
+         files were written
+        """
+        config_content = None
+        if self.c_dict.get('CONFIG_FILE'):
+            try:
+                with open(self.c_dict['CONFIG_FILE'], 'r') as file_handle:
+                    config_content = file_handle.read()
+            except OSError:
+                return None
+
+        job_filters = {}
+        stat_file_jobs = {}
+        for index, runtime_settings in enumerate(runtime_settings_dict_list):
+            filters = self._get_subset_filters(runtime_settings,
+                                               config_content)
+            if filters is None or all(value is None
+                                      for value in filters.values()):
+                continue
+
+            stat_files = self._get_lookin_stat_files(
+                runtime_settings['LOOKIN_DIR']
+            )
+            if stat_files is None:
+                continue
+
+            job_filters[index] = filters
+            for stat_file in stat_files:
+                stat_file_jobs.setdefault(stat_file, []).append(index)
+
+        # find the runs that use the lines of each file
+        routes = {}
+        file_keys = {}
+        subset_jobs = set()
+        for stat_file, indices in stat_file_jobs.items():
+            keys = self._get_stat_file_keys(stat_file)
+            if keys is None:
+                return None
+            file_keys[stat_file] = keys
+            for key in keys:
+                if key not in routes:
+                    routes[key] = {index for index, filters
+                                   in job_filters.items()
+                                   if self._line_matches(key, filters)}
+                subset_jobs.update(index for index in indices
+                                   if index not in routes[key])
+
+        # skip subset if the filters do not remove any lines from a run
+        if not subset_jobs:
+            self.logger.debug("Filters do not subset the -lookin files. "
+                              "Reading original -lookin directories")
+            return None
+
+        staging_dir = os.path.join(self.config.getdir('STAGING_DIR'),
+                                   'stat_analysis')
+        mkdir_p(staging_dir)
+        subset_dir = tempfile.mkdtemp(prefix=f'{self.log_name}_',
+                                      dir=staging_dir)
+        job_dirs = {}
+        for index in sorted(subset_jobs):
+            job_dirs[index] = os.path.join(subset_dir, f'run{index:04d}')
+            mkdir_p(job_dirs[index])
+
+        self.logger.info(f"Subsetting {len(stat_file_jobs)} .stat files for "
+                         f"{len(job_dirs)} of {len(job_filters)} runs in "
+                         f"{subset_dir}")
+        for file_index, (stat_file, indices) in enumerate(
+                stat_file_jobs.items()):
+            indices = [index for index in indices if index in job_dirs and
+                       any(index in routes[key]
+                           for key in file_keys[stat_file])]
+            if not indices:
+                continue
+
+            filename = f'{file_index:06d}_{os.path.basename(stat_file)}'
+            if not filename.endswith('.stat'):
+                filename = f'{filename}.stat'
+
+            self._subset_stat_file(stat_file, filename, indices, routes,
+                                   job_dirs)
+
+        for index, job_dir in job_dirs.items():
+            runtime_settings_dict_list[index]['LOOKIN_DIR'] = job_dir
+
+        return subset_dir
+
+    def _get_subset_filters(self, runtime_settings, config_content):
+        """! Get the values of each column in SUBSET_COLUMNS that a run of
+        stat_analysis can use. The values from the METplus config settings
+        are only used if the MET config file references the environment
+        variables. A value of None means that the column cannot be filtered.
+
+        @param runtime_settings dictionary containing settings for the run
+        @param config_content contents of the MET config file or None if
+         the config file is not used
+        @returns dictionary of column name and set of values, tuple of time
+         range, or None, or None if the run should read the original -lookin
+         dirs
+        """
+        jobs = runtime_settings['JOBS']
+        if config_content is not None:
+            if (self.env_var_dict.get(self.MET_OVERRIDES_KEY) or
+                    '${METPLUS_JOBS}' not in config_content):
+                return None
+        else:
+            # only the first job is passed on the command line
+            jobs = jobs[:1]
+
+        filters = {}
+        for column, job_arg in self.SUBSET_COLUMNS.items():
+            if column in self.SUBSET_TIME_COLUMNS:
+                filters[column] = self._get_subset_time_range(
+                    column, job_arg, runtime_settings, jobs, config_content
+                )
+                continue
+
+            config_values = set()
+            if config_content is not None:
+                if f'${{METPLUS_{column}}}' not in config_content:
+                    filters[column] = None
+                    continue
+                config_values = self._get_subset_values(
+                    runtime_settings.get(column, '')
+                )
+
+            column_filter = set()
+            for job in jobs:
+                job_values = self._get_job_arg_values(job, job_arg)
+                # job uses every value if no values are set for the column
+                if not config_values and not job_values:
+                    column_filter = None
+                    break
+                column_filter.update(config_values, job_values)
+
+            if column_filter is not None:
+                column_filter = {self._get_subset_key_value(column, value)
+                                 for value in column_filter}
+                # cannot filter if any value cannot be compared
+                if None in column_filter:
+                    column_filter = None
+
+            filters[column] = column_filter
+
+        return filters
+
+    def _get_subset_time_range(self, column, job_arg, runtime_settings, jobs,
+                               config_content):
+        """! Get the range of times that a run of stat_analysis can use for a
+        time column, e.g. FCST_VALID_BEG. The _beg value keeps lines at or
+        after the time and the _end value keeps lines that end at or before
+        the time, so the column must also be at or before it. A job argument
+        overrides the value from the config file.
+
+        @param column name of time column, e.g. FCST_VALID_BEG
+        @param job_arg job argument without the _beg or _end suffix
+        @param runtime_settings dictionary containing settings for the run
+        @param jobs list of jobs that are run
+        @param config_content contents of the MET config file or None if
+         the config file is not used
+        @returns tuple of earliest and latest time in YYYYMMDD_HHMMSS format,
+         either of which is None if not bounded, or None if not bounded at all
+        """
+        prefix = column.rsplit('_', 1)[0]
+        bounds = []
+        for beg_or_end, pick in (('BEG', min), ('END', max)):
+            config_value = None
+            if (config_content is not None and
+                    f'${{METPLUS_{prefix}_{beg_or_end}}}' in config_content):
+                config_value = runtime_settings.get(f'{prefix}_{beg_or_end}')
+
+            job_bounds = []
+            for job in jobs:
+                job_values = self._get_job_arg_values(
+                    job, f'{job_arg}_{beg_or_end.lower()}'
+                )
+                value = job_values.pop() if len(job_values) == 1 else None
+                job_bounds.append(self._get_subset_key_value(
+                    column, value or config_value or ''
+                ))
+
+            # unbounded if any job does not set a valid time
+            bounds.append(None if None in job_bounds else pick(job_bounds))
+
+        if bounds == [None, None]:
+            return None
+        return tuple(bounds)
+
+    @staticmethod
+    def _get_subset_values(value_list):
+        """! Get set of values from comma-separated list of quoted values.
+
+        @param value_list string of values, e.g. '"GFS", "NAM"'
+        @returns set of upper case values without quotes
+        """
+        return {remove_quotes(value.strip()).upper()
+                for value in value_list.split(',') if value.strip()}
+
+    @staticmethod
+    def _get_subset_key_value(column, value):
+        """! Get a value of a .stat column in a form that can be compared to
+        the filters. Forecast leads in HHMMSS format are converted to seconds
+        and times must be in YYYYMMDD_HHMMSS format.
+
+        @param column name of .stat column
+        @param value string value to convert
+        @returns value to compare or None if it cannot be compared
+        """
+        if column == 'FCST_LEAD':
+            match = re.match(r'^(-?)(\d+)(\d{2})(\d{2})$', value)
+            if not match:
+                return None
+            sign, hours, minutes, seconds = match.groups()
+            total = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+            return -total if sign else total
+
+        if column in StatAnalysisWrapper.SUBSET_TIME_COLUMNS:
+            return value if re.match(r'^\d{8}_\d{6}$', value) else None
+
+        return value.upper()
+
+    def _get_job_arg_values(self, job, job_arg):
+        """! Get the values set for a command line argument in a job.
+
+        @param job stat_analysis job string
+        @param job_arg argument to read, e.g. -model
+        @returns set of upper case values set for the argument
+        """
+        try:
+            items = shlex.split(job)
+        except ValueError:
+            items = job.split()
+
+        values = set()
+        for index, item in enumerate(items[:-1]):
+            if item == job_arg:
+                values.update(self._get_subset_values(items[index + 1]))
+        return values
+
+    def _get_lookin_stat_files(self, lookin_dir):
+        """! Get list of .stat files that stat_analysis reads from the
+        -lookin value.
+
+        @param lookin_dir space-separated list of directories or files
+        @returns list of file paths or None if any item does not exist or is
+         written by a command that has not finished running
+        """
+        stat_files = []
+        for path in lookin_dir.split():
+            if self.cmdrunner.is_pending_path(path):
+                return None
+
+            if path_isfile(path):
+                stat_files.append(path)
+                continue
+
+            if not path_isdir(path):
+                return None
+
+            for dirpath, _, filenames in os.walk(path):
+                stat_files.extend(os.path.join(dirpath, filename)
+                                  for filename in sorted(filenames)
+                                  if filename.endswith('.stat'))
+
+        return stat_files
+
+    def _get_stat_file_keys(self, stat_file):
+        """! Read a .stat file and get the values of the SUBSET_COLUMNS found
+        in each line.
+
+        @param stat_file path to .stat file to read
+        @returns set of keys read from the file or None if it cannot be read
+        """
+        keys = set()
+        columns = None
+        try:
+            with open(stat_file, 'r') as file_handle:
+                for line in file_handle:
+                    key, columns = self._get_line_key(line, columns)
+                    if key is not False:
+                        keys.add(key)
+        except (OSError, UnicodeDecodeError) as err:
+            self.logger.warning(f"Could not read {stat_file}: {err}")
+            return None
+        return keys
+
+    def _get_line_key(self, line, columns):
+        """! Get the values of the SUBSET_COLUMNS for a line of a .stat file.
+
+        @param line line of .stat file
+        @param columns list of the index of each column read from the last
+         header line or None if no header line was read
+        @returns tuple of the key and the list of column indices. The key is
+         False if the line is a header or empty line, None if the values
+         cannot be read, or a tuple of the values to compare to the filters
+        """
+        items = line.split()
+        if not items:
+            return False, columns
+
+        if items[0] == 'VERSION':
+            columns = [items.index(column) if column in items else None
+                       for column in self.SUBSET_COLUMNS]
+            return False, columns
+
+        present = [index for index in columns or [] if index is not None]
+        if not present or len(items) <= max(present):
+            return None, columns
+
+        return tuple(None if index is None else
+                     self._get_subset_key_value(column, items[index])
+                     for index, column in zip(columns, self.SUBSET_COLUMNS)
+                     ), columns
+
+    def _subset_stat_file(self, stat_file, filename, indices, routes,
+                          job_dirs):
+        """! Read a .stat file and write the lines that each run may use to
+        its subset file. The lines are read into memory so that only one
+        subset file is open at a time. Header lines are written to every
+        subset file. Lines that cannot be checked are written to every run.
+
+        @param stat_file path to .stat file to read
+        @param filename name of subset file to write in each run directory
+        @param indices list of indices of the runs to write
+        @param routes dictionary of line key and set of indices of the runs
+         that use lines with the key
+        @param job_dirs dictionary of run index and subset directory
+        """
+        with open(stat_file, 'r') as file_handle:
+            lines = file_handle.readlines()
+
+        keys = []
+        columns = None
+        for line in lines:
+            key, columns = self._get_line_key(line, columns)
+            keys.append(key)
+
+        for index in indices:
+            path = os.path.join(job_dirs[index], filename)
+            with open(path, 'w') as file_handle:
+                file_handle.writelines(
+                    line for line, key in zip(lines, keys)
+                    if key is False or index in routes[key]
+                )
+
+    def _line_matches(self, key, filters):
+        """! Check if a .stat line may be used by a run of stat_analysis.
+
+        @param key tuple of values of the SUBSET_COLUMNS for the line or None
+         if the values could not be read. Any value may be None if it could
+         not be read
+        @param filters dictionary of column name and set of values, tuple of
+         time range, or None
+        @returns True if the line may be used by the run, False if not
+        """
+        if key is None:
+            return True
+
+        for value, column in zip(key, self.SUBSET_COLUMNS):
+            column_filter = filters[column]
+            if column_filter is None or value is None:
+                continue
+
+            if column in self.SUBSET_TIME_COLUMNS:
+                beg, end = column_filter
+                if (beg and value < beg) or (end and value > end):
+                    return False
+            elif value not in column_filter:
+                return False
         return True
 
     def _get_all_runtime_settings(self, time_input):
@@ -965,7 +1412,7 @@ class StatAnalysisWrapper(RuntimeFreqWrapper):
                 continue
 
             self.logger.debug(f"Expanding wildcard path: {one_path}")
-            expand_path = glob.glob(one_path.strip())
+            expand_path = glob_paths(one_path.strip())
             if not expand_path:
                 self.logger.warning("Wildcard expansion found no matches")
                 continue
@@ -17,6 +17,7 @@ from . import RuntimeFreqWrapper
 from ..util import do_string_sub, skip_time, get_lead_sequence
 from ..util import parse_var_list, sub_var_list, getlist
 from ..util import find_indices_in_config_section
+from ..util import path_exists
 from ..util.met_config import add_met_config_dict_list
 
 '''!@namespace TCDiagWrapper
@@ -27,6 +28,8 @@ from ..util.met_config import add_met_config_dict_list
 
 class TCDiagWrapper(RuntimeFreqWrapper):
 
+    ALLOW_BATCH_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_MODEL',
         'METPLUS_STORM_ID',
@@ -395,7 +398,7 @@ class TCDiagWrapper(RuntimeFreqWrapper):
         if input_file_list:
             self.logger.debug(f"Explicit file list file: {input_file_list}")
             list_file = do_string_sub(input_file_list, **time_info)
-            if not os.path.exists(list_file):
+            if not path_exists(list_file):
                 self.log_error(f'Could not find file list: {list_file}')
                 return False
         else:
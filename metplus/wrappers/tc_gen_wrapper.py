@@ -26,6 +26,8 @@ from . import CommandBuilder
 
 class TCGenWrapper(CommandBuilder):
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_INIT_FREQ',
         'METPLUS_VALID_FREQ',
@@ -17,8 +17,10 @@ Condition codes: 0 for success, 1 for failure
 import os
 import re
 import csv
+import json
 import datetime
-import glob
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 from ..util import getlist, get_lead_sequence, skip_time, mkdir_p
 from ..util import ti_calculate
@@ -26,6 +28,7 @@ from ..util import do_string_sub
 from ..util import get_tags, find_indices_in_config_section
 from ..util.met_config import add_met_config_dict_list
 from ..util import time_generator, log_runtime_banner, add_to_time_input
+from ..util import glob_paths, path_isfile
 from . import CommandBuilder
 
 '''!@namespace TCPairsWrapper
@@ -37,11 +40,17 @@ tc_pairs_wrapper.py [-c /path/to/user.template.conf]
 @endcode
 '''
 
+# errors reading or writing a deck that are reported instead of raised,
+# whether the deck is reformatted in this process or in a worker process
+REFORMAT_ERRORS = (OSError, csv.Error, UnicodeDecodeError)
+
 class TCPairsWrapper(CommandBuilder):
     """!Wraps the MET tool, tc_pairs to parse and match ATCF_by_pairs adeck and
        bdeck files.  Pre-processes extra tropical cyclone data.
     """
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_MODEL',
         'METPLUS_DESC',
@@ -78,10 +87,18 @@ class TCPairsWrapper(CommandBuilder):
         'cyclone': r'[0-9]{2,4}',
     }
 
+    # name of file in TC_PAIRS_REFORMAT_DIR that records which input and
+    # storm month were used to create each reformatted deck file
+    REFORMAT_MANIFEST_NAME = '.tc_pairs_reformat.json'
+
     def __init__(self, config, instance=None):
         self.app_name = 'tc_pairs'
         self.app_path = os.path.join(config.getdir('MET_BIN_DIR', ''),
                                      self.app_name)
+        # read from REFORMAT_MANIFEST_NAME the first time it is needed
+        self._reformat_manifest = None
+        # processes used to reformat decks, shared by all run times
+        self._reformat_executor = None
         super().__init__(config, instance=instance)
 
     def create_c_dict(self):
@@ -318,6 +335,18 @@ class TCPairsWrapper(CommandBuilder):
     def run_all_times(self):
         """! Build up the command to invoke the MET tool tc_pairs.
         """
+        try:
+            return self._run_all_times()
+        finally:
+            self._shutdown_reformat_executor()
+
+    def _run_all_times(self):
+        """! Process the first run time or all run times if TC_PAIRS_RUN_ONCE
+        is False.
+
+        @returns list of tuples containing commands that are run and which
+         env vars were set for the command
+        """
         # use first run time
         input_dict = next(time_generator(self.config))
         if not input_dict:
@@ -704,9 +733,13 @@ class TCPairsWrapper(CommandBuilder):
 
             # reformat extra tropical cyclone files if necessary
             if self.c_dict['REFORMAT_DECK']:
-                adeck_list = self.reformat_files(adeck_list, 'A', time_info)
-                bdeck_list = self.reformat_files(bdeck_list, 'B', time_info)
-                edeck_list = self.reformat_files(edeck_list, 'E', time_info)
+                deck_lists = self.reformat_deck_lists({'A': adeck_list,
+                                                       'B': bdeck_list,
+                                                       'E': edeck_list},
+                                                      time_info)
+                adeck_list = deck_lists['A']
+                bdeck_list = deck_lists['B']
+                edeck_list = deck_lists['E']
 
             self.args.append(f"-bdeck {' '.join(bdeck_list)}")
             if adeck_list:
@@ -753,7 +786,7 @@ class TCPairsWrapper(CommandBuilder):
         self.logger.debug('Looking for BDECK: {}'.format(bdeck_glob))
 
         # get all files that match expression
-        bdeck_files = sorted(glob.glob(bdeck_glob))
+        bdeck_files = sorted(glob_paths(bdeck_glob))
 
         if bdeck_files:
             wildcard_used = '*' in bdeck_glob or '?' in bdeck_glob
@@ -850,13 +883,13 @@ class TCPairsWrapper(CommandBuilder):
             deck_glob = deck_expr.replace(self.c_dict['MODEL_LIST'][0], model)
             self.logger.debug(f'Looking for {deck}DECK file: {deck_glob} '
                               f'for model ({model}) using template {template}')
-            deck_files = glob.glob(deck_glob)
+            deck_files = glob_paths(deck_glob)
             if not deck_files:
                 continue
 
             for deck_file in deck_files:
                 # if deck exists, add to list
-                if os.path.isfile(deck_file) and deck_file not in deck_list:
+                if path_isfile(deck_file) and deck_file not in deck_list:
                     self.logger.debug('Adding {}DECK: {}'.format(deck,
                                                                  deck_file))
                     deck_list.append(deck_file)
@@ -867,34 +900,170 @@ class TCPairsWrapper(CommandBuilder):
         """!Reformat track data to match expected ATCF format
 
             @param file_list list of files to reformat
-            @param deck_type type of deck (A or E)
+            @param deck_type type of deck (A, B, or E)
             @param time_info dictionary with timing info for current run
             @returns list of output files that are in ATCF format
         """
+        return self.reformat_deck_lists({deck_type: file_list},
+                                        time_info)[deck_type]
+
+    def reformat_deck_lists(self, deck_lists, time_info):
+        """!Reformat track data from all deck types to match expected ATCF
+        format. Decks that were already reformatted for the same storm month
+        and have not changed since are not rewritten. The rest are
+        reformatted at the same time in separate processes if
+        METPLUS_MAX_PARALLEL_COMMANDS is greater than 1.
+
+            @param deck_lists dictionary of deck type (A, B, or E) and list of
+             files to reformat
+            @param time_info dictionary with timing info for current run
+            @returns dictionary of deck type and list of output files that
+             are in ATCF format
+        """
         storm_month = time_info['init'].strftime('%m')
-        missing_values = \
-            (self.c_dict['MISSING_VAL_TO_REPLACE'],
-             self.c_dict['MISSING_VAL'])
-        deck_dir = self.c_dict[deck_type+'DECK_DIR']
+        missing_values = (self.c_dict['MISSING_VAL_TO_REPLACE'],
+                          self.c_dict['MISSING_VAL'])
         reformat_dir = self.c_dict['REFORMAT_DIR']
+        manifest = self._get_reformat_manifest()
+
+        out_lists = {}
+        jobs = []
+        for deck_type, file_list in deck_lists.items():
+            deck_dir = self.c_dict[deck_type+'DECK_DIR']
+            out_lists[deck_type] = []
+            for deck in file_list:
+                outfile = deck.replace(deck_dir, reformat_dir)
+                out_lists[deck_type].append(outfile)
+
+                if os.path.isfile(outfile) and self.c_dict.get('SKIP_REFORMAT'):
+                    self.logger.debug(f'Skip processing {deck} because '
+                                      'reformatted file already exists. '
+                                      'Change TC_PAIRS_SKIP_IF_REFORMAT_EXISTS'
+                                      ' to False to overwrite file')
+                    continue
 
-        outfiles = []
-        for deck in file_list:
-            outfile = deck.replace(deck_dir,
-                                   reformat_dir)
-            if os.path.isfile(outfile) and self.c_dict.get('SKIP_REFORMAT'):
-                self.logger.debug(f'Skip processing {deck} because '
-                                  'reformatted file already exists. Change '
-                                  'TC_PAIRS_SKIP_IF_REFORMAT_EXISTS to '
-                                  'False to overwrite file')
-            else:
-                self.logger.debug(f'Reformatting {deck} to {outfile}')
-                self.read_modify_write_file(deck, storm_month,
-                                            missing_values, outfile)
+                key = _get_reformat_key(deck, storm_month, missing_values)
+                if _reformat_is_current(manifest.get(outfile), key, outfile):
+                    self.logger.debug(f'Skip processing {deck} because '
+                                      f'{outfile} is already reformatted for '
+                                      f'storm month {storm_month}')
+                    continue
+
+                if any(outfile == job[3] for job in jobs):
+                    continue
 
-            outfiles.append(outfile)
+                jobs.append((deck, storm_month, missing_values, outfile, key))
+
+        if not jobs:
+            return out_lists
+
+        # tc_pairs commands from earlier run times may still be reading the
+        # files that are about to be rewritten for a different storm month
+        if any(os.path.exists(job[3]) for job in jobs):
+            self.wait_for_commands()
+
+        # create output directories here so the worker processes do not
+        # need to use the filesystem cache and its lock
+        for (deck, _, _, outfile, _) in jobs:
+            self.logger.debug(f'Reformatting {deck} to {outfile}')
+            manifest.pop(outfile, None)
+            mkdir_p(os.path.dirname(outfile))
+
+        if len(jobs) > 1 and self.c_dict.get('MAX_PARALLEL_COMMANDS', 1) > 1:
+            executor = self._get_reformat_executor()
+            futures = [executor.submit(reformat_deck, *job[0:4])
+                       for job in jobs]
+            results = [(job, future.exception())
+                       for job, future in zip(jobs, futures)]
+        else:
+            results = []
+            for job in jobs:
+                try:
+                    reformat_deck(*job[0:4])
+                    results.append((job, None))
+                except REFORMAT_ERRORS as err:
+                    results.append((job, err))
+
+        for (deck, _, _, outfile, key), error in results:
+            if error is not None:
+                # handle the same errors as when running in this process
+                if not isinstance(error, REFORMAT_ERRORS):
+                    raise error
+                self.log_error(f'Could not reformat {deck}: {error}')
+                continue
+            stat = os.stat(outfile)
+            manifest[outfile] = {**key,
+                                 'output_mtime': stat.st_mtime_ns,
+                                 'output_size': stat.st_size}
+
+        self._write_reformat_manifest()
+        return out_lists
+
+    def _get_reformat_executor(self):
+        """!Get the pool of processes used to reformat decks, starting it the
+        first time it is needed so it is reused for every run time.
+
+            @returns ProcessPoolExecutor object
+        """
+        if self._reformat_executor is None:
+            # start new processes instead of forking because other threads,
+            # e.g. the log listener and command pool, may hold locks
+            self._reformat_executor = ProcessPoolExecutor(
+                max_workers=self.c_dict.get('MAX_PARALLEL_COMMANDS', 1),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._reformat_executor
+
+    def _shutdown_reformat_executor(self):
+        """!Stop the processes used to reformat decks if they were started.
+        """
+        if self._reformat_executor is not None:
+            self._reformat_executor.shutdown(wait=True)
+            self._reformat_executor = None
+
+    def _get_reformat_manifest_path(self):
+        """!Get path to the file that records the input file, modification
+        time, and storm month used to create each reformatted deck file.
+
+            @returns path to manifest file in the reformat directory
+        """
+        return os.path.join(self.c_dict['REFORMAT_DIR'],
+                            self.REFORMAT_MANIFEST_NAME)
 
-        return outfiles
+    def _get_reformat_manifest(self):
+        """!Read the reformat manifest file the first time it is needed.
+
+            @returns dictionary of reformatted file path and dictionary of
+             information about the input used to create it
+        """
+        if self._reformat_manifest is not None:
+            return self._reformat_manifest
+
+        self._reformat_manifest = {}
+        manifest_path = self._get_reformat_manifest_path()
+        if not os.path.exists(manifest_path):
+            return self._reformat_manifest
+
+        try:
+            with open(manifest_path, 'r') as file_handle:
+                self._reformat_manifest = json.load(file_handle)
+        except (OSError, ValueError) as err:
+            self.logger.warning(f'Could not read {manifest_path}, so all '
+                                f'decks will be reformatted: {err}')
+
+        return self._reformat_manifest
+
+    def _write_reformat_manifest(self):
+        """!Write the reformat manifest file so later runs can skip decks
+        that have not changed.
+        """
+        manifest_path = self._get_reformat_manifest_path()
+        mkdir_p(os.path.dirname(manifest_path))
+        tmp_path = f'{manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as file_handle:
+            json.dump(self._reformat_manifest, file_handle, indent=1,
+                      sort_keys=True)
+        os.replace(tmp_path, manifest_path)
 
     def get_command(self):
         """! Over-ride CommandBuilder's get_command because unlike other MET
@@ -927,48 +1096,8 @@ class TCPairsWrapper(CommandBuilder):
         the columns and the value to replace it with, e.g. (-9, -9999)
         @param out_csvfile the output csv file
         """
-        # create output directory if it does not exist
         mkdir_p(os.path.dirname(out_csvfile))
-
-        # Open the output csv file
-        out_file = open(out_csvfile, "w", newline='')
-
-        # Tell the write to use the line separator
-        # "\n" instead of the DOS "\r\n"
-        writer = csv.writer(out_file, lineterminator="\n")
-
-        with open(in_csvfile, newline='') as csvfile:
-
-            in_file_reader = csv.reader(csvfile)
-
-            for row in in_file_reader:
-                # Create a list for the modified lines
-                row_list = []
-
-                # Replace the second column (storm number) with
-                # the month followed by the storm number
-                # e.g. Replace 0006 with 010006
-                # this is done because this data has many storms per month
-                # and we need to know which storm we are processing if running
-                # over multiple months
-                row[1] = " " + storm_month + (row[1]).strip()
-
-                # Iterate over the items, deleting or modifying the columns
-                for item in row:
-                    # Delete the third column
-                    if item == row[2]:
-                        continue
-                    # Replace MISSING_VAL_TO_REPLACE=missing_values[0] with
-                    # MISSING_VAL=missing_values[1]
-                    if item.strip() == missing_values[0]:
-                        item = " " + missing_values[1]
-                    # Create a new row to write
-                    row_list.append(item)
-
-                # Write the modified file
-                writer.writerow(row_list)
-
-        out_file.close()
+        reformat_deck(in_csvfile, storm_month, missing_values, out_csvfile)
 
     def _read_all_files(self, input_dict):
         """! Handle setting up a command that skips logic to determine which
@@ -1071,3 +1200,87 @@ class TCPairsWrapper(CommandBuilder):
             time_storm_info[item] = value
 
         return time_storm_info
+
+
+def reformat_deck(in_csvfile, storm_month, missing_values, out_csvfile):
+    """!Reads CSV file, reformat file by adding the month to the 2nd
+    column storm number, delete the 3rd column, replace missing values,
+    and write a new CSV file with the modified content. Defined at the
+    module level so it can be run in a separate process. The directory
+    containing the output file must already exist.
+
+    @param in_csvfile input csv file that is being parsed
+    @param storm_month storm month to prepend to storm number
+    @param missing_values tuple containing a missing data value to find in
+    the columns and the value to replace it with, e.g. (-9, -9999)
+    @param out_csvfile the output csv file
+    """
+    with open(in_csvfile, newline='') as csvfile:
+        rows = list(csv.reader(csvfile))
+
+    missing_in = missing_values[0]
+    missing_out = f' {missing_values[1]}'
+    for row in rows:
+        if len(row) < 3:
+            continue
+
+        # Replace the second column (storm number) with
+        # the month followed by the storm number
+        # e.g. Replace 0006 with 010006
+        # this is done because this data has many storms per month
+        # and we need to know which storm we are processing if running
+        # over multiple months
+        row[1] = f' {storm_month}{row[1].strip()}'
+
+        # Delete the third column and replace MISSING_VAL_TO_REPLACE with
+        # MISSING_VAL in the rest of the columns
+        row[:] = [missing_out if item.strip() == missing_in else item
+                  for item in row[:2] + row[3:]]
+
+    # Tell the write to use the line separator
+    # "\n" instead of the DOS "\r\n"
+    with open(out_csvfile, 'w', newline='') as out_file:
+        csv.writer(out_file, lineterminator="\n").writerows(rows)
+
+
+def _get_reformat_key(deck, storm_month, missing_values):
+    """!Get the information that determines the contents of a reformatted
+    deck file.
+
+    @param deck path to input deck file
+    @param storm_month storm month that is prepended to storm number
+    @param missing_values tuple of missing value to find and replace it with
+    @returns dictionary of input path, size and modification time, storm
+     month, and missing values
+    """
+    stat = os.stat(deck)
+    return {
+        'input': os.path.realpath(deck),
+        'input_mtime': stat.st_mtime_ns,
+        'input_size': stat.st_size,
+        'storm_month': storm_month,
+        'missing_values': list(missing_values),
+    }
+
+
+def _reformat_is_current(entry, key, outfile):
+    """!Check if a reformatted deck file was created from the same input
+    and storm month and has not been changed since.
+
+    @param entry information stored in the manifest for the output file or
+     None if it is not in the manifest
+    @param key information about the input, see _get_reformat_key
+    @param outfile path to reformatted output file
+    @returns True if the output file does not need to be rewritten
+    """
+    if not entry or any(entry.get(name) != value
+                        for name, value in key.items()):
+        return False
+
+    try:
+        stat = os.stat(outfile)
+    except OSError:
+        return False
+
+    return (entry.get('output_mtime') == stat.st_mtime_ns and
+            entry.get('output_size') == stat.st_size)
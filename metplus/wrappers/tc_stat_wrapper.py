@@ -34,6 +34,8 @@ class TCStatWrapper(CommandBuilder):
          cyclone pair data.
     """
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_AMODEL',
         'METPLUS_BMODEL',
@@ -13,6 +13,7 @@ from ..util import time_generator
 from ..util import remove_quotes
 from ..util import get_files
 from ..util import mkdir_p
+from ..util import path_exists, path_isfile
 from . import CommandBuilder
 
 class TCMPRPlotterWrapper(CommandBuilder):
@@ -84,7 +85,7 @@ class TCMPRPlotterWrapper(CommandBuilder):
                                               'plot_tcmpr.R')
 
         # check that R script can be found
-        if not os.path.exists(c_dict['TCMPR_SCRIPT']):
+        if not path_exists(c_dict['TCMPR_SCRIPT']):
             self.logger.error('plot_tcmpr.R script could not be found')
 
             # if running script, set isOK to False
@@ -272,7 +273,7 @@ class TCMPRPlotterWrapper(CommandBuilder):
         input_data = do_string_sub(self.c_dict['INPUT_DATA'],
                                    **self.c_dict['TIME_INFO'])
         # If input data is a file, create a single command and invoke R script.
-        if os.path.isfile(input_data):
+        if path_isfile(input_data):
             self.logger.debug(f"Plotting file: {input_data}")
             return [input_data]
 
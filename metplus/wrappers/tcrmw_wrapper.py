@@ -16,6 +16,7 @@ from ..util import time_util
 from . import CommandBuilder
 from ..util import do_string_sub, skip_time, get_lead_sequence
 from ..util import parse_var_list, sub_var_list
+from ..util import path_exists
 
 '''!@namespace TCRMWWrapper
 @brief Wraps the TC-RMW tool
@@ -25,6 +26,8 @@ from ..util import parse_var_list, sub_var_list
 
 class TCRMWWrapper(CommandBuilder):
 
+    ALLOW_CONCURRENT_COMMANDS = True
+
     WRAPPER_ENV_VAR_KEYS = [
         'METPLUS_MODEL',
         'METPLUS_STORM_ID',
@@ -298,7 +301,7 @@ class TCRMWWrapper(CommandBuilder):
                               f"{self.c_dict['INPUT_FILE_LIST']}")
             list_file = do_string_sub(self.c_dict['INPUT_FILE_LIST'],
                                       **time_info)
-            if not os.path.exists(list_file):
+            if not path_exists(list_file):
                 self.log_error(f'Could not find file list: {list_file}')
                 return None
         else:
@@ -23,6 +23,9 @@ from ..util import do_string_sub
 '''
 
 class UserScriptWrapper(RuntimeFreqWrapper):
+
+    ALLOW_BATCH_COMMANDS = True
+
     def __init__(self, config, instance=None):
         self.app_name = "user_script"
         super().__init__(config, instance=instance)
@@ -188,7 +188,10 @@ def launch(cmd, env=None, stdin=None, stdout=None, stderr=None,
     elif stderr is not ERR2OUT:
         stderr_c=stderr
 
-    pid=os.fork()
+    # Hold the module lock while forking so that no other thread holds it
+    # in the child process, which would deadlock in pclose_all.
+    with plock:
+        pid=os.fork()
     assert(pid>=0)
     if pid>0:
         # Parent process after successfull fork.